@@ -0,0 +1,60 @@
+"""
+audio_chunking.py
+Cutting long 16 kHz signals into windows at quiet points, so that no word is split
+between windows. Shared by the streaming pipeline and parallel transcription.
+"""
+
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+
+def frame_energy(audio: np.ndarray, sr: int, frame_sec: float = 0.02) -> np.ndarray:
+    """
+    Mean square energy per non-overlapping frame.
+    """
+    hop = max(1, int(sr * frame_sec))
+    n_frames = len(audio) // hop
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n_frames * hop].reshape(n_frames, hop).astype(np.float32, copy=False)
+    return np.einsum("ij,ij->i", frames, frames) / hop
+
+
+def find_split_points(audio: np.ndarray, sr: int, target_sec: float = 30.0, search_sec: float = 5.0,
+                      frame_sec: float = 0.02, smooth_sec: float = 0.2) -> List[int]:
+    """
+    Sample indices to cut at, so that every window is at most target_sec long.
+    Each cut is the quietest point (energy smoothed over smooth_sec) within
+    the last search_sec of the window.
+    """
+    hop = max(1, int(sr * frame_sec))
+    energy = frame_energy(audio, sr, frame_sec)
+    k = max(1, int(smooth_sec / frame_sec))
+    if k > 1 and len(energy) >= k:
+        energy = np.convolve(energy, np.ones(k, dtype=np.float32) / k, mode="same")
+    target = int(target_sec * sr)
+    search = int(min(search_sec, target_sec) * sr)
+    cuts = []
+    pos = 0
+    while len(audio) - pos > target:
+        lo = (pos + target - search) // hop
+        hi = max(lo + 1, (pos + target) // hop)
+        frame = lo + int(np.argmin(energy[lo:hi]))
+        cut = min(frame * hop + hop // 2, pos + target)
+        if cut <= pos:
+            cut = pos + target
+        cuts.append(cut)
+        pos = cut
+    return cuts
+
+
+def iter_audio_windows(audio: np.ndarray, sr: int, window_sec: float = 30.0,
+                       search_sec: float = 5.0) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (start_sample, window) pairs; windows are views into ``audio``.
+    """
+    bounds = [0] + find_split_points(audio, sr, window_sec, search_sec) + [len(audio)]
+    for start, end in zip(bounds, bounds[1:]):
+        if end > start:
+            yield start, audio[start:end]
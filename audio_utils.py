@@ -1,10 +1,159 @@
 import subprocess
 import shutil
-import librosa
-import soundfile as sf
-import noisereduce as nr
-import sys
+import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from audio_chunking import frame_energy
+from utils import PipelineError
+
+# Whisper и Vosk оба работают с 16 кГц моно
+SAMPLE_RATE = 16000
+FFMPEG_FILTERS = "highpass=f=200, lowpass=f=3000, afftdn, dynaudnorm"
+
+def _require_ffmpeg():
+    # 🧰 Проверяем наличие ffmpeg
+    if not shutil.which("ffmpeg"):
+        print("❌ FFmpeg is not installed or not in PATH.")
+        raise PipelineError("FFmpeg is not installed or not in PATH.")
+
+def decode_audio(input_path, sr=SAMPLE_RATE, filters=FFMPEG_FILTERS):
+    """
+    Decode and filter any media file with FFmpeg straight into memory.
+    Returns mono float32 samples in [-1, 1] at the given rate.
+    """
+    _require_ffmpeg()
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", input_path]
+    if filters:
+        cmd += ["-af", filters]
+    cmd += ["-ac", "1", "-ar", str(sr), "-f", "s16le", "-"]
+    try:
+        pcm = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️ FFmpeg failed: {e.stderr.decode(errors='replace').strip()}")
+        raise PipelineError(f"FFmpeg failed on {input_path}") from e
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    audio *= 1.0 / 32768.0
+    return audio
+
+def estimate_noise_profile(audio, sr, clip_sec=2.0, frame_sec=0.05):
+    """
+    Noise clip made of the quietest frames of the whole signal, in time order.
+    """
+    hop = int(sr * frame_sec)
+    energy = frame_energy(audio, sr, frame_sec)
+    n_frames = max(1, min(len(energy), int(clip_sec / frame_sec)))
+    quiet = np.sort(np.argsort(energy)[:n_frames])
+    return np.concatenate([audio[i * hop:(i + 1) * hop] for i in quiet]) if len(quiet) else audio[:hop]
+
+def _denoise_block(block, sr, y_noise=None):
+    # noisereduce тянет за собой scipy.signal/scipy.stats — импортируем только здесь
+    import noisereduce as nr
+    # stationary-режим с общим профилем шума, иначе — профиль по самому блоку
+    if y_noise is not None:
+        return nr.reduce_noise(y=block, sr=sr, y_noise=y_noise, stationary=True).astype(np.float32, copy=False)
+    return nr.reduce_noise(y=block, sr=sr).astype(np.float32, copy=False)
+
+def iter_denoised_blocks(audio, sr, block_sec=30.0, overlap_sec=0.5, noise_profile="rolling", workers=1) -> Iterator[np.ndarray]:
+    """
+    Denoise overlapping blocks and yield the output as consecutive pieces covering
+    the whole signal. Neighbouring blocks are cross-faded over 2 * overlap_sec.
+    noise_profile: "rolling" estimates noise per block (noisereduce default),
+    "global" estimates it once from the quietest frames and uses stationary mode.
+    Working memory depends on block_sec and workers, not on the input length.
+    """
+    n = len(audio)
+    L = max(1, int(block_sec * sr))
+    O = min(int(overlap_sec * sr), L // 2)
+    y_noise = estimate_noise_profile(audio, sr) if noise_profile == "global" else None
+    n_blocks = max(1, -(-n // L))
+
+    def bounds(k):
+        return max(0, k * L - O), min(n, (k + 1) * L + O)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        def submit(k):
+            lo, hi = bounds(k)
+            block = np.array(audio[lo:hi])
+            if pool is None:
+                return block
+            return pool.submit(_denoise_block, block, sr, y_noise)
+
+        def result(k, job):
+            return _denoise_block(job, sr, y_noise) if pool is None else job.result()
+
+        in_flight = {}
+        ahead = max(1, 2 * workers)
+        tail = None
+        for k in range(n_blocks):
+            for j in range(k, min(n_blocks, k + ahead)):
+                if j not in in_flight:
+                    in_flight[j] = submit(j)
+            denoised = result(k, in_flight.pop(k))
+            if tail is not None:
+                # 🎚️ кроссфейд с хвостом предыдущего блока
+                w = np.linspace(0.0, 1.0, len(tail), dtype=np.float32)
+                yield tail * (1.0 - w) + denoised[:len(tail)] * w
+                denoised = denoised[len(tail):]
+            if k < n_blocks - 1:
+                overlap = bounds(k)[1] - bounds(k + 1)[0]
+                tail = denoised[len(denoised) - overlap:]
+                yield denoised[:len(denoised) - overlap]
+            else:
+                yield denoised
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def reduce_noise_chunked(audio, sr, block_sec=30.0, overlap_sec=0.5, noise_profile="rolling", workers=1, out=None,
+                         on_progress=None):
+    """
+    Bounded-memory replacement for nr.reduce_noise on a whole recording.
+    Writes into ``out`` (by default in place into ``audio``) and returns it.
+    on_progress(done_samples, total_samples) is called after every block.
+    """
+    if out is None:
+        out = audio
+    pos = 0
+    for piece in iter_denoised_blocks(audio, sr, block_sec, overlap_sec, noise_profile, workers):
+        out[pos:pos + len(piece)] = piece
+        pos += len(piece)
+        if on_progress:
+            on_progress(pos, len(audio))
+    return out
+
+def preprocess_audio_array(input_path, session_dir=None, keep_intermediates=False,
+                           block_sec=30.0, noise_profile="rolling", workers=1, on_progress=None):
+    """
+    Single-pass preprocessing: FFmpeg filters piped as 16 kHz mono PCM into NumPy,
+    then noisereduce block by block, in place (block_sec=0 denoises the whole signal at once).
+    The returned array goes directly to Whisper and Vosk.
+    cleaned.wav / denoised.wav are written only with keep_intermediates.
+    """
+    import noisereduce as nr
+    import soundfile as sf
+    audio = decode_audio(input_path)
+    out_dir = session_dir or "."
+    if keep_intermediates:
+        sf.write(os.path.join(out_dir, "cleaned.wav"), audio, SAMPLE_RATE)
+
+    # 🔕 Шумоподавление
+    try:
+        if block_sec and block_sec > 0:
+            audio = reduce_noise_chunked(audio, SAMPLE_RATE, block_sec=block_sec,
+                                         noise_profile=noise_profile, workers=workers,
+                                         on_progress=on_progress)
+        else:
+            audio = nr.reduce_noise(y=audio, sr=SAMPLE_RATE).astype(np.float32, copy=False)
+    except Exception as e:
+        print(f"⚠️ Denoising failed: {e}")
+        raise PipelineError("Denoising failed") from e
+
+    if keep_intermediates:
+        sf.write(os.path.join(out_dir, "denoised.wav"), audio, SAMPLE_RATE)
+    return audio
 
 def preprocess_audio(input_path, session_dir=None, intermediate_path=None, final_path=None):
     """
@@ -22,23 +171,22 @@ def preprocess_audio(input_path, session_dir=None, intermediate_path=None, final
         if not final_path:
             final_path = "denoised.wav"
 
-    # 🧰 Проверяем наличие ffmpeg
-    if not shutil.which("ffmpeg"):
-        print("❌ FFmpeg is not installed or not in PATH.")
-        sys.exit(1)
+    import librosa
+    import noisereduce as nr
+    import soundfile as sf
+    _require_ffmpeg()
 
     # 🎧 Применяем аудиофильтры: обрезаем низкие/высокие частоты, нормализуем, подавляем шум
-    filters = "highpass=f=200, lowpass=f=3000, afftdn, dynaudnorm"
     try:
         subprocess.run(
-            ["ffmpeg", "-y", "-i", input_path, "-af", filters, intermediate_path],
+            ["ffmpeg", "-y", "-i", input_path, "-af", FFMPEG_FILTERS, intermediate_path],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             check=True
         )
     except Exception as e:
         print(f"⚠️ FFmpeg failed: {e}")
-        sys.exit(1)
+        raise PipelineError(f"FFmpeg failed on {input_path}") from e
 
     # 🔕 Шумоподавление
     try:
@@ -47,6 +195,6 @@ def preprocess_audio(input_path, session_dir=None, intermediate_path=None, final
         sf.write(final_path, y_denoised, sr)
     except Exception as e:
         print(f"⚠️ Denoising failed: {e}")
-        sys.exit(1)
+        raise PipelineError("Denoising failed") from e
 
     return final_path
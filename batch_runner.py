@@ -0,0 +1,177 @@
+"""
+batch_runner.py
+Batch mode (main.py --batch DIR|GLOB): models are loaded once and files are pipelined,
+so file N+1 is preprocessed while file N is transcribed and file N-1 is translated.
+Files already processed with the same content hash and options are skipped;
+re-encodes of audio in the result cache get the cached results.
+"""
+
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Dict, List
+
+from audio_utils import SAMPLE_RATE
+from metrics import PipelineMetrics
+from pipeline import (cached_result_stage, ensure_vosk_models, finish_session, get_session_dir,
+                      open_result_cache, preprocess_stage, store_result, transcribe_and_filter, translate_stage)
+from session_manifest import find_completed_session, options_key
+from utils import file_sha256
+
+MEDIA_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg", ".opus", ".wma",
+                    ".mp4", ".mkv", ".mov", ".avi", ".webm"}
+
+
+def collect_inputs(spec: str) -> List[str]:
+    """
+    Media files in a directory (non-recursive), or the matches of a glob pattern.
+    """
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, name) for name in os.listdir(spec)]
+        paths = [p for p in paths if os.path.isfile(p) and os.path.splitext(p)[1].lower() in MEDIA_EXTENSIONS]
+    else:
+        paths = [p for p in glob.glob(spec, recursive=True) if os.path.isfile(p)]
+    return sorted(paths)
+
+
+def _file_args(args, path: str):
+    return argparse.Namespace(**{**vars(args), "file_path": path})
+
+
+def run_batch(args) -> List[Dict[str, Any]]:
+    """
+    Process every input of args.batch and print a per-file summary table.
+    Returns the summary rows.
+    """
+    key = options_key(args)
+    items = []
+    for path in collect_inputs(args.batch):
+        item = {"file": path, "status": "pending", "sha256": file_sha256(path)}
+        existing = find_completed_session(item["sha256"], key)
+        if existing:
+            item.update(status="skipped", session_dir=existing)
+            print(f"⏭️ Skipping {path}: already processed in {existing}")
+        items.append(item)
+    todo = [item for item in items if item["status"] == "pending"]
+    if not todo:
+        print_summary(items)
+        return items
+
+    result_cache = open_result_cache(args)
+    if result_cache is not None:
+        for item in todo:
+            file_args = _file_args(args, item["file"])
+            item["session_dir"] = get_session_dir(item["file"])
+            item["metrics"] = PipelineMetrics()
+            item["metrics"].info.update(input=os.path.abspath(item["file"]), model=file_args.model)
+            cached, item["fingerprint"] = cached_result_stage(file_args, result_cache, item["session_dir"],
+                                                              item["metrics"], item["sha256"])
+            if cached is not None:
+                finish_session(file_args, item["session_dir"], item["metrics"], item["sha256"])
+                item["status"] = "cached"
+        todo = [item for item in todo if item["status"] == "pending"]
+        if not todo:
+            result_cache.close()
+            print_summary(items)
+            return items
+
+    ensure_vosk_models()
+    # очереди длиной 1: не больше одного файла «впереди» на каждом этапе
+    to_transcribe: "queue.Queue" = queue.Queue(maxsize=1)
+    to_translate: "queue.Queue" = queue.Queue(maxsize=1)
+
+    def fail(item, stage, e):
+        item.update(status="failed", error=f"{stage}: {type(e).__name__}: {e}")
+        traceback.print_exc()
+
+    def preprocess_worker():
+        try:
+            for item in todo:
+                file_args = _file_args(args, item["file"])
+                start = time.perf_counter()
+                try:
+                    if "session_dir" not in item:
+                        item["session_dir"] = get_session_dir(item["file"])
+                        item["metrics"] = PipelineMetrics()
+                        item["metrics"].info.update(input=os.path.abspath(item["file"]), model=file_args.model)
+                    audio = preprocess_stage(file_args, item["session_dir"], item["metrics"])
+                except Exception as e:
+                    fail(item, "preprocess", e)
+                    continue
+                item["preprocess_sec"] = time.perf_counter() - start
+                item["audio_sec"] = len(audio) / SAMPLE_RATE
+                to_transcribe.put((item, file_args, audio))
+        finally:
+            # без None основной поток ждал бы следующий файл вечно
+            to_transcribe.put(None)
+
+    def translate_worker():
+        while True:
+            job = to_translate.get()
+            if job is None:
+                break
+            item, file_args, segments = job
+            start = time.perf_counter()
+            try:
+                translated = translate_stage(file_args, segments, item["session_dir"], item["metrics"])
+                if result_cache is not None:
+                    store_result(file_args, result_cache, item["fingerprint"], item["session_dir"], segments, translated,
+                                 item["metrics"])
+                finish_session(file_args, item["session_dir"], item["metrics"], item["sha256"])
+                item["status"] = "done"
+            except Exception as e:
+                fail(item, "translate", e)
+            item["translate_sec"] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=preprocess_worker, daemon=True),
+               threading.Thread(target=translate_worker, daemon=True)]
+    batch_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # 🗣️ Транскрибирование — в основном потоке, одна модель на все файлы
+    while True:
+        job = to_transcribe.get()
+        if job is None:
+            break
+        item, file_args, audio = job
+        start = time.perf_counter()
+        try:
+            segments = transcribe_and_filter(file_args, audio, item["session_dir"], item["metrics"])
+        except Exception as e:
+            fail(item, "transcribe", e)
+            continue
+        finally:
+            item["transcribe_sec"] = time.perf_counter() - start
+            del audio
+        to_translate.put((item, file_args, segments))
+    to_translate.put(None)
+    for thread in threads:
+        thread.join()
+    if result_cache is not None:
+        result_cache.close()
+
+    print_summary(items, time.perf_counter() - batch_start)
+    return items
+
+
+def print_summary(items: List[Dict[str, Any]], total_sec: float = 0.0):
+    print()
+    print(f"{'file':<40} {'status':<8} {'audio s':>8} {'prep s':>7} {'asr s':>7} {'tr s':>6} {'audio-s/s':>9}")
+    total_audio = 0.0
+    for item in items:
+        audio_sec = item.get("audio_sec", 0.0)
+        busy = item.get("preprocess_sec", 0.0) + item.get("transcribe_sec", 0.0) + item.get("translate_sec", 0.0)
+        speed = audio_sec / busy if busy else 0.0
+        if item["status"] == "done":
+            total_audio += audio_sec
+        print(f"{os.path.basename(item['file'])[:40]:<40} {item['status']:<8} {audio_sec:>8.1f} "
+              f"{item.get('preprocess_sec', 0.0):>7.1f} {item.get('transcribe_sec', 0.0):>7.1f} "
+              f"{item.get('translate_sec', 0.0):>6.1f} {speed:>9.1f}")
+    if total_sec:
+        print(f"📊 {len(items)} files, {total_audio:.0f}s of audio in {total_sec:.0f}s wall "
+              f"({total_audio / total_sec:.1f} audio-s/s overall)")
@@ -0,0 +1,87 @@
+"""
+Peak RSS and throughput of whole-file nr.reduce_noise vs the chunked denoiser.
+Every variant runs in a fresh interpreter so ru_maxrss is not shared between them.
+
+    python -m benchmarks.bench_denoise --minutes 20 --workers 4
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_audio(minutes: float, seed: int = 0) -> np.ndarray:
+    # гармоники с «слоговой» огибающей поверх белого шума
+    # генерируем по минуте, чтобы временные массивы не искажали пиковый RSS
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * SAMPLE_RATE)
+    audio = np.empty(n, dtype=np.float32)
+    step = 60 * SAMPLE_RATE
+    for lo in range(0, n, step):
+        t = np.arange(lo, min(n, lo + step)) / SAMPLE_RATE
+        envelope = np.sin(2 * np.pi * 4 * t) > 0
+        voice = 0.2 * np.sin(2 * np.pi * 180 * t) + 0.1 * np.sin(2 * np.pi * 360 * t)
+        audio[lo:lo + len(t)] = voice * envelope + rng.normal(0, 0.03, len(t))
+    return audio
+
+
+def run_variant(variant: str, minutes: float, block_sec: float, workers: int) -> dict:
+    import noisereduce as nr
+    from audio_utils import reduce_noise_chunked
+
+    audio = synthetic_audio(minutes)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if variant == "whole":
+        nr.reduce_noise(y=audio, sr=SAMPLE_RATE)
+    else:
+        reduce_noise_chunked(audio, SAMPLE_RATE, block_sec=block_sec,
+                             noise_profile=variant, workers=workers)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    worker_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        "variant": variant,
+        "workers": workers if variant != "whole" else 1,
+        "peak_rss_mb": round(peak_rss / 1024, 1),
+        "extra_rss_mb": round((peak_rss - base_rss) / 1024, 1),
+        "worker_peak_rss_mb": round(worker_rss / 1024, 1),
+        "audio_sec_per_sec": round(len(audio) / SAMPLE_RATE / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--block-sec", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "WORKERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_variant(args.child[0], args.minutes, args.block_sec, int(args.child[1]))))
+        return
+
+    print(f"{args.minutes:g} min of synthetic audio, block {args.block_sec:g}s")
+    for variant, workers in [("whole", 1), ("rolling", 1), ("global", 1), ("rolling", args.workers)]:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_denoise", "--minutes", str(args.minutes),
+             "--block-sec", str(args.block_sec), "--child", variant, str(workers)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['variant']:<8} x{r['workers']:<3} peak RSS {r['peak_rss_mb']:8.1f} MB "
+              f"(+{r['extra_rss_mb']:.1f}, workers {r['worker_peak_rss_mb']:.1f} each)  "
+              f"{r['audio_sec_per_sec']:8.1f} audio-s/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Real-time factor (processing time / audio length) of each transcription engine and
+compute type on the same audio. Engines that are not installed are skipped.
+
+    python -m benchmarks.bench_engines --model tiny --audio speech.wav
+    python -m benchmarks.bench_engines --threads 8 --beam-size 5
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import SAMPLE_RATE, speech_like_audio
+from transcribe_engines import load_engine
+from transcribe_utils import transcribe_options
+
+CONFIGS = [
+    ("whisper", "default"),
+    ("faster-whisper", "float32"),
+    ("faster-whisper", "int8"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--audio", help="Audio file (default: 60s of synthetic speech-like noise)")
+    parser.add_argument("--audio-sec", type=float, default=60)
+    parser.add_argument("--device", default="auto")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--beam-size", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.audio:
+        from audio_utils import preprocess_audio_array
+        audio = preprocess_audio_array(args.audio)
+    else:
+        audio = speech_like_audio(args.audio_sec)
+    seconds = len(audio) / SAMPLE_RATE
+    options = transcribe_options(False)
+
+    print(f"🧪 {seconds:.0f}s of audio, model {args.model}")
+    print(f"{'engine':<16} {'compute':<10} {'load s':>8} {'RTF':>8} {'segments':>9}")
+    for engine, compute_type in CONFIGS:
+        try:
+            start = time.perf_counter()
+            model = load_engine(args.model, engine, args.device, compute_type, args.threads, args.beam_size)
+            loaded = time.perf_counter() - start
+        except ImportError as e:
+            print(f"{engine:<16} {compute_type:<10} ⚠️ skipped: {e}")
+            continue
+        except ValueError as e:
+            print(f"{engine:<16} {compute_type:<10} ⚠️ {e}")
+            continue
+        start = time.perf_counter()
+        result = model.transcribe(audio, **options)
+        elapsed = time.perf_counter() - start
+        print(f"{engine:<16} {compute_type:<10} {loaded:>8.2f} {elapsed / seconds:>8.3f} {len(result['segments']):>9}")
+
+
+if __name__ == "__main__":
+    main()
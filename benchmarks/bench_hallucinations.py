@@ -0,0 +1,75 @@
+"""
+Hallucination filtering at scale: the old per-marker lower()/re.sub loop vs the
+compiled HallucinationMatcher, on synthetic markers and segments.
+
+    python -m benchmarks.bench_hallucinations --markers 10000 --segments 10000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from hallucination_matcher import HallucinationMatcher
+
+WORDS = ("субтитры сделал редактор корректор спасибо за просмотр подписывайтесь на канал продолжение следует "
+         "музыка аплодисменты перевод озвучка смотрите далее ставьте лайк до встречи в следующем выпуске "
+         "thanks for watching subscribe amara org community").split()
+SPEECH = ("сегодня мы поговорим о том как устроена система и почему она работает именно так "
+          "давайте посмотрим на пример и разберём его по шагам это важный момент").split()
+
+
+def synthetic(n_markers: int, n_segments: int, seed: int = 0):
+    rng = random.Random(seed)
+    markers = sorted({" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) + f" {i}"
+                      for i in range(n_markers)})
+    segments = []
+    for _ in range(n_segments):
+        text = " ".join(rng.choice(SPEECH) for _ in range(rng.randint(5, 20)))
+        if rng.random() < 0.05:
+            text += " " + rng.choice(markers).upper()
+        segments.append(text)
+    return markers, segments
+
+
+def naive_clean(text, markers):
+    # прежняя реализация: is_hallucination + remove_hallucinations
+    if not any(marker.lower() in text.lower() for marker in markers):
+        return False, text
+    for marker in markers:
+        text = re.sub(re.escape(marker), "", text, flags=re.IGNORECASE)
+    return True, text.strip()
+
+
+def timed(fn, segments):
+    start = time.perf_counter()
+    hits = sum(fn(text)[0] for text in segments)
+    return time.perf_counter() - start, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--markers", type=int, default=10000)
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--naive-segments", type=int, default=1000, help="Run the old loop on this many segments and extrapolate")
+    args = parser.parse_args()
+
+    markers, segments = synthetic(args.markers, args.segments)
+    print(f"{len(markers)} markers x {len(segments)} segments")
+    print(f"{'variant':<12} {'build s':>8} {'match s':>8} {'hits':>6}")
+
+    sample = segments[:args.naive_segments]
+    elapsed, hits = timed(lambda t: naive_clean(t, markers), sample)
+    scale = len(segments) / len(sample)
+    print(f"{'naive':<12} {'-':>8} {elapsed * scale:>8.2f} {round(hits * scale):>6}  (extrapolated from {len(sample)})")
+
+    for mode in ("exact", "normalized", "fuzzy"):
+        start = time.perf_counter()
+        matcher = HallucinationMatcher(markers, mode)
+        build = time.perf_counter() - start
+        elapsed, hits = timed(matcher.clean, segments)
+        print(f"{mode:<12} {build:>8.2f} {elapsed:>8.2f} {hits:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Full translation of a subtitle track vs incremental re-translation after a small
+hand correction of the source (a fraction of cues edited), against a stub server.
+
+    python -m benchmarks.bench_retranslate --cues 2000 --changed 0.05 --latency 0.2
+
+The default latency is what a CPU LibreTranslate spends on a batch of ~30 cues.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import PHRASES
+from retranslate import load_previous, retranslate, translation_options, write_translation
+from translate_stub import StubLibreTranslate
+from translate_utils import TranslationClient
+
+
+def run(cues, output, url, args, full=False):
+    start = time.perf_counter()
+    with TranslationClient(url=url, batch_size=args.batch_size, max_workers=args.workers) as client:
+        options = translation_options(client)
+        known = {} if full else load_previous(output, options)[0]
+        texts, counts = retranslate(cues, known, client, on_progress=lambda d, t: None)
+        write_translation(output, cues, texts, options)
+        requests = client.stats["requests"]
+    return time.perf_counter() - start, counts, requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cues", type=int, default=2000)
+    parser.add_argument("--changed", type=float, default=0.05, help="Fraction of source cues edited")
+    parser.add_argument("--latency", type=float, default=0.2, help="Per-request server latency, seconds")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cues, t = [], 0.0
+    for i in range(args.cues):
+        text = f"{rng.choice(PHRASES).capitalize()} ({i})."
+        cues.append({"start": t, "end": t + 2.0, "text": text})
+        t += 2.0 + rng.choice((0.2, 0.5, 2.0))
+
+    TranslationClient().close()  # импорт requests не входит в замер
+    with tempfile.TemporaryDirectory() as tmp, StubLibreTranslate(latency=args.latency) as stub:
+        output = os.path.join(tmp, "output_en_translated.srt")
+        full, counts, requests = run(cues, output, stub.url, args, full=True)
+        sent = counts["retranslated"]
+        print(f"{'full':<14} {full:8.3f}s  {counts['retranslated']:>6} cues sent, {requests} requests")
+        for i in rng.sample(range(len(cues)), int(len(cues) * args.changed)):
+            cues[i] = dict(cues[i], text=cues[i]["text"].replace("(", "(правка "))
+        incremental, counts, requests = run(cues, output, stub.url, args)
+        print(f"{'incremental':<14} {incremental:8.3f}s  {counts['retranslated']:>6} cues sent, {requests} requests "
+              f"({counts['groups']} groups, {counts['reused']} reused)")
+        print(f"⚡ {full / incremental:.1f}x faster, {sent / max(1, counts['retranslated']):.0f}x fewer cues sent")
+
+
+if __name__ == "__main__":
+    main()
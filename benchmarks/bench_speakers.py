@@ -0,0 +1,68 @@
+"""
+Speaker assignment scaling: the old per-segment scan over all words vs the interval index.
+Synthetic inputs: ~2.5 words/s from 4 speakers, one Whisper segment per ~4s.
+
+    python -m benchmarks.bench_speakers --hours 1 4 8
+"""
+
+import argparse
+import random
+import time
+
+from diarization_utils import assign_speakers_to_segments
+
+
+def synthetic(hours: float, seed: int = 0):
+    rng = random.Random(seed)
+    total = hours * 3600
+    words, t, speaker = [], 0.0, "spk0"
+    while t < total:
+        if rng.random() < 0.05:
+            speaker = f"spk{rng.randrange(4)}"
+        start = t + rng.uniform(0.05, 0.3)
+        t = start + rng.uniform(0.1, 0.4)
+        words.append({"start": start, "end": t, "speaker": speaker})
+    segments, t = [], 0.0
+    while t < total:
+        start = t + rng.uniform(0.0, 1.0)
+        t = start + rng.uniform(1.0, 6.0)
+        segments.append({"start": start, "end": t})
+    return segments, words
+
+
+def naive_assign(segments, speaker_segments):
+    # прежняя реализация: полный проход по словам для каждого сегмента
+    for seg in segments:
+        max_overlap = 0
+        assigned_speaker = None
+        for spk in speaker_segments:
+            overlap = min(seg["end"], spk["end"]) - max(seg["start"], spk["start"])
+            if overlap > max_overlap and overlap > 0:
+                max_overlap = overlap
+                assigned_speaker = spk["speaker"]
+        seg["speaker"] = assigned_speaker or "Unknown"
+    return segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--naive-max-hours", type=float, default=1, help="Skip the quadratic scan above this length")
+    args = parser.parse_args()
+
+    print(f"{'hours':>5} {'words':>8} {'segments':>8} {'naive s':>9} {'index s':>9}")
+    for hours in args.hours:
+        segments, words = synthetic(hours)
+        naive = "-"
+        if hours <= args.naive_max_hours:
+            start = time.perf_counter()
+            naive_assign([dict(s) for s in segments], words)
+            naive = f"{time.perf_counter() - start:.2f}"
+        start = time.perf_counter()
+        assign_speakers_to_segments(segments, words)
+        fast = time.perf_counter() - start
+        print(f"{hours:>5g} {len(words):>8} {len(segments):>8} {naive:>9} {fast:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
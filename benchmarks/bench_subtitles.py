@@ -0,0 +1,71 @@
+"""
+Subtitle writing at scale: the old per-cue timedelta/re.sub/write loop vs the
+buffered writers, plus reading the SRT back.
+
+    python -m benchmarks.bench_subtitles --cues 1000000
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+
+from subtitle_io import read_srt, write_bilingual, write_subtitles
+
+
+def synthetic(n: int):
+    for i in range(n):
+        start = i * 2.37
+        yield {"start": start, "end": start + 1.9, "text": f" Это субтитр номер {i}, довольно обычный."}
+
+
+def old_format_timestamp(seconds):
+    td = timedelta(seconds=seconds)
+    total_seconds = int(td.total_seconds())
+    millis = int((seconds - total_seconds) * 1000)
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    secs = total_seconds % 60
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+
+def old_write_srt(filename, segments):
+    # прежняя запись: timedelta и re.sub на каждый титр, маленькие write()
+    with open(filename, "w", encoding="utf-8") as f:
+        for index, seg in enumerate(segments, 1):
+            text = re.sub(r"\s+", " ", seg["text"].replace("\n", " ").replace("\r", " ")).strip()
+            f.write(f"{index}\n{old_format_timestamp(seg['start'])} --> {old_format_timestamp(seg['end'])}\n{text}\n\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cues", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = lambda name: os.path.join(tmp, name)
+        rows = []
+
+        def run(name, fn):
+            start = time.perf_counter()
+            fn()
+            rows.append((name, time.perf_counter() - start))
+
+        run("old srt", lambda: old_write_srt(path("old.srt"), synthetic(args.cues)))
+        for fmt in ("srt", "vtt", "ass"):
+            run(f"new {fmt}", lambda: write_subtitles(path(f"new.{fmt}"), synthetic(args.cues), fmt))
+        run("bilingual srt", lambda: write_bilingual(path("bi.srt"), synthetic(args.cues), synthetic(args.cues)))
+        cues = []
+        run("read srt", lambda: cues.extend(read_srt(path("new.srt"))))
+        assert len(cues) == args.cues
+
+        print(f"{args.cues} cues")
+        print(f"{'variant':<14} {'sec':>7} {'cues/s':>10}")
+        for name, sec in rows:
+            print(f"{name:<14} {sec:>7.2f} {args.cues / sec:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Segments/sec of the legacy curl-per-segment path vs the pooled, batched TranslationClient,
+and of the asyncio engine over several replicas (one of them down with --failover).
+Runs against local stub servers, so only transport overhead is measured.
+
+    python -m benchmarks.bench_translate --segments 500 --latency 0.005
+"""
+
+import argparse
+import time
+
+from translate_async import AsyncTranslationClient
+from translate_stub import AsyncStubLibreTranslate, StubLibreTranslate
+from translate_utils import TranslationClient, translate_text_local
+
+
+def bench(label, fn, texts):
+    start = time.perf_counter()
+    result = fn(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(texts) / elapsed:10.1f} seg/s  ({elapsed:.2f}s)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005, help="Per-request server latency, seconds")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--replicas", type=int, default=3, help="Stub servers for the asyncio engine")
+    parser.add_argument("--failover", action="store_true", help="Take the first replica down")
+    args = parser.parse_args()
+
+    texts = [f"Сегмент номер {i}, немного текста для перевода." for i in range(args.segments)]
+    with StubLibreTranslate(latency=args.latency) as stub:
+        legacy = bench("curl per segment", lambda ts: [translate_text_local(t, url=stub.url) for t in ts], texts)
+        with TranslationClient(url=stub.url, batch_size=1, max_workers=1) as client:
+            bench("pooled, serial", client.translate_many, texts)
+        with TranslationClient(url=stub.url, batch_size=args.batch_size, max_workers=args.workers) as client:
+            pooled = bench(f"pooled, batch={args.batch_size} x{args.workers}", client.translate_many, texts)
+    assert legacy == pooled
+
+    replicas = [AsyncStubLibreTranslate(latency=args.latency).start() for _ in range(args.replicas)]
+    try:
+        if args.failover:
+            replicas[0].down = True
+        with AsyncTranslationClient([r.url for r in replicas], batch_size=args.batch_size,
+                                    max_concurrency=args.workers * args.replicas, per_endpoint=args.workers) as client:
+            balanced = bench(f"asyncio, {args.replicas} replicas", client.translate_many, texts)
+            print(f"requests per replica: {[r.requests for r in replicas]}, stats: {client.stats}")
+    finally:
+        for replica in replicas:
+            replica.stop()
+    assert balanced == pooled
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Deterministic stand-ins for the models, so the suite runs offline in seconds:
+FakeWhisper (model.transcribe interface) and fake_diarize (diarize_audio_vosk
+interface). load_models(real=True) uses Whisper "tiny" and the Vosk models
+instead when they are installed.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_RATE, synthetic_segments, synthetic_speaker_words
+
+
+class FakeWhisper:
+    """
+    Returns the same synthetic segments for the same audio length and seed.
+    """
+
+    name = "fake"
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        seconds = len(audio) / SAMPLE_RATE
+        return {"segments": synthetic_segments(seconds, self.seed, words=bool(options.get("word_timestamps")))}
+
+
+def fake_diarize(pcm: bytes, model_path: str = "", spk_model_path: str = "",
+                 sample_rate: int = SAMPLE_RATE, seed: int = 0) -> List[Dict[str, Any]]:
+    return synthetic_speaker_words(len(pcm) / 2 / sample_rate, seed)
+
+
+def load_models(real: bool = False, vosk_model: str = "vosk-model-ru-0.22",
+                vosk_spk: str = "vosk-model-spk-0.4") -> Tuple[Any, Callable, str]:
+    """
+    (whisper model, diarize function, description). With real=True each model is
+    used only if it can be loaded here; the rest stay fake.
+    """
+    model, diarize, labels = FakeWhisper(), fake_diarize, ["fake whisper", "fake vosk"]
+    if not real:
+        return model, diarize, ", ".join(labels)
+    try:
+        import whisper
+        model, labels[0] = whisper.load_model("tiny"), "whisper tiny"
+    except Exception as e:
+        print(f"⚠️ Real Whisper unavailable ({type(e).__name__}), using the fake")
+    try:
+        import vosk  # noqa: F401
+        if os.path.isdir(vosk_model) and os.path.isdir(vosk_spk):
+            from diarization_utils import diarize_audio_vosk
+
+            def diarize(pcm, model_path=vosk_model, spk_model_path=vosk_spk, sample_rate=SAMPLE_RATE):
+                return diarize_audio_vosk(pcm, model_path, spk_model_path, sample_rate=sample_rate)
+
+            labels[1] = "vosk"
+        else:
+            print("⚠️ Vosk models not found, using the fake")
+    except ImportError:
+        print("⚠️ Vosk not installed, using the fake")
+    return model, diarize, ", ".join(labels)
@@ -0,0 +1,192 @@
+"""
+End-to-end benchmark suite: every pipeline stage on synthetic, deterministic input,
+offline (fake Whisper/Vosk, stub LibreTranslate). Results go to a JSON file that
+can be compared with another run; --compare exits with 1 on a regression.
+
+    python -m benchmarks.run --audio-sec 120 --text-sec 7200
+    python -m benchmarks.run --compare benchmarks/results/<commit>.json --threshold 0.2
+    python -m benchmarks.run --real-models      # Whisper tiny / Vosk if installed
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.fakes import load_models
+from benchmarks.synthetic import SAMPLE_RATE, speech_like_audio, synthetic_segments, synthetic_speaker_words
+from diarization_utils import assign_speakers_to_segments, to_pcm16
+from segment_filter import load_hallucination_markers, process_segments, process_store
+from segment_post import merge_short_segments, merge_store
+from segment_stack import stack_repeated_segments, stack_store
+from segment_store import SegmentStore
+from subtitle_io import clean_store, write_srt
+from transcribe_utils import transcribe_options
+from translate_stub import StubLibreTranslate
+from translate_utils import TranslationClient, translate_segments
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Suite:
+    """
+    Times stages; each stage is run ``repeat`` times on a fresh copy of its input
+    and the fastest run is kept.
+    """
+
+    def __init__(self, repeat: int = 3):
+        self.repeat = repeat
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, name: str, fn: Callable[[Any], Any], make_input: Callable[[], Any],
+            amount: float, unit: str, repeat: Optional[int] = None) -> Any:
+        best, result = None, None
+        for _ in range(repeat or self.repeat):
+            data = make_input()
+            start = time.perf_counter()
+            result = fn(data)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        self.stages[name] = {"sec": round(best, 6), "amount": amount, "unit": unit,
+                             "per_sec": round(amount / best, 1) if best else None}
+        print(f"{name:<28} {best:>9.4f}s  {amount / best if best else 0:>12.0f} {unit}/s")
+        return result
+
+
+def run_suite(args) -> Dict[str, Any]:
+    suite = Suite(args.repeat)
+    model, diarize, models = load_models(args.real_models)
+    markers = load_hallucination_markers(args.hallucination_file)
+    audio = speech_like_audio(args.audio_sec, seed=args.seed)
+    print(f"🧪 {args.audio_sec:g}s of audio, text stages on {args.text_sec:g}s of segments, {models}")
+    print(f"{'stage':<28} {'best':>10}  {'throughput':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if shutil.which("ffmpeg") and not args.skip_preprocess:
+            from audio_utils import preprocess_audio_array
+            wav = os.path.join(tmp, "input.wav")
+            sf.write(wav, audio, SAMPLE_RATE)
+            audio = suite.run("preprocess_audio", lambda path: preprocess_audio_array(path), lambda: wav,
+                              args.audio_sec, "audio-s", repeat=1)
+        else:
+            print("⚠️ Skipping preprocess_audio (no ffmpeg or --skip-preprocess)")
+
+        options = transcribe_options(False)
+        suite.run("transcribe", lambda a: model.transcribe(a, **options)["segments"], lambda: audio,
+                  args.audio_sec, "audio-s", repeat=1)
+        suite.run("diarize", diarize, lambda: to_pcm16(audio), args.audio_sec, "audio-s", repeat=1)
+
+        raw = synthetic_segments(args.text_sec, args.seed)
+        words = synthetic_speaker_words(args.text_sec, args.seed)
+        n = len(raw)
+        with_speakers = suite.run("assign_speakers_to_segments", lambda s: assign_speakers_to_segments(s, words),
+                                  lambda: copy.deepcopy(raw), n, "segments")
+        filtered = suite.run("process_segments", lambda s: process_segments(s, tmp, hallucination_markers=markers),
+                             lambda: copy.deepcopy(with_speakers), n, "segments")
+        stacked = suite.run("stack_repeated_segments", stack_repeated_segments,
+                            lambda: copy.deepcopy(filtered), len(filtered), "segments")
+        merged = suite.run("merge_short_segments", merge_short_segments,
+                           lambda: copy.deepcopy(stacked), len(stacked), "segments")
+
+        store = SegmentStore.from_dicts(with_speakers)
+        store_out = suite.run(
+            "store_postprocess",
+            lambda s: clean_store(merge_store(stack_store(process_store(s, tmp, hallucination_markers=markers)))),
+            lambda: store.take(np.arange(len(store))), n, "segments")
+
+        srt = os.path.join(tmp, "output.srt")
+        suite.run("write_srt", lambda s: write_srt(srt, s), lambda: merged, len(merged), "segments")
+
+        with StubLibreTranslate(latency=args.translate_latency) as stub, \
+                TranslationClient(url=stub.url, batch_size=32, max_workers=4) as client:
+            suite.run("translate_segments", lambda s: translate_segments(s, client=client, on_progress=lambda d, t: None),
+                      lambda: store_out, len(store_out), "segments")
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "models": models,
+            "args": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        },
+        "stages": suite.stages,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta: float) -> int:
+    """
+    Print old vs new per stage; returns the number of stages slower than
+    baseline by more than ``threshold`` (relative) and ``min_delta`` seconds.
+    """
+    regressions = 0
+    print(f"\n📊 vs {baseline['meta'].get('commit')} ({baseline['meta'].get('created')})")
+    print(f"{'stage':<28} {'old s':>9} {'new s':>9} {'change':>8}")
+    for name, stage in current["stages"].items():
+        old = baseline["stages"].get(name)
+        if not old:
+            print(f"{name:<28} {'-':>9} {stage['sec']:>9.4f} {'new':>8}")
+            continue
+        change = stage["sec"] / old["sec"] - 1 if old["sec"] else 0.0
+        slower = change > threshold and stage["sec"] - old["sec"] > min_delta
+        regressions += slower
+        print(f"{name:<28} {old['sec']:>9.4f} {stage['sec']:>9.4f} {100 * change:>+7.1f}%{'  🔺' if slower else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--audio-sec", type=float, default=120, help="Length of the synthetic audio")
+    parser.add_argument("--text-sec", type=float, default=7200, help="Speech length the text stages' segments cover")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per text stage, the fastest counts")
+    parser.add_argument("--real-models", action="store_true", help="Use Whisper tiny / Vosk when installed")
+    parser.add_argument("--skip-preprocess", action="store_true", help="Do not time ffmpeg + noisereduce")
+    parser.add_argument("--hallucination-file", default="hallucinations.txt")
+    parser.add_argument("--translate-latency", type=float, default=0.0, help="Stub server latency per request, seconds")
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Compare with an earlier result")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown per stage, fraction")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns smaller than this, seconds")
+    args = parser.parse_args(argv)
+
+    result = run_suite(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{result['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"📁 Results: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"❌ {regressions} stage(s) slower than {args.compare} by more than {100 * args.threshold:.0f}%")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
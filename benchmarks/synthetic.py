@@ -0,0 +1,97 @@
+"""
+Deterministic synthetic inputs for the benchmark suite: speech-like audio
+(voiced syllables at ~4/s with pitch glides, formant-ish harmonics, pauses and a
+noise floor) and Whisper-shaped segments with the junk the filters exist for.
+"""
+
+import random
+from typing import Any, Dict, List
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+PHRASES = ("сегодня мы поговорим о том как устроена система", "давайте посмотрим на пример",
+           "это важный момент", "и почему она работает именно так", "разберём его по шагам",
+           "хорошо", "понятно", "да", "ну вот", "следующий вопрос был про сроки",
+           "мы это уже обсуждали на прошлой неделе", "спасибо")
+JUNK = ("Субтитры сделал DimaTorzok", "Девушки отдыхают", "Продолжение следует...")
+
+
+def speech_like_audio(seconds: float, sr: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """
+    Mono float32: phrases of 1-6 s made of 80-250 ms syllables, separated by
+    0.2-2 s pauses (every ~60 s a 5-15 s silent stretch), over low background noise.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    audio = rng.normal(0, 0.003, n).astype(np.float32)
+    pos = int(rng.uniform(0.2, 1.0) * sr)
+    next_long_pause = 60 * sr
+    while pos < n:
+        phrase_end = min(n, pos + int(rng.uniform(1.0, 6.0) * sr))
+        while pos < phrase_end:
+            length = int(rng.uniform(0.08, 0.25) * sr)
+            t = np.arange(min(length, n - pos)) / sr
+            f0 = rng.uniform(90, 220) * (1 + 0.2 * t / max(t[-1], 1e-3) * rng.choice([-1, 1])) if len(t) else 0
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+            envelope = np.sin(np.pi * np.arange(len(t)) / max(len(t), 1)) ** 2
+            audio[pos:pos + len(t)] += (rng.uniform(0.05, 0.25) * voice * envelope).astype(np.float32)
+            pos += length + int(rng.uniform(0.0, 0.06) * sr)
+        pos += int(rng.uniform(0.2, 2.0) * sr)
+        if pos > next_long_pause:
+            pos += int(rng.uniform(5, 15) * sr)
+            next_long_pause = pos + 60 * sr
+    np.clip(audio, -1.0, 1.0, out=audio)
+    return audio
+
+
+def synthetic_segments(seconds: float, seed: int = 0, words: bool = False) -> List[Dict[str, Any]]:
+    """
+    Whisper-like segments covering ``seconds``: ordinary phrases, runs of short
+    replies, repeated-phrase loops, hallucination junk and low-confidence segments.
+    """
+    rng = random.Random(seed)
+    segments, t = [], 0.0
+    while t < seconds:
+        roll = rng.random()
+        if roll < 0.04:
+            text = rng.choice(JUNK)
+        elif roll < 0.07:
+            text = " ".join([rng.choice(PHRASES)] * rng.randint(4, 12))
+        elif roll < 0.10:
+            text = rng.choice(("Спасибо.", "Угу.", "Да."))
+            for _ in range(rng.randint(5, 9)):
+                start = t + rng.uniform(0.1, 0.5)
+                t = start + rng.uniform(0.3, 0.8)
+                segments.append({"start": start, "end": t, "text": f" {text}", "no_speech_prob": 0.1})
+            continue
+        else:
+            text = " ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 4))).capitalize() + rng.choice((".", ",", "", "?"))
+        start = t + rng.uniform(0.0, 1.2)
+        t = start + max(0.4, len(text) / rng.uniform(12, 18))
+        seg = {"start": start, "end": t, "text": f" {text}",
+               "no_speech_prob": 0.9 if rng.random() < 0.02 else rng.uniform(0.0, 0.3)}
+        if words:
+            tokens = text.split()
+            step = (t - start) / len(tokens)
+            seg["words"] = [{"word": f" {w}", "start": start + i * step, "end": start + (i + 1) * step}
+                            for i, w in enumerate(tokens)]
+        segments.append(seg)
+    return segments
+
+
+def synthetic_speaker_words(seconds: float, seed: int = 0, speakers: int = 3) -> List[Dict[str, Any]]:
+    """
+    Vosk-like diarization output: ~2.5 words/s with occasional speaker changes.
+    """
+    rng = random.Random(seed)
+    words, t, speaker = [], 0.0, "spk0"
+    while t < seconds:
+        if rng.random() < 0.05:
+            speaker = f"spk{rng.randrange(speakers)}"
+        start = t + rng.uniform(0.05, 0.3)
+        t = start + rng.uniform(0.1, 0.4)
+        words.append({"start": start, "end": t, "speaker": speaker, "word": rng.choice(PHRASES).split()[0]})
+    return words
@@ -0,0 +1,116 @@
+"""
+checkpoints.py
+Per-stage artifacts of a session, content-addressed by a key derived from the
+stage's inputs and options: preprocessed audio, raw Whisper segments, diarization
+and filtered segments. A stage whose key already has an artifact - in this session
+or any other one under sessions/ - is skipped.
+
+    sessions/<name>/checkpoints/input.json
+    sessions/<name>/checkpoints/<stage>-<key>.json.gz
+    sessions/<name>/checkpoints/audio-<key>.npy
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+CHECKPOINT_DIR = "checkpoints"
+INPUT_NAME = "input.json"
+
+
+def stage_key(*parts) -> str:
+    """
+    Short hash of everything a stage's result depends on.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def audio_sha256(audio: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).data).hexdigest()
+
+
+def _replace_atomically(tmp_path: str, path: str):
+    # os.replace атомарен: прерванная запись не оставит битый чекпоинт
+    os.replace(tmp_path, path)
+
+
+def read_input(session_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Input file path and hash recorded when the session started, or None.
+    """
+    try:
+        with open(os.path.join(session_dir, CHECKPOINT_DIR, INPUT_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class CheckpointStore:
+    """
+    Checkpoints of one session dir; lookups fall back to the sibling sessions,
+    and artifacts found there are linked (or copied) into this session.
+    """
+
+    def __init__(self, session_dir: str):
+        self.session_dir = session_dir
+        self.dir = os.path.join(session_dir, CHECKPOINT_DIR)
+        self.sessions_root = os.path.dirname(os.path.abspath(session_dir))
+        self.hits: List[str] = []
+        os.makedirs(self.dir, exist_ok=True)
+
+    def write_input(self, input_path: str, input_sha256: str):
+        path = os.path.join(self.dir, INPUT_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"input": os.path.abspath(input_path), "sha256": input_sha256}, f, ensure_ascii=False, indent=2)
+        _replace_atomically(path + ".tmp", path)
+
+    def _find(self, name: str) -> Optional[str]:
+        local = os.path.join(self.dir, name)
+        if os.path.exists(local):
+            return local
+        pattern = os.path.join(glob.escape(self.sessions_root), "*", CHECKPOINT_DIR, glob.escape(name))
+        for other in sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True):
+            try:
+                os.link(other, local + ".tmp")
+            except OSError:
+                shutil.copyfile(other, local + ".tmp")
+            _replace_atomically(local + ".tmp", local)
+            return local
+        return None
+
+    def load_json(self, stage: str, key: str) -> Optional[Any]:
+        path = self._find(f"{stage}-{key}.json.gz")
+        if path is None:
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        self.hits.append(stage)
+        return data
+
+    def save_json(self, stage: str, key: str, data: Any) -> str:
+        path = os.path.join(self.dir, f"{stage}-{key}.json.gz")
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=float)
+        _replace_atomically(path + ".tmp", path)
+        return path
+
+    def load_audio(self, key: str) -> Optional[np.ndarray]:
+        path = self._find(f"audio-{key}.npy")
+        if path is None:
+            return None
+        self.hits.append("audio")
+        return np.load(path)
+
+    def save_audio(self, key: str, audio: np.ndarray) -> str:
+        path = os.path.join(self.dir, f"audio-{key}.npy")
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(audio, dtype=np.float32))
+        _replace_atomically(path + ".tmp", path)
+        return path
@@ -3,45 +3,87 @@ diarization_utils.py
 Speaker diarization utilities using Vosk (no registration or tokens required).
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Union
+import bisect
+import functools
 import wave
 import os
 
-try:
-    from vosk import Model, KaldiRecognizer, SpkModel
-except ImportError:
-    Model = None
-    KaldiRecognizer = None
-    SpkModel = None
+import numpy as np
 
 
-def diarize_audio_vosk(audio_path: str, model_path: str = "vosk-model-small-ru-0.22", spk_model_path: str = "vosk-model-spk-0.4") -> List[Dict[str, Any]]:
+def to_pcm16(audio: np.ndarray, block: int = 1 << 20) -> bytes:
     """
-    Run speaker diarization using Vosk and return a list of speaker segments.
-    Each segment: {"start": float, "end": float, "speaker": str}
+    Float samples in [-1, 1] -> little-endian 16-bit PCM as Vosk expects it.
+    Converted block by block, so no full-length float temporaries are made.
+    """
+    pcm = np.empty(len(audio), dtype="<i2")
+    for i in range(0, len(audio), block):
+        chunk = np.clip(audio[i:i + block], -1.0, 1.0)
+        chunk *= 32767
+        pcm[i:i + block] = chunk
+    return pcm.tobytes()
+
+
+def _wav_frames(path: str, frames: int) -> Iterator[bytes]:
+    wf = wave.open(path, "rb")
+    try:
+        while True:
+            data = wf.readframes(frames)
+            if len(data) == 0:
+                break
+            yield data
+    finally:
+        wf.close()
+
+
+@functools.lru_cache(maxsize=None)
+def load_vosk_models(model_path: str, spk_model_path: str):
+    """
+    Load the Vosk recognition and speaker models once per process.
     """
-    if Model is None or KaldiRecognizer is None or SpkModel is None:
-        raise ImportError("vosk is not installed. Please install it with 'pip install vosk'.")
+    try:
+        from vosk import Model, SpkModel, SetLogLevel
+    except ImportError:
+        raise ImportError("vosk is not installed. Please install it with 'pip install vosk'.") from None
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Vosk model not found at {model_path}. Download from https://alphacephei.com/vosk/models")
     if not os.path.exists(spk_model_path):
         raise FileNotFoundError(f"Vosk speaker model not found at {spk_model_path}. Download from https://alphacephei.com/vosk/models")
+    # логи Kaldi в stderr не нужны: диаризация идёт параллельно с Whisper
+    SetLogLevel(-1)
+    return Model(model_path), SpkModel(spk_model_path)
 
-    wf = wave.open(audio_path, "rb")
-    model = Model(model_path)
-    spk_model = SpkModel(spk_model_path)
-    rec = KaldiRecognizer(model, wf.getframerate(), spk_model)
+
+def diarize_audio_vosk(audio: Union[str, bytes, np.ndarray], model_path: str = "vosk-model-small-ru-0.22", spk_model_path: str = "vosk-model-spk-0.4", sample_rate: int = 16000, frame_sec: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Run speaker diarization using Vosk and return a list of speaker segments.
+    ``audio`` is a mono 16-bit WAV path, 16-bit PCM bytes (see to_pcm16) or a float32
+    array at ``sample_rate`` (the same array that is given to Whisper).
+    Audio is fed to the recognizer in frames of frame_sec seconds.
+    Each segment: {"start": float, "end": float, "speaker": str}
+    """
+    model, spk_model = load_vosk_models(model_path, spk_model_path)
+    from vosk import KaldiRecognizer
+
+    frames = max(1, int(frame_sec * sample_rate))
+    if isinstance(audio, str):
+        with wave.open(audio, "rb") as wf:
+            sample_rate = wf.getframerate()
+        chunks = _wav_frames(audio, max(1, int(frame_sec * sample_rate)))
+    else:
+        pcm = audio if isinstance(audio, bytes) else to_pcm16(audio)
+        step = 2 * frames
+        chunks = (pcm[i:i + step] for i in range(0, len(pcm), step))
+
+    rec = KaldiRecognizer(model, sample_rate, spk_model)
     rec.SetWords(True)
     results = []
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
+    for data in chunks:
         if rec.AcceptWaveform(data):
             res = rec.Result()
             results.append(res)
     results.append(rec.FinalResult())
-    wf.close()
 
     import json
     speaker_segments = []
@@ -52,25 +94,99 @@ def diarize_audio_vosk(audio_path: str, model_path: str = "vosk-model-small-ru-0
                 speaker_segments.append({
                     "start": word['start'],
                     "end": word['end'],
+                    "word": word.get('word', ""),
                     "speaker": f"spk{jres['spk']}"
                 })
     return speaker_segments
 
 
-def assign_speakers_to_segments(segments: List[Dict[str, Any]], speaker_segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def merge_speaker_turns(speaker_segments: List[Dict[str, Any]], max_gap: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    Merge consecutive same-speaker words (time-sorted) into turns when the pause
+    between them is at most max_gap seconds.
+    """
+    turns = []
+    for spk in sorted(speaker_segments, key=lambda s: s["start"]):
+        last = turns[-1] if turns else None
+        if last and last["speaker"] == spk["speaker"] and spk["start"] - last["end"] <= max_gap:
+            last["end"] = max(last["end"], spk["end"])
+        else:
+            turns.append({"start": spk["start"], "end": spk["end"], "speaker": spk["speaker"]})
+    return turns
+
+
+class SpeakerIndex:
+    """
+    Sorted interval index over speaker turns.
+    A query touches only the turns that can overlap [start, end): binary search on
+    turn starts, then a backwards scan bounded by the running maximum of turn ends.
+    """
+
+    def __init__(self, turns: List[Dict[str, Any]]):
+        self.turns = sorted(turns, key=lambda t: t["start"])
+        self.starts = [t["start"] for t in self.turns]
+        self.max_end = []
+        running = float("-inf")
+        for t in self.turns:
+            running = max(running, t["end"])
+            self.max_end.append(running)
+
+    def votes(self, start: float, end: float) -> Dict[str, float]:
+        """
+        Overlap seconds per speaker within [start, end), in order of first appearance.
+        """
+        hits = []
+        j = bisect.bisect_left(self.starts, end) - 1
+        while j >= 0 and self.max_end[j] > start:
+            t = self.turns[j]
+            overlap = min(end, t["end"]) - max(start, t["start"])
+            if overlap > 0:
+                hits.append((t["speaker"], overlap))
+            j -= 1
+        votes: Dict[str, float] = {}
+        for speaker, overlap in reversed(hits):
+            votes[speaker] = votes.get(speaker, 0.0) + overlap
+        return votes
+
+    def speaker_for(self, start: float, end: float, default: str = "Unknown") -> str:
+        votes = self.votes(start, end)
+        if not votes:
+            return default
+        return max(votes, key=votes.get)
+
+
+def assign_speakers_to_segments(segments: List[Dict[str, Any]], speaker_segments: List[Dict[str, Any]],
+                                word_level: bool = False, max_gap: float = 0.5) -> List[Dict[str, Any]]:
     """
     Assign speaker labels to Whisper segments based on overlap with diarization segments.
+    Words are merged into speaker turns first; each segment gets the speaker with the
+    largest total overlap. With word_level, Whisper words (if present) are labelled too.
     Adds a 'speaker' key to each segment.
     """
+    index = SpeakerIndex(merge_speaker_turns(speaker_segments, max_gap))
     for seg in segments:
-        seg_start = seg.get("start", 0)
-        seg_end = seg.get("end", 0)
-        max_overlap = 0
-        assigned_speaker = None
-        for spk in speaker_segments:
-            overlap = min(seg_end, spk["end"]) - max(seg_start, spk["start"])
-            if overlap > max_overlap and overlap > 0:
-                max_overlap = overlap
-                assigned_speaker = spk["speaker"]
-        seg["speaker"] = assigned_speaker or "Unknown"
+        seg["speaker"] = index.speaker_for(seg.get("start", 0), seg.get("end", 0))
+        if word_level:
+            for word in seg.get("words") or []:
+                word["speaker"] = index.speaker_for(word["start"], word["end"], default=seg["speaker"])
+    return segments
+
+
+def attach_words(segments: List[Dict[str, Any]], words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Give segments without Whisper word timestamps the Vosk words whose midpoint
+    falls inside them (used to place subtitle splits at real word boundaries).
+    Both lists are walked once in time order.
+    """
+    words = sorted(words, key=lambda w: w["start"])
+    j = 0
+    for seg in sorted(segments, key=lambda s: s["start"]):
+        while j < len(words) and (words[j]["start"] + words[j]["end"]) / 2 < seg["start"]:
+            j += 1
+        k = j
+        while k < len(words) and (words[k]["start"] + words[k]["end"]) / 2 < seg["end"]:
+            k += 1
+        if not seg.get("words") and k > j:
+            seg["words"] = [{"word": w.get("word", ""), "start": w["start"], "end": w["end"]} for w in words[j:k]]
+        j = k
     return segments
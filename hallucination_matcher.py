@@ -0,0 +1,193 @@
+"""
+hallucination_matcher.py
+Pre-built matcher for hallucination phrases (Whisper's outro/credits junk).
+All markers are compiled once into a single trie-shaped regex, so detection and
+removal are one pass over the segment text regardless of the number of markers.
+
+Modes:
+    exact       case-insensitive substring match (the historical behaviour)
+    normalized  casefold, ё→е, punctuation and extra whitespace ignored
+    fuzzy       normalized, plus near matches of whole word windows (difflib)
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+MODES = ("exact", "normalized", "fuzzy")
+
+_NON_WORD = re.compile(r"[\W_]+")
+_WORD = re.compile(r"[^\W_]")
+_WORDS = re.compile(r"\w+")
+
+
+def normalize_for_match(text: str) -> str:
+    """
+    Casefold, ё→е, every run of punctuation/whitespace becomes one space.
+    """
+    return _NON_WORD.sub(" ", text.casefold().replace("ё", "е")).strip()
+
+
+def normalize_with_map(text: str) -> Tuple[str, List[int]]:
+    """
+    normalize_for_match plus, for every output character, its index in ``text``.
+    """
+    out: List[str] = []
+    index: List[int] = []
+    gap = True
+    for i, ch in enumerate(text):
+        if not _WORD.match(ch):
+            if not gap:
+                out.append(" ")
+                index.append(i)
+                gap = True
+            continue
+        for c in ch.casefold().replace("ё", "е"):
+            out.append(c)
+            index.append(i)
+        gap = False
+    if out and out[-1] == " ":
+        out.pop()
+        index.pop()
+    return "".join(out), index
+
+
+def _build_trie(words: Iterable[str]) -> Dict:
+    root: Dict = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return root
+
+
+def _trie_to_regex(node: Dict) -> str:
+    alternatives = [re.escape(ch) + _trie_to_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not alternatives:
+        return ""
+    optional = "" in node
+    if len(alternatives) == 1 and not optional:
+        return alternatives[0]
+    # жадный «?» — при совпадении предпочитается самый длинный маркер
+    return "(?:" + "|".join(alternatives) + ")" + ("?" if optional else "")
+
+
+def compile_markers(markers: Iterable[str], flags: int = 0) -> "re.Pattern":
+    """
+    One regex matching any of ``markers``; shared prefixes are factored out,
+    so the regex engine does not try every marker at every position.
+    """
+    return re.compile(_trie_to_regex(_build_trie(markers)), flags)
+
+
+class HallucinationMatcher:
+    """
+    Compiled marker set. Behaves like the marker list it was built from
+    (len, iteration, truthiness), so existing callers keep working.
+    """
+
+    def __init__(self, markers: Iterable[str], mode: str = "exact", fuzzy_threshold: float = 0.85):
+        if mode not in MODES:
+            raise ValueError(f"unknown hallucination match mode: {mode}")
+        self.markers = [m for m in markers if m.strip()]
+        self.mode = mode
+        self.fuzzy_threshold = fuzzy_threshold
+        if mode == "exact":
+            self.pattern = compile_markers({m.lower() for m in self.markers}, re.IGNORECASE)
+        else:
+            self.normalized = sorted({n for n in map(normalize_for_match, self.markers) if n})
+            self.pattern = compile_markers(self.normalized)
+        if mode == "fuzzy":
+            self._by_word: Dict[str, Set[int]] = {}
+            for i, marker in enumerate(self.normalized):
+                for word in marker.split():
+                    if len(word) >= 3:
+                        self._by_word.setdefault(word, set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self.markers)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.markers)
+
+    def __bool__(self) -> bool:
+        return bool(self.markers)
+
+    def _fuzzy_spans(self, words: List[Tuple[int, int]], norm: str) -> List[Tuple[int, int]]:
+        tokens = [norm[s:e] for s, e in words]
+        candidates = set()
+        for token in tokens:
+            candidates.update(self._by_word.get(token, ()))
+        spans = []
+        for i in sorted(candidates):
+            marker = self.normalized[i]
+            size = marker.count(" ") + 1
+            matcher = SequenceMatcher(None, autojunk=False)
+            matcher.set_seq2(marker)
+            best, best_span = 0.0, None
+            for n in {max(1, size - 1), size, size + 1}:
+                for k in range(0, len(words) - n + 1):
+                    window = norm[words[k][0]:words[k + n - 1][1]]
+                    matcher.set_seq1(window)
+                    if matcher.real_quick_ratio() < self.fuzzy_threshold or matcher.quick_ratio() < self.fuzzy_threshold:
+                        continue
+                    ratio = matcher.ratio()
+                    if ratio >= self.fuzzy_threshold and ratio > best:
+                        best, best_span = ratio, (words[k][0], words[k + n - 1][1])
+            if best_span:
+                spans.append(best_span)
+        return spans
+
+    def find_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        (start, end) character ranges of ``text`` covered by markers, sorted and merged.
+        """
+        if not self.pattern.pattern:
+            return []
+        if self.mode == "exact":
+            return [m.span() for m in self.pattern.finditer(text)]
+
+        norm = normalize_for_match(text)
+        found = self.pattern.search(norm) is not None
+        if not found and self.mode != "fuzzy":
+            return []
+        norm, index = normalize_with_map(text)
+        spans = [m.span() for m in self.pattern.finditer(norm)]
+        if not spans and self.mode == "fuzzy":
+            spans = self._fuzzy_spans([m.span() for m in _WORDS.finditer(norm)], norm)
+        result: List[Tuple[int, int]] = []
+        for s, e in sorted(spans):
+            start, end = index[s], index[e - 1] + 1
+            # хвостовая пунктуация маркера («...», «!») уходит вместе с ним
+            while end < len(text) and not text[end].isspace() and not _WORD.match(text[end]):
+                end += 1
+            if result and start <= result[-1][1]:
+                result[-1] = (result[-1][0], max(result[-1][1], end))
+            else:
+                result.append((start, end))
+        return result
+
+    def search(self, text: str) -> bool:
+        if self.mode == "exact":
+            return bool(self.pattern.pattern) and self.pattern.search(text) is not None
+        return bool(self.find_spans(text))
+
+    def clean(self, text: str) -> Tuple[bool, str]:
+        """
+        Detect and remove markers in one pass: (found, stripped text without them).
+        """
+        if not self.pattern.pattern:
+            return False, text.strip()
+        if self.mode == "exact":
+            cleaned, count = self.pattern.subn("", text)
+            return count > 0, cleaned.strip()
+        spans = self.find_spans(text)
+        if not spans:
+            return False, text.strip()
+        parts, pos = [], 0
+        for start, end in spans:
+            parts.append(text[pos:start])
+            pos = end
+        parts.append(text[pos:])
+        return True, "".join(parts).strip()
@@ -1,154 +1,185 @@
-
-import sys
 import os
-from datetime import datetime
-
-# --- Перенаправление stderr Vosk в файл до любых импортов vosk/diarization_utils ---
-
-# --- Перенаправление stderr Vosk в файл, но только после определения session_dir ---
-
-
-from audio_utils import preprocess_audio
-from segment_filter import process_segments, load_hallucination_markers
-from segment_stack import stack_repeated_segments
-from segment_post import merge_short_segments
-from subtitle_io import write_srt, remove_leading_dash, remove_final_dot_if_single_sentence
-from translate_utils import translate_segments
-from visual_log import show_progress_block, show_stage_complete
-from diarization_utils import diarize_audio_vosk, assign_speakers_to_segments
-import urllib.request
-import tarfile
-
-import whisper
+import sys
 import argparse
-import time
-
-def get_session_dir(audio_path, dt=None):
-    base = os.path.splitext(os.path.basename(audio_path))[0]
-    if dt is None:
-        dt = datetime.now()
-    session = f"sessions/{base}_" + dt.strftime("%Y-%m-%d_%H-%M-%S")
-    os.makedirs(session, exist_ok=True)
-    return session
-
-def download_and_extract(url, dest_dir):
-    import os
-    import shutil
-    import zipfile
-    filename = url.split('/')[-1]
-    archive_path = os.path.join(dest_dir, filename)
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
-    if not os.path.exists(archive_path):
-        print(f"Downloading {filename}...")
-        urllib.request.urlretrieve(url, archive_path)
-    print(f"Extracting {filename}...")
-    if filename.endswith('.zip'):
-        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-            zip_ref.extractall(dest_dir)
-    else:
-        with tarfile.open(archive_path, 'r:*') as tar:
-            tar.extractall(dest_dir)
-    # Remove archive after extraction
-    os.remove(archive_path)
-
-def main():
-    import sys
-    parser = argparse.ArgumentParser(description="DimaTorzok v1.0.0 - Russian Audio Transcription and Translation")
-    parser.add_argument("file_path", help="Path to input media file")
+
+# Тяжёлые зависимости (torch, noisereduce/scipy, vosk, requests) импортируются
+# только внутри подкоманды, которой они нужны: --help и перевод стартуют мгновенно
+from translate_utils import DEFAULT_TRANSLATE_URL
+from transcribe_engines import COMPUTE_TYPES, ENGINES
+from utils import PipelineError
+
+COMMANDS = ("transcribe", "translate", "diarize", "export", "cache")
+
+def add_translation_arguments(parser):
+    parser.add_argument("--translate-url", default=DEFAULT_TRANSLATE_URL, help="LibreTranslate /translate endpoint")
+    parser.add_argument("--translate-endpoints", nargs="+", metavar="URL",
+                        help="Several LibreTranslate /translate endpoints, load-balanced with failover (overrides --translate-url)")
+    parser.add_argument("--translate-batch-size", type=int, default=32, help="Segments per translation request")
+    parser.add_argument("--translate-workers", type=int, default=4, help="Concurrent translation requests (per endpoint with --translate-endpoints)")
+    parser.add_argument("--translation-model-version", default="libretranslate", help="Tag of the translation models, part of the cache key")
+    parser.add_argument("--translation-cache-size", type=int, default=200_000, help="Max entries in the translation cache")
+    parser.add_argument("--no-translation-cache", action="store_true", help="Do not use the persistent translation cache")
+
+def add_preprocess_arguments(parser):
+    parser.add_argument("--vad", action="store_true",
+                        help="Send only speech regions (energy VAD) to Whisper and Vosk; timestamps stay on the original timeline")
+    parser.add_argument("--vad-margin-db", type=float, default=10.0, help="Speech threshold above the noise floor, dB")
+    parser.add_argument("--vad-min-silence", type=float, default=0.8, help="Shorter pauses are kept as speech, seconds")
+    parser.add_argument("--denoise-block-sec", type=float, default=30.0, help="Denoise in blocks of this length (0 = whole file at once)")
+    parser.add_argument("--denoise-workers", type=int, default=1, help="Processes for block denoising")
+    parser.add_argument("--noise-profile", choices=["rolling", "global"], default="rolling", help="Noise estimate per block or once for the whole file")
+    parser.add_argument("--keep-intermediates", action="store_true", help="Also write cleaned.wav, denoised.wav and the preprocessed-audio checkpoint to the session dir")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py [transcribe]", description="DimaTorzok v1.0.0 - Russian Audio Transcription and Translation",
+        epilog="Other commands: translate, diarize, export, cache (main.py <command> --help). "
+               "Without a command, main.py runs transcribe.")
+    parser.add_argument("file_path", nargs="?", help="Path to input media file")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB", help="Process every media file in a directory (or matching a glob) with shared models")
     parser.add_argument("--model", default="large", help="Whisper model (base, small, medium, turbo, large)")
+    parser.add_argument("--engine", choices=ENGINES, default="whisper",
+                        help="Transcription backend: openai-whisper or faster-whisper (CTranslate2)")
+    parser.add_argument("--device", default="auto", help="cpu, cuda, cuda:1, ... (auto: CUDA when available)")
+    parser.add_argument("--compute-type", choices=COMPUTE_TYPES, default="default",
+                        help="Precision; faster-whisper defaults to int8 on CPU, float16 on CUDA")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for the model (0: library default; per worker with --workers)")
+    parser.add_argument("--beam-size", type=int, help="Beam search width (default: greedy decoding)")
     parser.add_argument("--hallucination-file", help="Path to hallucination phrases file")
-    args = parser.parse_args()
-
-    # фиксируем время запуска один раз
-    session_dir = get_session_dir(args.file_path)
-    # Перенаправляем stderr Vosk сразу в нужный vosk.log
-    vosk_log_path = os.path.join(session_dir, "vosk.log")
-    vosk_log_file = open(vosk_log_path, "w", encoding="utf-8")
-    old_stderr = sys.stderr
-    sys.stderr = vosk_log_file
-
-    # Проверяем и скачиваем Vosk модели при необходимости
-    vosk_model_url = "https://alphacephei.com/vosk/models/vosk-model-ru-0.22.zip"
-    vosk_spk_url = "https://alphacephei.com/vosk/models/vosk-model-spk-0.4.zip"
-    vosk_model_dir = "vosk-model-ru-0.22"
-    vosk_spk_dir = "vosk-model-spk-0.4"
-    if not os.path.exists(vosk_model_dir):
-        download_and_extract(vosk_model_url, ".")
-    if not os.path.exists(vosk_spk_dir):
-        download_and_extract(vosk_spk_url, ".")
-
-    # 🔊 Этап 1: Предобработка аудио
-    show_progress_block("🧼 Audio preprocessing...", 100, {
-        "speed": "simulated 120x",
-        "bitrate": "1411kbit/s"
-    })
-    cleaned_audio = preprocess_audio(args.file_path, session_dir=session_dir)
-    show_stage_complete("✅ Preprocessing complete.")
-
-    # 🔄 Этап 2: Загрузка модели
-    print(f"🔄 Loading Whisper model: {args.model}")
-    model = whisper.load_model(args.model)
-
-    # 🗣️ 🤖 Этап 3: Транскрибирование
-    print("🗣️ 🤖 Transcribing audio...")
-    start_time = time.time()
-    result = model.transcribe(
-        cleaned_audio,
-        language="Russian",
-        condition_on_previous_text=False,
-        verbose=False,
-        temperature=0
-    )
-    elapsed = time.time() - start_time
-    segments = result["segments"]
-    rate = round(len(segments) / elapsed, 2)
-    show_progress_block("🗣️ 🤖 Transcribing audio...", 100, {
-        "segments": len(segments),
-        "rate": f"{rate} seg/s"
-    })
-
-    # Диаризация Vosk
-    show_progress_block("🔎 Running speaker diarization (Vosk)...", 30, {"stage": "diarization"})
+    parser.add_argument("--hallucination-mode", choices=["exact", "normalized", "fuzzy"], default="exact",
+                        help="Phrase matching: case-insensitive substring, normalized (ё/punctuation-insensitive) or fuzzy")
+    add_translation_arguments(parser)
+    parser.add_argument("--subtitle-formats", nargs="+", choices=["srt", "vtt", "ass"], default=["srt"],
+                        help="Subtitle formats to write (srt is always written)")
+    parser.add_argument("--word-timestamps", action="store_true",
+                        help="Ask Whisper for word timestamps and cut long subtitles at real word times")
+    parser.add_argument("--max-cps", type=float, default=20.0,
+                        help="Reading speed limit (chars/s) for split subtitles; 0 disables")
+    parser.add_argument("--bilingual", action="store_true", help="Also write a combined RU+EN track (output_bilingual.*)")
+    parser.add_argument("--stream", action="store_true", help="Transcribe, filter and translate window by window as results arrive")
+    parser.add_argument("--window-sec", type=float, default=30.0, help="Max window length in --stream mode, seconds")
+    parser.add_argument("--workers", type=int, default=1, help="Transcribe chunks of the file in N worker processes")
+    add_preprocess_arguments(parser)
+    parser.add_argument("--resume", metavar="SESSION", help="Continue in an existing session dir, skipping stages with checkpoints")
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="Do not look up or store results in the audio-fingerprint result cache")
+    parser.add_argument("--result-cache-size", type=float, default=500, help="Max size of the result cache, MB")
+    parser.add_argument("--no-checkpoints", action="store_true", help="Do not save or reuse per-stage checkpoints")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run under cProfile and write profile.pstats to the session dir")
+    return parser
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.resume:
+        if args.batch:
+            parser.error("--resume does not support --batch")
+        if not os.path.isdir(args.resume):
+            parser.error(f"no such session: {args.resume}")
+        from checkpoints import read_input
+        recorded = read_input(args.resume)
+        if not args.file_path:
+            if recorded is None:
+                parser.error(f"{args.resume} has no checkpoints; give file_path")
+            args.file_path = recorded["input"]
+    args.subtitle_formats = ["srt"] + [f for f in dict.fromkeys(args.subtitle_formats) if f != "srt"]
+    if args.stream and args.workers > 1:
+        parser.error("--stream and --workers cannot be combined")
+    if args.stream and args.vad:
+        parser.error("--stream and --vad cannot be combined (stream windows are already cut at pauses)")
+    if bool(args.file_path) == bool(args.batch):
+        parser.error("give either file_path or --batch")
+    if args.batch and args.stream:
+        parser.error("--batch does not support --stream")
+    return args
+
+def build_cache_parser():
+    parser = argparse.ArgumentParser(prog="main.py cache", description="Inspect or shrink the result cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Entries, size and hits")
+    prune = commands.add_parser("prune", help="Drop old entries and shrink the cache to a size")
+    prune.add_argument("--max-size", type=float, help="Target size, MB (default: --result-cache-size default)")
+    prune.add_argument("--older-than", type=float, metavar="DAYS", help="Also drop entries unused for this many days")
+    return parser
+
+def cache_main(argv):
+    from result_cache import ResultCache
+    args = build_cache_parser().parse_args(argv)
+    with ResultCache() as cache:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"🗃️ Result cache: {stats['path']}")
+            print(f"   {stats['entries']} entries, {stats['bytes'] / (1 << 20):.1f} of "
+                  f"{stats['max_bytes'] / (1 << 20):.0f} MB, {stats['hits']} hits")
+        else:
+            max_bytes = None if args.max_size is None else int(args.max_size * (1 << 20))
+            older_than = None if args.older_than is None else args.older_than * 86400
+            removed, freed = cache.prune(max_bytes=max_bytes, older_than=older_than)
+            print(f"🧹 Removed {removed} entries, freed {freed / (1 << 20):.1f} MB")
+
+def build_translate_parser():
+    parser = argparse.ArgumentParser(prog="main.py translate",
+                                     description="Translate an existing subtitle track (no audio, no models); only changed cues are re-sent")
+    parser.add_argument("source", help="Session dir (its output_ru.srt) or a .srt/.vtt file")
+    parser.add_argument("-o", "--output", help="Translated file (default: output_en_translated.srt in the session, else <name>_en.srt)")
+    parser.add_argument("--previous", help="Earlier translation to reuse unchanged cues from (default: the output file and its .manifest.json)")
+    parser.add_argument("--full", action="store_true", help="Translate every cue again, ignoring the earlier translation")
+    add_translation_arguments(parser)
+    return parser
+
+def build_diarize_parser():
+    parser = argparse.ArgumentParser(prog="main.py diarize",
+                                     description="Speaker diarization (Vosk) only; writes speakers.json")
+    parser.add_argument("file_path", help="Path to input media file")
+    add_preprocess_arguments(parser)
+    return parser
+
+def build_export_parser():
+    parser = argparse.ArgumentParser(prog="main.py export",
+                                     description="Re-write a session's subtitles in other formats")
+    parser.add_argument("session", help="Session dir with output_ru.srt / output_en_translated.srt")
+    parser.add_argument("--subtitle-formats", nargs="+", choices=["srt", "vtt", "ass"], default=["vtt"],
+                        help="Formats to write; the .srt tracks are read, never rewritten (srt applies to --bilingual)")
+    parser.add_argument("--bilingual", action="store_true", help="Also write a combined RU+EN track (output_bilingual.*)")
+    return parser
+
+def translate_main(argv):
+    from pipeline import run_translate
+    run_translate(build_translate_parser().parse_args(argv))
+
+def diarize_main(argv):
+    from pipeline import run_diarize
+    run_diarize(build_diarize_parser().parse_args(argv))
+
+def export_main(argv):
+    from pipeline import run_export
+    args = build_export_parser().parse_args(argv)
+    if not os.path.isdir(args.session):
+        build_export_parser().error(f"no such session: {args.session}")
+    args.subtitle_formats = list(dict.fromkeys(args.subtitle_formats))
+    run_export(args)
+
+def transcribe_main(argv):
+    args = parse_args(argv)
+    if args.batch:
+        from batch_runner import run_batch
+        run_batch(args)
+    else:
+        from pipeline import run_pipeline
+        run_pipeline(args)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # без подкоманды — transcribe, как раньше: main.py file.mp3 [options]
+    command, rest = (argv[0], argv[1:]) if argv[:1] and argv[0] in COMMANDS else ("transcribe", argv)
+    handler = {"transcribe": transcribe_main, "translate": translate_main, "diarize": diarize_main,
+               "export": export_main, "cache": cache_main}[command]
     try:
-        speaker_segments = diarize_audio_vosk(cleaned_audio, vosk_model_dir, vosk_spk_dir)
-        show_stage_complete("✅ Speaker diarization complete.")
-    except Exception as e:
-        print(f"[WARN] Speaker diarization failed: {e}")
-        speaker_segments = None
-    finally:
-        sys.stderr = old_stderr
-        vosk_log_file.close()
-
-    # Присваиваем спикеров сегментам, если удалось получить diarization
-    if speaker_segments:
-        segments = assign_speakers_to_segments(segments, speaker_segments)
-
-    show_stage_complete("✅ Transcription finished.")
-
-    # 📜 Этап 4: Фильтрация и стакание
-    hallucinations = load_hallucination_markers(args.hallucination_file)
-    segments = process_segments(segments, session_dir, hallucination_markers=hallucinations)
-    segments = stack_repeated_segments(segments)
-    segments = merge_short_segments(segments, min_word_count=3, max_pause=1.0)
-
-    # Удаляем тире в начале и точку в конце только перед записью и переводом
-    segments = remove_leading_dash(segments)
-    segments = remove_final_dot_if_single_sentence(segments)
-
-    print("📜 Writing Russian subtitles...")
-    write_srt(os.path.join(session_dir, "output_ru.srt"), segments)
-    print(f"📁 Saved: {os.path.join(session_dir, 'output_ru.srt')}")
-    print(f"📁 Repetition log: {os.path.join(session_dir, 'repetitions.log')}")
-
-    # 🌍 Этап 5: Перевод
-    print("🌍 Translating subtitles... [segments:", len(segments), "]")
-    translated = translate_segments(segments)
-    translated = remove_leading_dash(translated)
-    translated = remove_final_dot_if_single_sentence(translated)
-    show_stage_complete("✅ Translation complete.")
-    write_srt(os.path.join(session_dir, "output_en_translated.srt"), translated)
-    print(f"📁 Saved: {os.path.join(session_dir, 'output_en_translated.srt')}\n")
+        handler(rest)
+    except PipelineError:
+        # сообщение уже напечатано; прочие ошибки (CUDA, загрузка модели) — с трейсбеком
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
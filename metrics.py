@@ -0,0 +1,135 @@
+"""
+metrics.py
+Per-stage instrumentation: wall and CPU time, RSS, audio-seconds per second and
+stage counters, written as metrics.json into the session dir.
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+def _maxrss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class PipelineMetrics:
+    """
+    Collects one record per stage. Stages may run on different threads;
+    cpu_sec is process-wide CPU time, so it overlaps for concurrent stages.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._children0 = _children_cpu()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.info: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, audio_sec: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Time a stage. The yielded dict takes extra counters (segments, requests, ...).
+        """
+        record: Dict[str, Any] = {}
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        children0 = _children_cpu()
+        peak0 = _maxrss_mb()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall0
+            record.update({
+                "wall_sec": round(wall, 3),
+                "cpu_sec": round(time.process_time() - cpu0, 3),
+                "child_cpu_sec": round(_children_cpu() - children0, 3),
+                # ru_maxrss — пик за всю жизнь процесса; прирост показывает, поднял ли его сам этап
+                "process_peak_rss_mb": round(_maxrss_mb(), 1),
+                "peak_rss_growth_mb": round(_maxrss_mb() - peak0, 1),
+                "rss_mb": round(current_rss_mb() or 0.0, 1),
+            })
+            if audio_sec:
+                record["audio_sec"] = round(audio_sec, 2)
+                record["audio_sec_per_sec"] = round(audio_sec / wall, 2) if wall else None
+            with self._lock:
+                self.stages[name] = record
+
+    def count(self, name: str, **values):
+        """
+        Add counters to a stage record (created if the stage was not timed).
+        """
+        with self._lock:
+            self.stages.setdefault(name, {}).update(values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: dict(record) for name, record in self.stages.items()}
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "total_wall_sec": round(time.perf_counter() - self._t0, 3),
+            "total_cpu_sec": round(time.process_time() - self._cpu0, 3),
+            "total_child_cpu_sec": round(_children_cpu() - self._children0, 3),
+            "peak_rss_mb": round(_maxrss_mb(), 1),
+            **self.info,
+            "stages": stages,
+        }
+
+    def write(self, session_dir: str) -> str:
+        path = os.path.join(session_dir, "metrics.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<14} {'wall s':>8} {'cpu s':>8} {'peak +MB':>8} {'audio-s/s':>9}"]
+        for name, r in self.to_dict()["stages"].items():
+            if "wall_sec" not in r:
+                continue
+            speed = r.get("audio_sec_per_sec")
+            lines.append(f"{name:<14} {r['wall_sec']:>8.2f} {r['cpu_sec']:>8.2f} {r['peak_rss_growth_mb']:>8.0f} "
+                         f"{speed if speed is not None else '-':>9}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def maybe_profile(session_dir: str, enabled: bool):
+    """
+    Run the block under cProfile and dump profile.pstats into the session dir
+    (open with `python -m pstats`, snakeviz, or convert with flameprof/gprof2dot).
+    """
+    if not enabled:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(session_dir, "profile.pstats")
+        profiler.dump_stats(path)
+        print(f"📁 Profile: {path}")
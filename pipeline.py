@@ -0,0 +1,637 @@
+"""
+pipeline.py
+The transcription pipeline split into stages, so that the CLI, the daemon and
+batch mode can run them with models that stay loaded between files.
+"""
+
+import functools
+import json
+import os
+import tarfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from audio_utils import preprocess_audio_array, FFMPEG_FILTERS, SAMPLE_RATE
+from segment_filter import process_store, load_hallucination_markers
+from segment_stack import stack_store
+from segment_post import merge_store
+from segment_store import SegmentStore, as_store
+from subtitle_io import write_subtitles, write_bilingual, clean_store, clean_cue_text, read_subtitles
+from translate_utils import translate_segments, TranslationClient
+from translation_cache import TranslationCache
+from visual_log import ProgressBar, show_stage_complete
+from diarization_utils import diarize_audio_vosk, assign_speakers_to_segments, attach_words, merge_speaker_turns, to_pcm16
+from stream_pipeline import run_stream
+from transcribe_utils import transcribe_options, transcribe_parallel, format_chunk_report
+from transcribe_engines import engine_key, engine_options, load_engine
+from session_manifest import options_key, write_manifest
+from result_cache import ResultCache
+from retranslate import load_previous, retranslate, translation_options, write_translation
+from vad import SpeechMap, vad_options
+from metrics import PipelineMetrics, maybe_profile
+from checkpoints import CheckpointStore, audio_sha256, stage_key
+from utils import PipelineError, file_sha256
+
+VOSK_MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-ru-0.22.zip"
+VOSK_SPK_URL = "https://alphacephei.com/vosk/models/vosk-model-spk-0.4.zip"
+VOSK_MODEL_DIR = "vosk-model-ru-0.22"
+VOSK_SPK_DIR = "vosk-model-spk-0.4"
+
+def get_session_dir(audio_path, dt=None):
+    """
+    Create a new session directory; never returns one that already exists
+    (same basename in the same second gets a _2, _3... suffix).
+    """
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    if dt is None:
+        dt = datetime.now()
+    session = f"sessions/{base}_" + dt.strftime("%Y-%m-%d_%H-%M-%S")
+    os.makedirs("sessions", exist_ok=True)
+    candidate, n = session, 1
+    while True:
+        try:
+            # mkdir атомарно «занимает» каталог даже между потоками и процессами
+            os.mkdir(candidate)
+            return candidate
+        except FileExistsError:
+            n += 1
+            candidate = f"{session}_{n}"
+
+def download_and_extract(url, dest_dir):
+    import zipfile
+    filename = url.split('/')[-1]
+    archive_path = os.path.join(dest_dir, filename)
+    if not os.path.exists(dest_dir):
+        os.makedirs(dest_dir)
+    if not os.path.exists(archive_path):
+        print(f"Downloading {filename}...")
+        urllib.request.urlretrieve(url, archive_path)
+    print(f"Extracting {filename}...")
+    if filename.endswith('.zip'):
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            zip_ref.extractall(dest_dir)
+    else:
+        with tarfile.open(archive_path, 'r:*') as tar:
+            tar.extractall(dest_dir)
+    # Remove archive after extraction
+    os.remove(archive_path)
+
+def ensure_vosk_models():
+    # Проверяем и скачиваем Vosk модели при необходимости
+    if not os.path.exists(VOSK_MODEL_DIR):
+        download_and_extract(VOSK_MODEL_URL, ".")
+    if not os.path.exists(VOSK_SPK_DIR):
+        download_and_extract(VOSK_SPK_URL, ".")
+
+@functools.lru_cache(maxsize=None)
+def load_whisper_model(name, engine="whisper", device="auto", compute_type="default", threads=0, beam_size=None):
+    """
+    Load a transcription engine once per process; later calls with the same
+    settings return the same instance.
+    """
+    print(f"🔄 Loading Whisper model: {name} ({engine})")
+    return load_engine(name, engine, device, compute_type, threads, beam_size)
+
+def make_translation_client(args):
+    cache = None if args.no_translation_cache else TranslationCache(max_entries=args.translation_cache_size)
+    if args.translate_endpoints:
+        from translate_async import AsyncTranslationClient
+        client = AsyncTranslationClient(args.translate_endpoints, batch_size=args.translate_batch_size,
+                                        max_concurrency=args.translate_workers * len(args.translate_endpoints),
+                                        per_endpoint=args.translate_workers,
+                                        model_version=args.translation_model_version)
+    else:
+        client = TranslationClient(url=args.translate_url, batch_size=args.translate_batch_size,
+                                   max_workers=args.translate_workers,
+                                   model_version=args.translation_model_version)
+    return client, cache
+
+def print_translation_stats(client, cache):
+    print(f"🌍 Translation requests: {client.stats['requests']} for {client.stats['segments']} unique segments")
+    if cache is not None:
+        print(f"🗃️ Translation cache: {cache.summary()}")
+    if "fallbacks" in client.stats:
+        print(f"🔁 Translation retries: {client.stats['retries']}, kept untranslated: {client.stats['fallbacks']}, "
+              f"breaker trips: {client.stats['breaker_trips']}")
+
+def translation_counters(client, cache):
+    counters = {
+        "requests": client.stats["requests"],
+        "failed_requests": client.stats["failed_requests"],
+        "batch_splits": client.stats["splits"],
+        "sent_segments": client.stats["segments"],
+        "sentence_groups": client.stats["groups"],
+    }
+    for key in ("retries", "fallbacks", "breaker_trips"):
+        if key in client.stats:
+            counters[key] = client.stats[key]
+    if cache is not None:
+        counters.update(cache_hits=cache.hits, cache_misses=cache.misses)
+    return counters
+
+def progress_callback(title, unit, scale=1.0):
+    """
+    on_progress(done, total) callback that opens a ProgressBar on the first event.
+    """
+    bar = None
+
+    def on_progress(done, total):
+        nonlocal bar
+        if bar is None:
+            bar = ProgressBar(title, round(total * scale, 1), unit=unit)
+        bar.set(round(done * scale, 1))
+        if done >= total:
+            bar.close()
+
+    return on_progress
+
+def subtitle_formats(args):
+    return getattr(args, "subtitle_formats", None) or ["srt"]
+
+def write_tracks(args, session_dir, name, segments):
+    """
+    Write one subtitle track in every requested format (srt always comes first).
+    """
+    for fmt in subtitle_formats(args):
+        path = os.path.join(session_dir, f"{name}.{fmt}")
+        write_subtitles(path, segments, fmt, max_cps=getattr(args, "max_cps", None) or None)
+        print(f"📁 Saved: {path}")
+
+# 🔊 Этап 1: Предобработка аудио
+def preprocess_stage(args, session_dir, metrics):
+    print("🧼 Audio preprocessing...")
+    with metrics.stage("preprocess") as record:
+        audio = preprocess_audio_array(args.file_path, session_dir=session_dir,
+                                       keep_intermediates=args.keep_intermediates,
+                                       block_sec=args.denoise_block_sec,
+                                       noise_profile=args.noise_profile,
+                                       workers=args.denoise_workers,
+                                       on_progress=progress_callback("🔕 Denoising...", "audio-s", 1 / SAMPLE_RATE))
+        record["audio_sec"] = len(audio) / SAMPLE_RATE
+    audio_sec = len(audio) / SAMPLE_RATE
+    metrics.info["audio_sec"] = round(audio_sec, 2)
+    metrics.count("preprocess", audio_sec_per_sec=round(audio_sec / metrics.stages["preprocess"]["wall_sec"], 2))
+    show_stage_complete(f"✅ Preprocessing complete. [{audio_sec:.0f}s of audio]")
+    return audio
+
+# 🗣️ 🤖 Этап 3: Транскрибирование
+def transcribe_stage(args, audio, metrics):
+    audio_sec = len(audio) / SAMPLE_RATE
+    if args.workers > 1:
+        print(f"🧵 Parallel transcription: {args.workers} workers, model {args.model} ({engine_options(args)['engine']})")
+        with metrics.stage("transcribe", audio_sec=audio_sec) as record:
+            segments, chunk_report = transcribe_parallel(
+                args.model, audio, SAMPLE_RATE, args.workers,
+                on_progress=progress_callback("🗣️ 🤖 Transcribing audio...", "chunks"),
+                word_timestamps=getattr(args, "word_timestamps", False), engine_options=engine_options(args))
+            record["segments"] = len(segments)
+            record["chunks"] = chunk_report
+        print(format_chunk_report(chunk_report))
+    else:
+        with metrics.stage("model_load"):
+            model = load_whisper_model(args.model, **engine_options(args))
+        print("🗣️ 🤖 Transcribing audio...")
+        with metrics.stage("transcribe", audio_sec=audio_sec) as record:
+            options = transcribe_options(getattr(args, "word_timestamps", False))
+            segments = model.transcribe(audio, verbose=False, **options)["segments"]
+            record["segments"] = len(segments)
+    # прогресс показывают сами события (бар по чанкам или бар Whisper при verbose=False)
+    speed = metrics.stages["transcribe"]["audio_sec_per_sec"]
+    show_stage_complete(f"✅ Transcribed {len(segments)} segments [{speed}x realtime]")
+    return segments
+
+# Диаризация Vosk
+def diarize_stage(pcm, session_dir, metrics):
+    """
+    Diarize 16 kHz 16-bit PCM; the outcome is recorded in the session's vosk.log.
+    Safe to run on a background thread next to transcription.
+    """
+    start_time = time.time()
+    with open(os.path.join(session_dir, "vosk.log"), "w", encoding="utf-8") as vosk_log_file, \
+            metrics.stage("diarize", audio_sec=len(pcm) / 2 / SAMPLE_RATE) as record:
+        try:
+            speaker_segments = diarize_audio_vosk(pcm, VOSK_MODEL_DIR, VOSK_SPK_DIR, sample_rate=SAMPLE_RATE)
+            vosk_log_file.write(f"words: {len(speaker_segments)}, {time.time() - start_time:.1f}s\n")
+            record["words"] = len(speaker_segments)
+            show_stage_complete("✅ Speaker diarization complete.")
+        except Exception as e:
+            vosk_log_file.write(f"diarization failed: {type(e).__name__}: {e}\n")
+            record["error"] = f"{type(e).__name__}: {e}"
+            metrics.info["diarization_failed"] = True
+            print(f"[WARN] Speaker diarization failed: {e}")
+            speaker_segments = None
+    return speaker_segments
+
+# 📜 Этап 4: Фильтрация и стакание
+def postprocess_stage(args, segments, session_dir, metrics):
+    hallucinations = load_hallucination_markers(args.hallucination_file, getattr(args, "hallucination_mode", "exact"))
+    with metrics.stage("filter") as record:
+        record["segments_in"] = len(segments)
+        rejected = {}
+        segments = process_store(as_store(segments), session_dir, hallucination_markers=hallucinations, reasons=rejected)
+        record["segments_out"] = len(segments)
+        record["rejected"] = rejected
+    with metrics.stage("stack") as record:
+        segments = stack_store(segments)
+        record["segments_out"] = len(segments)
+    with metrics.stage("merge") as record:
+        segments = merge_store(segments, min_word_count=3, max_pause=1.0)
+
+        # Удаляем тире в начале и точку в конце только перед записью и переводом
+        segments = clean_store(segments)
+        record["segments_out"] = len(segments)
+
+    print("📜 Writing Russian subtitles...")
+    with metrics.stage("srt_write"):
+        write_tracks(args, session_dir, "output_ru", segments)
+    print(f"📁 Repetition log: {os.path.join(session_dir, 'repetitions.log')}")
+    return segments
+
+# 🌍 Этап 5: Перевод
+def translate_stage(args, segments, session_dir, metrics):
+    client, cache = make_translation_client(args)
+    with metrics.stage("translate") as record, client:
+        translated = translate_segments(as_store(segments), client=client, cache=cache)
+        translated = clean_store(translated)
+        record["segments"] = len(segments)
+        record.update(translation_counters(client, cache))
+        # сегменты, оставшиеся без перевода: такой результат не кладём в кэш результатов
+        record["failed_segments"] = len(client.failed)
+    if client.failed:
+        metrics.info["translation_failed_segments"] = len(client.failed)
+    show_stage_complete("✅ Translation complete.")
+    with metrics.stage("srt_write_en"):
+        write_tracks(args, session_dir, "output_en_translated", translated)
+        if getattr(args, "bilingual", False):
+            for fmt in subtitle_formats(args):
+                path = os.path.join(session_dir, f"output_bilingual.{fmt}")
+                write_bilingual(path, segments, translated, fmt)
+                print(f"📁 Saved: {path}")
+    print_translation_stats(client, cache)
+    if cache is not None:
+        cache.close()
+    return translated
+
+# 🌊 Потоковый режим: окна → фильтрация → перевод, без диаризации
+def stream_stage(args, audio, session_dir, metrics):
+    with metrics.stage("model_load"):
+        model = load_whisper_model(args.model, **engine_options(args))
+    print(f"🌊 Streaming transcription in {args.window_sec:g}s windows...")
+    hallucinations = load_hallucination_markers(args.hallucination_file, getattr(args, "hallucination_mode", "exact"))
+    client, cache = make_translation_client(args)
+    with metrics.stage("stream", audio_sec=len(audio) / SAMPLE_RATE) as record, client:
+        count = run_stream(model, audio, session_dir, client, cache,
+                           hallucination_markers=hallucinations, window_sec=args.window_sec,
+                           word_timestamps=getattr(args, "word_timestamps", False),
+                           max_cps=getattr(args, "max_cps", None) or None)
+        record["segments"] = count
+        record.update(translation_counters(client, cache))
+    show_stage_complete(f"✅ Streaming complete. [segments: {count}]")
+    print(f"📁 Saved: {os.path.join(session_dir, 'output_ru.srt')}")
+    print(f"📁 Saved: {os.path.join(session_dir, 'output_en_translated.srt')}")
+    print_translation_stats(client, cache)
+    if cache is not None:
+        cache.close()
+
+# 🔇 Отсев тишины перед Whisper и Vosk
+def vad_stage(args, audio, session_dir, metrics):
+    """
+    Detect speech regions; returns (speech-only audio, SpeechMap). The map is saved
+    as speech_map.json so timestamps can be traced back to the original audio.
+    """
+    with metrics.stage("vad", audio_sec=len(audio) / SAMPLE_RATE) as record:
+        speech_map = SpeechMap.detect(audio, SAMPLE_RATE, **vad_options(args))
+        compact = speech_map.compact(audio)
+        record.update(regions=len(speech_map.regions), speech_sec=round(speech_map.speech_sec, 2),
+                      skipped_fraction=round(speech_map.skipped_fraction, 4))
+    with open(os.path.join(session_dir, "speech_map.json"), "w", encoding="utf-8") as f:
+        json.dump(speech_map.to_dict(), f)
+    metrics.info["vad_skipped_fraction"] = round(speech_map.skipped_fraction, 4)
+    show_stage_complete(f"🔇 VAD: {len(speech_map.regions)} speech regions, {speech_map.speech_sec:.0f}s of "
+                        f"{speech_map.total_sec:.0f}s kept ({100 * speech_map.skipped_fraction:.1f}% skipped)")
+    return compact, speech_map
+
+def transcribe_and_diarize(args, audio, session_dir, metrics, transcribe=True, diarize=True):
+    """
+    Run Whisper and Vosk diarization (whichever is requested) on the same audio.
+    Diarization runs on a background thread over a shared int16 copy of the audio
+    while Whisper transcribes, so the stage takes max(transcribe, diarize).
+    With --vad both see only the speech regions; their timestamps are mapped back.
+    Returns (segments, speaker_segments); a skipped step returns None.
+    """
+    speech_map = None
+    if vad_options(args) is not None:
+        audio, speech_map = vad_stage(args, audio, session_dir, metrics)
+        if not len(audio):
+            return ([] if transcribe else None), ([] if diarize else None)
+    segments = speaker_segments = None
+    pcm = to_pcm16(audio) if diarize else None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        if diarize:
+            print("🔎 Running speaker diarization (Vosk) in the background...")
+            diarization = pool.submit(diarize_stage, pcm, session_dir, metrics)
+        if transcribe:
+            segments = transcribe_stage(args, audio, metrics)
+        if diarize:
+            speaker_segments = diarization.result()
+    del pcm
+    if speech_map is not None:
+        segments = speech_map.remap_segments(segments) if segments is not None else None
+        speaker_segments = speech_map.remap_segments(speaker_segments) if speaker_segments is not None else None
+    return segments, speaker_segments
+
+def filter_stage(args, segments, speaker_segments, session_dir, metrics):
+    # Присваиваем спикеров сегментам, если удалось получить diarization
+    if speaker_segments:
+        with metrics.stage("assign_speakers"):
+            segments = assign_speakers_to_segments(segments, speaker_segments)
+            # слова Vosk — для разрезания длинных титров по паузам, если у Whisper их нет
+            segments = attach_words(segments, speaker_segments)
+
+    show_stage_complete("✅ Transcription finished.")
+    return postprocess_stage(args, segments, session_dir, metrics)
+
+def transcribe_and_filter(args, audio, session_dir, metrics):
+    """
+    Transcription, diarization and post-processing; writes output_ru.srt.
+    """
+    segments, speaker_segments = transcribe_and_diarize(args, audio, session_dir, metrics)
+    return filter_stage(args, segments, speaker_segments, session_dir, metrics)
+
+def checkpointed_transcribe(args, session_dir, metrics, store, input_sha256):
+    """
+    transcribe_and_filter with per-stage checkpoints: preprocessed audio (only with
+    --keep-intermediates, otherwise preprocessing runs again when needed), raw Whisper
+    segments, diarization and filtered segments (with repetitions.log) are each
+    reused when their key (a hash of the stage's inputs and options) already has
+    an artifact.
+    Returns the filtered segments.
+    """
+    prep_key = stage_key("preprocess", input_sha256, FFMPEG_FILTERS, SAMPLE_RATE,
+                         args.denoise_block_sec, args.noise_profile)
+    meta = store.load_json("preprocess", prep_key)
+    audio = None
+    if meta is None:
+        audio = preprocess_stage(args, session_dir, metrics)
+        meta = {"audio_sha256": audio_sha256(audio), "samples": len(audio)}
+        # float32 .npy — ~230 МБ на час аудио, поэтому только по --keep-intermediates
+        if getattr(args, "keep_intermediates", False):
+            store.save_audio(prep_key, audio)
+        store.save_json("preprocess", prep_key, meta)
+    metrics.info["audio_sec"] = round(meta["samples"] / SAMPLE_RATE, 2)
+
+    transcribe_key = stage_key("transcribe", meta["audio_sha256"], args.model, args.workers,
+                               transcribe_options(getattr(args, "word_timestamps", False)), vad_options(args),
+                               engine_key(args))
+    diarize_key = stage_key("diarize", meta["audio_sha256"], VOSK_MODEL_DIR, VOSK_SPK_DIR, vad_options(args))
+    markers = args.hallucination_file
+    filter_key = stage_key("filter", transcribe_key, diarize_key, getattr(args, "hallucination_mode", "exact"),
+                           file_sha256(markers) if markers and os.path.exists(markers) else None)
+
+    rep_log_path = os.path.join(session_dir, "repetitions.log")
+    checkpoint = store.load_json("filter", filter_key)
+    if checkpoint is not None:
+        print("♻️ Reusing filtered segments from checkpoint")
+        # журнал отброшенных сегментов хранится вместе с чекпоинтом
+        with open(rep_log_path, "w", encoding="utf-8") as f:
+            f.write(checkpoint["repetitions_log"])
+        filtered = SegmentStore.from_dicts(checkpoint["segments"])
+        write_tracks(args, session_dir, "output_ru", filtered)
+        return filtered
+
+    segments = store.load_json("transcribe", transcribe_key)
+    speaker_segments = store.load_json("diarize", diarize_key)
+    if segments is not None:
+        print("♻️ Reusing Whisper segments from checkpoint")
+    if speaker_segments is not None:
+        print("♻️ Reusing speaker diarization from checkpoint")
+    if segments is None or speaker_segments is None:
+        if audio is None:
+            audio = store.load_audio(prep_key)
+        if audio is None:
+            audio = preprocess_stage(args, session_dir, metrics)
+            if getattr(args, "keep_intermediates", False):
+                store.save_audio(prep_key, audio)
+        fresh_segments, fresh_speakers = transcribe_and_diarize(
+            args, audio, session_dir, metrics,
+            transcribe=segments is None, diarize=speaker_segments is None)
+        del audio
+        if segments is None:
+            segments = fresh_segments
+            store.save_json("transcribe", transcribe_key, segments)
+        if speaker_segments is None and fresh_speakers is not None:
+            # неудачную диаризацию не сохраняем — повторим при следующем запуске
+            speaker_segments = fresh_speakers
+            store.save_json("diarize", diarize_key, speaker_segments)
+
+    # фильтры меняют сегменты на месте, чекпоинт уже записан
+    segments = [dict(seg) for seg in segments]
+    filtered = filter_stage(args, segments, speaker_segments, session_dir, metrics)
+    # без спикеров результат неполный: ключ filter совпадёт и Vosk больше не запустится
+    if speaker_segments is not None:
+        with open(rep_log_path, encoding="utf-8") as f:
+            store.save_json("filter", filter_key, {"segments": filtered.to_dicts(), "repetitions_log": f.read()})
+    return filtered
+
+def open_result_cache(args):
+    """
+    The shared result cache, or None when disabled. --stream runs are not cached.
+    """
+    if getattr(args, "no_result_cache", False) or getattr(args, "stream", False):
+        return None
+    return ResultCache(max_bytes=int(getattr(args, "result_cache_size", 500) * (1 << 20)))
+
+def cached_result_stage(args, result_cache, session_dir, metrics, input_sha256):
+    """
+    Look the input's audio up in the result cache; on a hit the stored subtitles are
+    copied into session_dir. Returns (stored results or None, fingerprint for put()).
+    """
+    with metrics.stage("result_cache") as record:
+        entry, fingerprint = result_cache.lookup(options_key(args), args.file_path, input_sha256)
+        record["hit"] = entry is not None
+        results = result_cache.restore(entry, session_dir) if entry else None
+    if entry:
+        metrics.info["result_cache"] = os.path.basename(entry)
+        print(f"♻️ Same audio was already processed with these options, reusing results ({os.path.basename(entry)})")
+        for name in sorted(os.listdir(session_dir)):
+            if name.startswith("output_"):
+                print(f"📁 Saved: {os.path.join(session_dir, name)}")
+    return results, fingerprint
+
+def result_complete(metrics):
+    """
+    False when diarization failed or some segments were left untranslated.
+    """
+    return not metrics.info.get("diarization_failed") and not metrics.info.get("translation_failed_segments")
+
+def store_result(args, result_cache, fingerprint, session_dir, segments, translated, metrics):
+    if not result_complete(metrics):
+        print("⚠️ Result not cached: diarization or translation failed")
+        return
+    result_cache.put(options_key(args), fingerprint, args.file_path, session_dir,
+                     {"ru": as_store(segments).to_dicts(), "en": as_store(translated).to_dicts()})
+
+def finish_session(args, session_dir, metrics, input_sha256=None):
+    """
+    Write metrics.json and manifest.json once all outputs of a file exist.
+    """
+    path = metrics.write(session_dir)
+    print(metrics.summary())
+    print(f"📁 Metrics: {path}")
+    write_manifest(session_dir, args.file_path, input_sha256 or file_sha256(args.file_path), args)
+
+def run_pipeline(args, session_dir=None):
+    """
+    Process one file end to end into session_dir (by default the --resume session
+    or a new timestamped one). Audio already in the result cache is not processed
+    again; otherwise stages with a matching checkpoint are skipped.
+    Models are taken from the per-process caches, so repeated calls reuse them.
+    Returns the session directory.
+    """
+    if session_dir is None:
+        session_dir = getattr(args, "resume", None) or get_session_dir(args.file_path)
+    metrics = PipelineMetrics()
+    metrics.info.update(input=os.path.abspath(args.file_path), model=args.model)
+    input_sha256 = file_sha256(args.file_path)
+    store = None
+    if not getattr(args, "no_checkpoints", False):
+        store = CheckpointStore(session_dir)
+        store.write_input(args.file_path, input_sha256)
+
+    result_cache = open_result_cache(args)
+    if result_cache is not None:
+        cached, fingerprint = cached_result_stage(args, result_cache, session_dir, metrics, input_sha256)
+        if cached is not None:
+            result_cache.close()
+            finish_session(args, session_dir, metrics, input_sha256)
+            print()
+            return session_dir
+
+    ensure_vosk_models()
+    with maybe_profile(session_dir, getattr(args, "profile", False)):
+        if args.stream:
+            audio = preprocess_stage(args, session_dir, metrics)
+            stream_stage(args, audio, session_dir, metrics)
+        else:
+            if store is not None:
+                segments = checkpointed_transcribe(args, session_dir, metrics, store, input_sha256)
+                metrics.info["checkpoint_hits"] = store.hits
+            else:
+                audio = preprocess_stage(args, session_dir, metrics)
+                segments = transcribe_and_filter(args, audio, session_dir, metrics)
+                del audio
+            translated = translate_stage(args, segments, session_dir, metrics)
+            if result_cache is not None:
+                store_result(args, result_cache, fingerprint, session_dir, segments, translated, metrics)
+                result_cache.close()
+    finish_session(args, session_dir, metrics, input_sha256)
+    print()
+    return session_dir
+
+# 🔎 Отдельные подкоманды: только диаризация, только перевод, только экспорт
+def run_diarize(args, session_dir=None):
+    """
+    Preprocess and diarize one file without Whisper; writes speakers.json
+    (speaker turns and Vosk words) to the session dir. Returns the session directory.
+    """
+    session_dir = session_dir or get_session_dir(args.file_path)
+    metrics = PipelineMetrics()
+    metrics.info.update(input=os.path.abspath(args.file_path))
+    ensure_vosk_models()
+    audio = preprocess_stage(args, session_dir, metrics)
+    _, words = transcribe_and_diarize(args, audio, session_dir, metrics, transcribe=False)
+    if words is None:
+        print("❌ Speaker diarization failed")
+        raise PipelineError("Speaker diarization failed")
+    path = os.path.join(session_dir, "speakers.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"turns": merge_speaker_turns(words), "words": words}, f, ensure_ascii=False)
+    print(f"📁 Saved: {path}")
+    print(metrics.summary())
+    metrics.write(session_dir)
+    return session_dir
+
+def translation_paths(source, output=None):
+    """
+    (source track, translated track): a session dir means its output_ru.srt and
+    output_en_translated.srt, a subtitle file foo.srt is translated into foo_en.srt.
+    """
+    if os.path.isdir(source):
+        return os.path.join(source, "output_ru.srt"), output or os.path.join(source, "output_en_translated.srt")
+    base, ext = os.path.splitext(source)
+    if output:
+        return source, output
+    if os.path.basename(base) == "output_ru":
+        return source, os.path.join(os.path.dirname(base), "output_en_translated" + ext)
+    return source, f"{base}_en{ext}"
+
+def run_translate(args):
+    """
+    Translate an existing subtitle track (e.g. a hand-corrected output_ru.srt)
+    without touching audio or models. With a manifest from an earlier run only
+    changed, new or previously failed cues (and the sentences around them) are
+    translated again. Returns the translated file's path; raises PipelineError
+    after writing it when some cues could not be translated.
+    """
+    source, output = translation_paths(args.source, args.output)
+    cues = [dict(cue, text=clean_cue_text(cue["text"])) for cue in read_subtitles(source)]
+    metrics = PipelineMetrics()
+    client, cache = make_translation_client(args)
+    options = translation_options(client)
+    known, reason = ({}, "--full") if getattr(args, "full", False) else load_previous(output, options, args.previous)
+    if reason:
+        print(f"🌍 Translating {len(cues)} cues from {source} ({reason})")
+    failed = set()
+    with metrics.stage("translate") as record, client:
+        translated, counts = retranslate(cues, known, client, cache,
+                                         on_progress=progress_callback("🌍 Translating subtitles...", "segments"),
+                                         failed=failed)
+        record["segments"] = len(cues)
+        record.update(counts)
+        record.update(translation_counters(client, cache))
+    if not reason:
+        print(f"♻️ Reused {counts['reused']} of {counts['cues']} cues, "
+              f"translated {counts['retranslated']} in {counts['groups']} sentence groups")
+    write_translation(output, cues, translated, options, failed=failed)
+    print(f"📁 Saved: {output}")
+    print_translation_stats(client, cache)
+    if cache is not None:
+        cache.close()
+    if client.failed:
+        print(f"⚠️ {len(failed)} cues were not translated; run again to retry them")
+        raise PipelineError(f"{len(client.failed)} texts failed to translate")
+    return output
+
+def run_export(args):
+    """
+    Convert a session's Russian and English .srt tracks to the requested formats
+    (and the bilingual track), cue for cue. The .srt tracks themselves are never
+    rewritten: they may carry hand edits and the retranslation manifest's cue layout.
+    """
+    tracks = {}
+    for name in ("output_ru", "output_en_translated"):
+        path = os.path.join(args.session, f"{name}.srt")
+        if os.path.exists(path):
+            tracks[name] = [dict(cue, text=clean_cue_text(cue["text"])) for cue in read_subtitles(path)]
+    if not tracks:
+        print(f"❌ No output_*.srt in {args.session}")
+        raise PipelineError(f"nothing to export in {args.session}")
+    for name, cues in tracks.items():
+        for fmt in subtitle_formats(args):
+            if fmt == "srt":
+                continue
+            path = os.path.join(args.session, f"{name}.{fmt}")
+            # ширина без ограничения: титры уже разрезаны, число титров не меняется
+            write_subtitles(path, cues, fmt, width=max((len(c["text"]) for c in cues), default=0))
+            print(f"📁 Saved: {path}")
+    if getattr(args, "bilingual", False) and len(tracks) == 2:
+        if len(tracks["output_ru"]) != len(tracks["output_en_translated"]):
+            print("⚠️ Russian and English tracks have different cues; bilingual track skipped")
+            return args.session
+        for fmt in subtitle_formats(args):
+            path = os.path.join(args.session, f"output_bilingual.{fmt}")
+            write_bilingual(path, tracks["output_ru"], tracks["output_en_translated"], fmt)
+            print(f"📁 Saved: {path}")
+    return args.session
@@ -0,0 +1,274 @@
+"""
+result_cache.py
+Content cache of finished results (filtered segments, translation, subtitle files),
+keyed on an audio fingerprint of the decoded PCM plus the options key, so a
+re-upload of the same recording - another container, codec or bitrate - is answered
+without running ffmpeg filters, noisereduce, Whisper or Vosk again.
+
+Fingerprint: the decoded audio at 8 kHz, 256 ms frames every 128 ms, 33 log-spaced
+bands between 300 and 3000 Hz; one bit per adjacent band pair and frame, set when the
+band energy difference grows from the previous frame (Haitsma & Kalker). Re-encoding
+flips few bits, different audio flips about half. Two files match when their bit
+error rate is under ``max_ber`` at the best of a few frame offsets.
+
+    <cache dir>/results/index.sqlite3
+    <cache dir>/results/<entry id>/segments.json.gz, output_*.srt|vtt|ass
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils import get_cache_dir
+
+FP_RATE = 8000
+FP_FRAME = 2048
+FP_HOP = 1024
+FP_BANDS = 33
+_EDGES = np.round(np.geomspace(300, 3000, FP_BANDS + 1) * FP_FRAME / FP_RATE).astype(int)
+_WINDOW = np.hanning(FP_FRAME).astype(np.float32)
+
+
+class AudioFingerprint(NamedTuple):
+    sha256: str
+    duration: float
+    bits: Optional[np.ndarray]  # (frames, 4) uint8, 32 бита на кадр; None если не удалось декодировать
+
+
+def _band_energies(pcm: np.ndarray) -> np.ndarray:
+    if len(pcm) < FP_FRAME:
+        return np.empty((0, FP_BANDS), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(pcm, FP_FRAME)[::FP_HOP] * _WINDOW
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    return np.add.reduceat(power[:, _EDGES[0]:_EDGES[-1]], _EDGES[:-1] - _EDGES[0], axis=1).astype(np.float32)
+
+
+def energies_to_bits(energies: np.ndarray) -> np.ndarray:
+    diff = np.diff(energies, axis=1)
+    return np.packbits(diff[1:] - diff[:-1] > 0, axis=1)
+
+
+def fingerprint_pcm(pcm: np.ndarray) -> np.ndarray:
+    """
+    Fingerprint bits of mono float samples at FP_RATE.
+    """
+    return energies_to_bits(_band_energies(np.asarray(pcm, dtype=np.float32)))
+
+
+def fingerprint_file(path: str, input_sha256: str, block_sec: float = 60.0) -> AudioFingerprint:
+    """
+    Decode with ffmpeg (no filters) and fingerprint block by block, so memory does
+    not grow with the length of the recording. Undecodable input gives bits=None.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-ac", "1", "-ar", str(FP_RATE), "-f", "f32le", "-"]
+    block_bytes = int(block_sec * FP_RATE) * 4
+    energies: List[np.ndarray] = []
+    tail = np.empty(0, dtype=np.float32)
+    samples = 0
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return AudioFingerprint(input_sha256, 0.0, None)
+    with proc:
+        while True:
+            chunk = proc.stdout.read(block_bytes)
+            if not chunk:
+                break
+            pcm = np.frombuffer(chunk[:len(chunk) // 4 * 4], dtype=np.float32)
+            samples += len(pcm)
+            pcm = np.concatenate([tail, pcm])
+            block = _band_energies(pcm)
+            energies.append(block)
+            # следующий блок начинается с первого кадра, который ещё не посчитан
+            tail = pcm[len(block) * FP_HOP:]
+    if proc.returncode != 0 or not samples:
+        return AudioFingerprint(input_sha256, 0.0, None)
+    bits = energies_to_bits(np.concatenate(energies)) if energies else np.empty((0, 4), dtype=np.uint8)
+    return AudioFingerprint(input_sha256, samples / FP_RATE, bits)
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, max_shift: int = 3) -> float:
+    """
+    Smallest fraction of differing bits between two fingerprints over frame offsets
+    within ±max_shift (encoder delay and padding shift the audio slightly).
+    """
+    a, b = np.unpackbits(a, axis=1), np.unpackbits(b, axis=1)
+    best = 1.0
+    for shift in range(-max_shift, max_shift + 1):
+        x, y = (a[shift:], b) if shift >= 0 else (a, b[-shift:])
+        n = min(len(x), len(y))
+        if n < 0.9 * max(len(a), len(b)) or n == 0:
+            continue
+        best = min(best, float(np.count_nonzero(x[:n] != y[:n])) / x[:n].size)
+    return best
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class ResultCache:
+    """
+    On-disk result cache: an SQLite index of fingerprints plus one directory per entry.
+    Candidates are narrowed by options key and a duration bucket before bits are compared.
+    Total size is kept under ``max_bytes`` by dropping the least recently used entries.
+    """
+
+    BUCKET_SEC = 2.0
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 500 << 20, max_ber: float = 0.25):
+        self.root = root or os.path.join(get_cache_dir(), "results")
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_ber = max_ber
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                id TEXT PRIMARY KEY,
+                options_key TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                duration REAL NOT NULL,
+                bucket INTEGER NOT NULL,
+                fingerprint BLOB,
+                input TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_lookup ON results(options_key, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_sha ON results(options_key, sha256)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def lookup(self, key: str, input_path: str, input_sha256: str) -> Tuple[Optional[str], AudioFingerprint]:
+        """
+        (entry dir or None, fingerprint). Identical bytes are found without decoding;
+        otherwise the input is fingerprinted and compared with entries of similar duration.
+        The fingerprint is returned for put() after a miss.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT id, duration FROM results WHERE options_key=? AND sha256=?",
+                                     (key, input_sha256)).fetchone()
+        if row and self._valid(row[0]):
+            self._touch(row[0])
+            return os.path.join(self.root, row[0]), AudioFingerprint(input_sha256, row[1], None)
+        fp = fingerprint_file(input_path, input_sha256)
+        if fp.bits is None:
+            return None, fp
+        bucket = int(fp.duration // self.BUCKET_SEC)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, duration, fingerprint FROM results WHERE options_key=? AND bucket BETWEEN ? AND ? "
+                "AND fingerprint IS NOT NULL", (key, bucket - 1, bucket + 1)).fetchall()
+        best, best_ber = None, self.max_ber
+        for entry_id, duration, blob in rows:
+            if abs(duration - fp.duration) > 1.0 or not self._valid(entry_id):
+                continue
+            ber = bit_error_rate(fp.bits, np.frombuffer(blob, dtype=np.uint8).reshape(-1, 4))
+            if ber < best_ber:
+                best, best_ber = entry_id, ber
+        if best is None:
+            return None, fp
+        self._touch(best)
+        return os.path.join(self.root, best), fp
+
+    def _valid(self, entry_id: str) -> bool:
+        # каталог записи могли удалить вручную — забываем её
+        if os.path.isdir(os.path.join(self.root, entry_id)):
+            return True
+        with self._lock:
+            self._conn.execute("DELETE FROM results WHERE id=?", (entry_id,))
+            self._conn.commit()
+        return False
+
+    def _touch(self, entry_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE results SET hits=hits+1, last_used=? WHERE id=?", (time.time(), entry_id))
+            self._conn.commit()
+
+    def put(self, key: str, fp: AudioFingerprint, input_path: str, session_dir: str,
+            results: Dict[str, Any]) -> str:
+        """
+        Store ``results`` (JSON-able, e.g. {"ru": segments, "en": segments}) and the
+        session's output_* subtitle files; evicts down to max_bytes. Returns the entry id.
+        """
+        entry_id = uuid.uuid4().hex[:16]
+        entry_dir = os.path.join(self.root, entry_id)
+        os.makedirs(entry_dir + ".tmp")
+        with gzip.open(os.path.join(entry_dir + ".tmp", "segments.json.gz"), "wt", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, separators=(",", ":"), default=float)
+        for name in sorted(os.listdir(session_dir)):
+            if name.startswith("output_"):
+                shutil.copyfile(os.path.join(session_dir, name), os.path.join(entry_dir + ".tmp", name))
+        os.replace(entry_dir + ".tmp", entry_dir)
+        now = time.time()
+        blob = None if fp.bits is None else fp.bits.tobytes()
+        with self._lock:
+            self._conn.execute("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                               (entry_id, key, fp.sha256, fp.duration, int(fp.duration // self.BUCKET_SEC), blob,
+                                os.path.abspath(input_path), _dir_size(entry_dir), now, now))
+            self._conn.commit()
+        self.prune()
+        return entry_id
+
+    def restore(self, entry_dir: str, session_dir: str) -> Dict[str, Any]:
+        """
+        Copy the cached subtitle files into session_dir and return the stored results.
+        """
+        for name in sorted(os.listdir(entry_dir)):
+            if name.startswith("output_"):
+                shutil.copyfile(os.path.join(entry_dir, name), os.path.join(session_dir, name))
+        with gzip.open(os.path.join(entry_dir, "segments.json.gz"), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def prune(self, max_bytes: Optional[int] = None, older_than: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Drop entries unused for ``older_than`` seconds, then least recently used ones
+        until the total size fits ``max_bytes``. Returns (entries removed, bytes freed).
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            rows = self._conn.execute("SELECT id, size, last_used FROM results ORDER BY last_used").fetchall()
+            total = sum(size for _, size, _ in rows)
+            doomed = []
+            for entry_id, size, last_used in rows:
+                if total > max_bytes or (older_than is not None and time.time() - last_used > older_than):
+                    doomed.append(entry_id)
+                    total -= size
+            self._conn.executemany("DELETE FROM results WHERE id=?", [(i,) for i in doomed])
+            self._conn.commit()
+        freed = 0
+        for entry_id in doomed:
+            entry_dir = os.path.join(self.root, entry_id)
+            if os.path.isdir(entry_dir):
+                freed += _dir_size(entry_dir)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+        return len(doomed), freed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size, hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM results").fetchone()
+        return {"path": self.root, "entries": entries, "bytes": size, "max_bytes": self.max_bytes, "hits": hits}
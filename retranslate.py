@@ -0,0 +1,168 @@
+"""
+retranslate.py
+Incremental re-translation of a hand-corrected subtitle track. A sidecar manifest
+next to the translated file records every source cue as (start ms, end ms, text
+hash) and how many translated cues it became; a cue whose translation failed has
+no hash. On the next run only the sentence groups that contain a changed, new or
+untranslated cue are sent to LibreTranslate; the other cues keep their text from
+the previous translated file (hand edits included).
+The manifest is written after the track and records the track's SHA-256 and the
+hash of its cue timings: a track edited by hand keeps its timings, a track the
+manifest was never written for does not.
+
+    output_en_translated.srt
+    output_en_translated.srt.manifest.json
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from subtitle_io import WRITERS, clean_cue_text, read_subtitles, strip_final_dot_if_single_sentence, strip_leading_dash
+from translate_utils import TranslationClient, plan_sentence_groups, translate_grouped
+from translation_cache import TranslationCache, normalize_text
+from utils import file_sha256
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+CueKey = Tuple[int, int, str]
+
+
+def cue_key(cue: Dict[str, Any]) -> CueKey:
+    """
+    (start ms, end ms, hash of the normalized text) of a subtitle cue.
+    """
+    digest = hashlib.sha1(normalize_text(cue["text"]).encode("utf-8")).hexdigest()[:16]
+    return int(round(cue["start"] * 1000)), int(round(cue["end"] * 1000)), digest
+
+
+def manifest_path(output: str) -> str:
+    return output + MANIFEST_SUFFIX
+
+
+def timings_digest(cues: List[Dict[str, Any]]) -> str:
+    """
+    Hash of the (start ms, end ms) of every cue of a track.
+    """
+    timings = ",".join(f"{int(round(c['start'] * 1000))}-{int(round(c['end'] * 1000))}" for c in cues)
+    return hashlib.sha1(timings.encode("ascii")).hexdigest()[:16]
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Yields a temporary path next to ``path``; it replaces ``path`` only when the
+    block finishes, so readers never see a half-written file.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp
+        # os.replace атомарен в пределах одного каталога
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def translation_options(client: TranslationClient) -> Dict[str, str]:
+    # другой язык или другие модели — старые переводы не годятся
+    return {"source": client.source, "target": client.target, "model_version": client.model_version}
+
+
+def load_previous(output: str, options: Dict[str, str],
+                  previous: Optional[str] = None) -> Tuple[Dict[CueKey, str], Optional[str]]:
+    """
+    Translations of the previous run by source cue key, read from the previous
+    translated file (``output`` by default) through its manifest. Returns
+    ({}, reason) when nothing can be reused.
+    """
+    previous = previous or output
+    try:
+        with open(manifest_path(previous), encoding="utf-8") as f:
+            manifest = json.load(f)
+        cues = read_subtitles(previous)
+        sha256 = file_sha256(previous)
+    except (OSError, ValueError):
+        return {}, "no previous translation"
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("options") != options:
+        return {}, "translation options changed"
+    # правка текста вручную меняет sha256, но не тайминги
+    if ((sha256 != manifest.get("sha256") and timings_digest(cues) != manifest.get("timings"))
+            or sum(entry[3] for entry in manifest["cues"]) != len(cues)):
+        return {}, f"{os.path.basename(previous)} does not match its manifest"
+    known: Dict[CueKey, str] = {}
+    pos = 0
+    for start, end, digest, count in manifest["cues"]:
+        # digest None — титр не был переведён, его переводим заново
+        if digest is not None:
+            known.setdefault((start, end, digest), " ".join(clean_cue_text(c["text"]) for c in cues[pos:pos + count]))
+        pos += count
+    return known, None
+
+
+def write_translation(output: str, cues: List[Dict[str, Any]], translated: List[str],
+                      options: Dict[str, str], max_cps: Optional[float] = None,
+                      failed: Optional[Set[int]] = None):
+    """
+    Write the translated track and then its manifest, each through a temporary
+    file; the manifest records the hashes of the track as written. Cues in
+    ``failed`` or with an empty translation get no text hash in the manifest,
+    so the next run translates them again.
+    """
+    failed = failed or set()
+    fmt = os.path.splitext(output)[1].lstrip(".").lower()
+    entries = []
+    with atomic_path(output) as tmp:
+        with WRITERS[fmt if fmt in WRITERS else "srt"](tmp, max_cps=max_cps) as writer:
+            for i, (cue, text) in enumerate(zip(cues, translated)):
+                before = writer.index
+                writer.write({"start": cue["start"], "end": cue["end"], "text": text})
+                start, end, digest = cue_key(cue)
+                if i in failed or (not text.strip() and cue["text"].strip()):
+                    digest = None
+                entries.append([start, end, digest, writer.index - before])
+    manifest = {"version": MANIFEST_VERSION, "options": options, "sha256": file_sha256(output),
+                "timings": timings_digest(read_subtitles(output)), "cues": entries}
+    with atomic_path(manifest_path(output)) as tmp:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+
+def retranslate(cues: List[Dict[str, Any]], known: Dict[CueKey, str], client: TranslationClient,
+                cache: Optional[TranslationCache] = None,
+                on_progress: Optional[Callable[[int, int], None]] = None,
+                max_gap: float = 1.5, failed: Optional[Set[int]] = None) -> Tuple[List[str], Dict[str, int]]:
+    """
+    One translated text per cue. Cues are grouped into sentences the way
+    translate_segments groups them; a group with any cue missing from ``known``
+    is translated again as a whole, the rest is taken from ``known``.
+    Returns (texts, {"cues", "reused", "retranslated", "groups"}); indices of cues
+    that could not be translated are added to ``failed``.
+    """
+    texts = [cue["text"] for cue in cues]
+    breaks = [i + 1 >= len(cues) or cues[i + 1]["start"] - cues[i]["end"] > max_gap for i in range(len(cues))]
+    keys = [cue_key(cue) for cue in cues]
+    dirty: List[int] = []
+    dirty_breaks: List[bool] = []
+    groups = 0
+    for group in plan_sentence_groups(texts, breaks=breaks):
+        if all(keys[i] in known for i in group):
+            continue
+        groups += 1
+        dirty.extend(group)
+        # граница группы сохраняется: на подмножестве группы получаются те же
+        dirty_breaks.extend([False] * (len(group) - 1) + [True])
+    results = [known.get(key, "") for key in keys]
+    if dirty:
+        fresh_failed: Set[int] = set()
+        fresh = translate_grouped([texts[i] for i in dirty], client, cache, on_progress=on_progress,
+                                  breaks=dirty_breaks, failed=fresh_failed)
+        if failed is not None:
+            failed.update(dirty[j] for j in fresh_failed)
+        for i, text in zip(dirty, fresh):
+            results[i] = strip_final_dot_if_single_sentence(strip_leading_dash(text))
+    return results, {"cues": len(cues), "reused": len(cues) - len(dirty), "retranslated": len(dirty),
+                     "groups": groups}
@@ -1,76 +1,196 @@
 import logging
 import re
 import os
-from typing import Optional, List, Dict, Any
+from collections import Counter
+from typing import Optional, List, Dict, Any, Iterable, Iterator, TextIO, Tuple, Union
 from utils import format_timestamp
-from datetime import timedelta, datetime
-
-# 📆 Форматирование таймкодов
-def format_timestamp(seconds):
-    td = timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
-    millis = int((seconds - total_seconds) * 1000)
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
-    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+from hallucination_matcher import HallucinationMatcher
+from segment_store import SegmentStore
+import numpy as np
+
+_WORD_RE = re.compile(r"\b\w+\b")
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+# 🔁 Зацикленные фразы: «а потом а потом а потом ...»
+def find_phrase_loop(words: List[str], max_n: int = 8, min_repeats: int = 3,
+                     min_n: int = 2) -> Optional[Tuple[int, int, int]]:
+    """
+    Longest run of a phrase of min_n..max_n words repeated back to back at least min_repeats times.
+    Returns (phrase length, repeats, words covered) or None. O(max_n * len(words)).
+    """
+    best = None
+    # одно слово подряд («ну, ну, ну») — обычная речь; его зацикливание ловит проверка частот
+    for n in range(min_n, min(max_n, len(words) // min_repeats) + 1):
+        run = 0
+        for i in range(n, len(words) + 1):
+            if i < len(words) and words[i] == words[i - n]:
+                run += 1
+                continue
+            repeats = run // n + 1
+            if repeats >= min_repeats and (best is None or run + n > best[2]):
+                best = (n, repeats, run + n)
+            run = 0
+    return best
 
 # 🧠 Повторяющиеся фразы
-def is_repetitive(text: str, threshold: float = 0.6, max_repeat: int = 10) -> bool:
-    words = re.findall(r"\b\w+\b", text.lower())
+def repetition_reason(words: List[str], threshold: float = 0.6, max_repeat: int = 10,
+                      loop_coverage: float = 0.5) -> Optional[str]:
+    """
+    Why a tokenized segment counts as repetitive, or None.
+    """
     if not words:
-        return False
-    unique = set(words)
-    ratio = len(unique) / len(words)
-    return ratio < threshold or any(words.count(w) > max_repeat for w in unique)
+        return None
+    counts = Counter(words)
+    if len(counts) / len(words) < threshold or counts.most_common(1)[0][1] > max_repeat:
+        return "repetitive"
+    loop = find_phrase_loop(words)
+    if loop and loop[2] >= loop_coverage * len(words):
+        return "phrase_loop"
+    return None
+
+def is_repetitive(text: str, threshold: float = 0.6, max_repeat: int = 10) -> bool:
+    return repetition_reason(tokenize(text), threshold, max_repeat) is not None
 
 # ❌ Нестабильные сегменты
+def rejection_reason(text: str, segment: Dict[str, Any]) -> Optional[str]:
+    """
+    Single-pass check of a stripped segment text: the reason it is dropped, or None.
+    """
+    if not text:
+        return "empty"
+    if segment.get("no_speech_prob", 0) > 0.5:
+        return "no_speech"
+    if len(text) < 4:
+        return "too_short"
+    return repetition_reason(tokenize(text))
+
 def is_unreliable(text: str, segment: Dict[str, Any]) -> bool:
-    return (
-        not text or
-        segment.get("no_speech_prob", 0) > 0.5 or
-        len(text.strip()) < 4 or
-        is_repetitive(text)
-    )
+    return rejection_reason(text.strip(), segment) is not None
+
+Markers = Union[HallucinationMatcher, List[str]]
 
 # 🚫 Загрузка стоп-фраз
-def load_hallucination_markers(path: Optional[str]) -> List[str]:
+def load_hallucination_markers(path: Optional[str], mode: str = "exact") -> HallucinationMatcher:
+    """
+    Read one phrase per line and compile them into a HallucinationMatcher
+    (list-like: len() and iteration give the phrases).
+    """
     if not path or not os.path.exists(path):
-        return []
+        return HallucinationMatcher([], mode)
     with open(path, "r", encoding="utf-8") as f:
-        return [line.strip() for line in f if line.strip()]
+        return HallucinationMatcher([line.strip() for line in f if line.strip()], mode)
+
+def as_matcher(markers: Markers) -> HallucinationMatcher:
+    return markers if isinstance(markers, HallucinationMatcher) else HallucinationMatcher(markers)
 
 # 📌 Проверка текста на галлюцинации
-def is_hallucination(text: str, markers: List[str]) -> bool:
-    return any(marker.lower() in text.lower() for marker in markers)
+def is_hallucination(text: str, markers: Markers) -> bool:
+    return as_matcher(markers).search(text)
+
+def remove_hallucinations(text: str, markers: Markers) -> str:
+    return as_matcher(markers).clean(text)[1]
+
+class _RejectionLog:
+    """
+    Buffered writer of dropped segments to repetitions.log, with per-reason counts.
+    """
+
+    def __init__(self, rep_log: TextIO, reasons: Optional[Dict[str, int]] = None, log_every: int = 256):
+        self.rep_log = rep_log
+        self.reasons = reasons
+        self.log_every = log_every
+        self.pending: List[str] = []
+
+    def add(self, start: float, reason: str, text: str):
+        if self.reasons is not None:
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if text:
+            self.pending.append(f"[{format_timestamp(start)}] ({reason}) {text}\n\n")
+        if len(self.pending) >= self.log_every:
+            self.flush()
 
-def remove_hallucinations(text: str, markers: List[str]) -> str:
-    for marker in markers:
-        text = re.sub(re.escape(marker), "", text, flags=re.IGNORECASE)
-    return text.strip()
+    def flush(self):
+        self.rep_log.writelines(self.pending)
+        self.pending.clear()
+
+def _filter_text(text: str, segment: Dict[str, Any], matcher: Optional[HallucinationMatcher]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (cleaned text, None) for a kept segment, (None, reason) for a dropped one.
+    """
+    reason = rejection_reason(text, segment)
+    if reason:
+        return None, reason
+    if matcher:
+        found, cleaned = matcher.clean(text)
+        if found:
+            if not cleaned:
+                return None, "hallucination"
+            text = cleaned
+    return text, None
 
 # 🧹 Обработка сегментов + логирование болтовни
-def process_segments(segments: List[Dict[str, Any]], session_dir: str, rep_log_path: str = None, hallucination_markers: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-    if rep_log_path is None:
-        rep_log_path = os.path.join(session_dir, "repetitions.log")
-    final = []
-    with open(rep_log_path, "w", encoding="utf-8") as rep_log:
+def iter_process_segments(segments: Iterable[Dict[str, Any]], rep_log: TextIO, hallucination_markers: Optional[Markers] = None,
+                          reasons: Optional[Dict[str, int]] = None, log_every: int = 256) -> Iterator[Dict[str, Any]]:
+    """
+    Generator form of process_segments: filters segments one by one as they arrive.
+    Every dropped segment goes to rep_log with its reason; lines are written in
+    batches of log_every. ``reasons`` (if given) receives counts per reason.
+    """
+    matcher = as_matcher(hallucination_markers) if hallucination_markers else None
+    log = _RejectionLog(rep_log, reasons, log_every)
+    try:
         for seg in segments:
             text = seg["text"].strip()
-            if is_unreliable(text, seg):
-                if is_repetitive(text):
-                    rep_log.write(f"[{format_timestamp(seg['start'])}] {text}\n\n")
+            kept, reason = _filter_text(text, seg, matcher)
+            if reason:
+                log.add(seg["start"], reason, text)
                 continue
 
-            if hallucination_markers and is_hallucination(text, hallucination_markers):
-                cleaned = remove_hallucinations(text, hallucination_markers)
-                if not cleaned:
-                    continue
-                text = cleaned
-
-            final.append({
+            out = {
                 "start": seg["start"],
                 "end": seg["end"],
-                "text": text
-            })
-    return final
+                "text": kept
+            }
+            # время слов верно, только если текст не менялся
+            if seg.get("words") and kept == text:
+                out["words"] = seg["words"]
+            yield out
+    finally:
+        log.flush()
+
+def process_segments(segments: List[Dict[str, Any]], session_dir: str, rep_log_path: str = None, hallucination_markers: Optional[Markers] = None,
+                     reasons: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    if rep_log_path is None:
+        rep_log_path = os.path.join(session_dir, "repetitions.log")
+    with open(rep_log_path, "w", encoding="utf-8") as rep_log:
+        return list(iter_process_segments(segments, rep_log, hallucination_markers, reasons))
+
+def process_store(store: SegmentStore, session_dir: str, rep_log_path: str = None, hallucination_markers: Optional[Markers] = None,
+                  reasons: Optional[Dict[str, int]] = None) -> SegmentStore:
+    """
+    process_segments over a SegmentStore: returns a start/end/text store of the kept rows.
+    """
+    if rep_log_path is None:
+        rep_log_path = os.path.join(session_dir, "repetitions.log")
+    matcher = as_matcher(hallucination_markers) if hallucination_markers else None
+    no_speech = store.no_speech_prob.tolist() if store.no_speech_prob is not None else None
+    words = [extra.get("words") for extra in store.extra] if store.extra is not None else None
+    keep, texts, kept_words = [], [], []
+    with open(rep_log_path, "w", encoding="utf-8") as rep_log:
+        log = _RejectionLog(rep_log, reasons)
+        for i, text in enumerate(store.texts):
+            text = text.strip()
+            kept, reason = _filter_text(text, {"no_speech_prob": no_speech[i]} if no_speech else {}, matcher)
+            if reason:
+                log.add(float(store.start[i]), reason, text)
+                continue
+            keep.append(i)
+            texts.append(kept)
+            if words is not None:
+                kept_words.append({"words": words[i]} if words[i] and kept == text else {})
+        log.flush()
+    rows = np.asarray(keep, dtype=np.intp)
+    extra = kept_words if any(kept_words) else None
+    return SegmentStore(store.start[rows], store.end[rows], texts, extra=extra)
@@ -1,20 +1,65 @@
+from typing import List, Dict, Any, Iterable, Iterator
 
-from typing import List, Dict, Any
+import numpy as np
 
-def merge_short_segments(segments: List[Dict[str, Any]], min_word_count: int = 3, max_pause: float = 1.0) -> List[Dict[str, Any]]:
+from segment_store import SegmentStore
+
+def iter_merge_short_segments(segments: Iterable[Dict[str, Any]], min_word_count: int = 3, max_pause: float = 1.0) -> Iterator[Dict[str, Any]]:
     """
-    Объединяет слишком короткие сегменты (по количеству слов) с предыдущим,
-    если между ними небольшая пауза.
+    Generator form of merge_short_segments: holds back only the last merged segment.
     """
-    if not segments:
-        return []
-    merged = []
+    last = None
     for seg in segments:
         words = seg["text"].strip().split()
-        if (len(words) < min_word_count and merged and
-            seg["start"] - merged[-1]["end"] < max_pause):
-            merged[-1]["text"] = merged[-1]["text"].rstrip() + " " + seg["text"].lstrip()
-            merged[-1]["end"] = seg["end"]
+        if (len(words) < min_word_count and last is not None and
+            seg["start"] - last["end"] < max_pause):
+            last["text"] = last["text"].rstrip() + " " + seg["text"].lstrip()
+            last["end"] = seg["end"]
+            if "words" in last:
+                if seg.get("words"):
+                    last["words"] = last["words"] + seg["words"]
+                else:
+                    del last["words"]
         else:
-            merged.append(dict(seg))
-    return merged
+            if last is not None:
+                yield last
+            last = dict(seg)
+    if last is not None:
+        yield last
+
+def merge_short_segments(segments: List[Dict[str, Any]], min_word_count: int = 3, max_pause: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Объединяет слишком короткие сегменты (по количеству слов) с предыдущим,
+    если между ними небольшая пауза.
+    """
+    return list(iter_merge_short_segments(segments, min_word_count, max_pause))
+
+def merge_store(store: SegmentStore, min_word_count: int = 3, max_pause: float = 1.0) -> SegmentStore:
+    """
+    merge_short_segments over a SegmentStore. The pause is always measured to the
+    previous segment's end (a merged block ends where its last part ends), so which
+    rows merge is decided in one vectorized step.
+    """
+    n = len(store)
+    if n == 0:
+        return store
+    word_counts = np.fromiter((len(text.split()) for text in store.texts), dtype=np.int64, count=n)
+    merge = np.zeros(n, dtype=bool)
+    merge[1:] = (word_counts[1:] < min_word_count) & (store.start[1:] - store.end[:-1] < max_pause)
+    heads = np.flatnonzero(~merge)
+    tails = np.r_[heads[1:], n] - 1
+    out = store.take(heads)
+    out.end[:] = store.end[tails]
+    texts = store.texts
+    for pos in np.flatnonzero(tails > heads).tolist():
+        head, tail = int(heads[pos]), int(tails[pos])
+        parts = [texts[head].rstrip()] + [t.strip() for t in texts[head + 1:tail]] + [texts[tail].lstrip()]
+        out.texts[pos] = " ".join(parts)
+        if out.extra is not None and out.extra[pos].get("words"):
+            group = [store.extra[row].get("words") for row in range(head, tail + 1)]
+            out.extra[pos] = dict(out.extra[pos])
+            if all(group):
+                out.extra[pos]["words"] = [w for words in group for w in words]
+            else:
+                del out.extra[pos]["words"]
+    return out
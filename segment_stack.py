@@ -1,40 +1,75 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 
-def stack_repeated_segments(segments: List[Dict[str, Any]], phrase_repeat_threshold: int = 5) -> List[Dict[str, Any]]:
+import numpy as np
+
+from segment_store import SegmentStore
+
+def _flush_repeats(buffer: List[Dict[str, Any]], text: str, phrase_repeat_threshold: int) -> Iterator[Dict[str, Any]]:
+    if len(buffer) >= phrase_repeat_threshold:
+        yield {
+            "start": buffer[0]["start"],
+            "end": buffer[-1]["end"],
+            "text": text
+        }
+    else:
+        yield from buffer
+
+def iter_stack_repeated_segments(segments: Iterable[Dict[str, Any]], phrase_repeat_threshold: int = 5) -> Iterator[Dict[str, Any]]:
     """
-    Group consecutive segments with identical text into one block.
-    Only applies if repetitions reach the threshold (default 5).
+    Generator form of stack_repeated_segments.
+    Holds at most phrase_repeat_threshold segments: once a run is long enough to be
+    stacked, only its first and last segment are kept.
     """
-    stacked = []
     buffer = []
     prev_text = None
+    keep = max(phrase_repeat_threshold, 2)
 
     for seg in segments:
         text = seg["text"].strip()
 
         if text == prev_text:
-            buffer.append(seg)
+            if len(buffer) < keep:
+                buffer.append(seg)
+            else:
+                buffer[-1] = seg
         else:
-            if len(buffer) >= phrase_repeat_threshold:
-                stacked.append({
-                    "start": buffer[0]["start"],
-                    "end": buffer[-1]["end"],
-                    "text": prev_text
-                })
-            elif buffer:
-                stacked.extend(buffer)
-
+            yield from _flush_repeats(buffer, prev_text, phrase_repeat_threshold)
             buffer = [seg]
             prev_text = text
 
     # Handle final buffer
-    if len(buffer) >= phrase_repeat_threshold:
-        stacked.append({
-            "start": buffer[0]["start"],
-            "end": buffer[-1]["end"],
-            "text": prev_text
-        })
-    else:
-        stacked.extend(buffer)
+    yield from _flush_repeats(buffer, prev_text, phrase_repeat_threshold)
 
-    return stacked
+def stack_repeated_segments(segments: List[Dict[str, Any]], phrase_repeat_threshold: int = 5) -> List[Dict[str, Any]]:
+    """
+    Group consecutive segments with identical text into one block.
+    Only applies if repetitions reach the threshold (default 5).
+    """
+    return list(iter_stack_repeated_segments(segments, phrase_repeat_threshold))
+
+def stack_store(store: SegmentStore, phrase_repeat_threshold: int = 5) -> SegmentStore:
+    """
+    stack_repeated_segments over a SegmentStore, vectorized over runs of equal text.
+    A stacked run keeps its first row's other columns.
+    """
+    n = len(store)
+    if n == 0:
+        return store
+    stripped = [text.strip() for text in store.texts]
+    ids: Dict[str, int] = {}
+    codes = np.fromiter((ids.setdefault(text, len(ids)) for text in stripped), dtype=np.int64, count=n)
+    run_start = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    run_end = np.r_[run_start[1:], n]
+    stacked = (run_end - run_start) >= phrase_repeat_threshold
+    # в стакнутой серии остаётся только первая строка
+    keep = ~np.repeat(stacked, run_end - run_start)
+    keep[run_start[stacked]] = True
+    out = store.take(keep)
+    positions = np.cumsum(keep)[run_start[stacked]] - 1
+    out.end[positions] = store.end[run_end[stacked] - 1]
+    for pos, row in zip(positions.tolist(), run_start[stacked].tolist()):
+        out.texts[pos] = stripped[row]
+        if out.extra is not None:
+            # слова первой строки не описывают всю серию
+            out.extra[pos] = {k: v for k, v in out.extra[pos].items() if k != "words"}
+    return out
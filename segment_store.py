@@ -0,0 +1,127 @@
+"""
+segment_store.py
+Columnar container for subtitle segments: NumPy arrays for timings, speaker ids
+and no_speech_prob, an interned text column. Post-processing stages take and return
+a SegmentStore instead of building fresh lists of fresh dicts at every step;
+from_dicts/to_dicts convert at the edges.
+"""
+
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+_COLUMNS = ("start", "end", "text", "speaker", "no_speech_prob")
+
+
+class SegmentStore:
+    """
+    Segments as columns. Rows are addressed by position; take() selects rows
+    without touching the text strings, with_texts() swaps the text column.
+    Keys other than the known columns (words, tokens, ...) ride along in ``extra``.
+    """
+
+    __slots__ = ("start", "end", "texts", "no_speech_prob", "speaker", "speaker_names", "extra")
+
+    def __init__(self, start: Sequence[float], end: Sequence[float], texts: List[str],
+                 no_speech_prob: Optional[np.ndarray] = None, speaker: Optional[np.ndarray] = None,
+                 speaker_names: Optional[List[str]] = None, extra: Optional[List[Dict[str, Any]]] = None):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.texts = texts
+        self.no_speech_prob = no_speech_prob
+        self.speaker = speaker
+        self.speaker_names = speaker_names or []
+        self.extra = extra
+
+    @classmethod
+    def empty(cls) -> "SegmentStore":
+        return cls(np.empty(0), np.empty(0), [])
+
+    @classmethod
+    def from_dicts(cls, segments: Iterable[Dict[str, Any]]) -> "SegmentStore":
+        segments = list(segments)
+        start = np.fromiter((seg["start"] for seg in segments), dtype=np.float64, count=len(segments))
+        end = np.fromiter((seg["end"] for seg in segments), dtype=np.float64, count=len(segments))
+        texts = [sys.intern(seg["text"]) for seg in segments]
+        no_speech = speaker = extra = None
+        names: List[str] = []
+        if any("no_speech_prob" in seg for seg in segments):
+            no_speech = np.array([seg.get("no_speech_prob", 0.0) for seg in segments], dtype=np.float64)
+        if any("speaker" in seg for seg in segments):
+            ids: Dict[str, int] = {}
+            speaker = np.array([ids.setdefault(seg["speaker"], len(ids)) if seg.get("speaker") is not None else -1
+                                for seg in segments], dtype=np.int32)
+            names = list(ids)
+        if any(len(seg.keys() - _COLUMNS) for seg in segments):
+            extra = [{k: v for k, v in seg.items() if k not in _COLUMNS} for seg in segments]
+        return cls(start, end, texts, no_speech, speaker, names, extra)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        seg = {"start": float(self.start[i]), "end": float(self.end[i]), "text": self.texts[i]}
+        if self.speaker is not None and self.speaker[i] >= 0:
+            seg["speaker"] = self.speaker_names[self.speaker[i]]
+        if self.no_speech_prob is not None:
+            seg["no_speech_prob"] = float(self.no_speech_prob[i])
+        if self.extra is not None:
+            seg.update(self.extra[i])
+        return seg
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return self.row(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(i) for i in range(len(self)))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def take(self, rows) -> "SegmentStore":
+        """
+        Subset (or reorder) rows by index array or boolean mask.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        texts = self.texts
+        return SegmentStore(
+            self.start[rows], self.end[rows], [texts[i] for i in rows.tolist()],
+            None if self.no_speech_prob is None else self.no_speech_prob[rows],
+            None if self.speaker is None else self.speaker[rows],
+            self.speaker_names,
+            None if self.extra is None else [self.extra[i] for i in rows.tolist()],
+        )
+
+    def with_texts(self, texts: List[str]) -> "SegmentStore":
+        """
+        Same rows and timings (arrays are shared, not copied) with another text column.
+        """
+        if len(texts) != len(self):
+            raise ValueError(f"expected {len(self)} texts, got {len(texts)}")
+        return SegmentStore(self.start, self.end, [sys.intern(t) for t in texts], self.no_speech_prob,
+                            self.speaker, self.speaker_names, self.extra)
+
+    def timings_only(self) -> "SegmentStore":
+        """
+        start/end/text columns only, the shape of filtered subtitle segments.
+        """
+        return SegmentStore(self.start, self.end, list(self.texts))
+
+    def map_texts(self, fn) -> "SegmentStore":
+        """
+        Apply fn to the text column in place; each distinct text is processed once.
+        """
+        memo: Dict[str, str] = {}
+        for i, text in enumerate(self.texts):
+            out = memo.get(text)
+            if out is None:
+                out = memo[text] = sys.intern(fn(text))
+            self.texts[i] = out
+        return self
+
+
+def as_store(segments) -> SegmentStore:
+    return segments if isinstance(segments, SegmentStore) else SegmentStore.from_dicts(segments)
@@ -0,0 +1,72 @@
+"""
+session_manifest.py
+manifest.json written into a session dir when a file has been fully processed:
+input content hash, an options key and the produced outputs. Used to skip inputs
+that were already processed with the same settings.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from utils import file_sha256
+
+MANIFEST_NAME = "manifest.json"
+OUTPUTS = ["output_ru.srt", "output_en_translated.srt"]
+
+# опции, которые не влияют на содержимое результатов
+_IGNORED_OPTIONS = {
+    "file_path", "batch", "translate_workers", "translate_batch_size", "denoise_workers",
+    "keep_intermediates", "no_translation_cache", "translation_cache_size", "profile",
+    "resume", "no_checkpoints", "no_result_cache", "result_cache_size", "threads",
+}
+
+
+def options_key(args) -> str:
+    """
+    Short hash of the options that affect the produced subtitles.
+    """
+    options = {k: v for k, v in sorted(vars(args).items()) if k not in _IGNORED_OPTIONS}
+    # файл с маркерами могли отредактировать, не меняя путь
+    markers = options.get("hallucination_file")
+    if markers and os.path.exists(markers):
+        options["hallucination_file_sha256"] = file_sha256(markers)
+    return hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def write_manifest(session_dir: str, input_path: str, input_sha256: str, args, extra: Optional[Dict[str, Any]] = None):
+    manifest = {
+        "input": os.path.abspath(input_path),
+        "input_sha256": input_sha256,
+        "options_key": options_key(args),
+        "outputs": [name for name in OUTPUTS if os.path.exists(os.path.join(session_dir, name))],
+        "completed": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    manifest.update(extra or {})
+    with open(os.path.join(session_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def read_manifest(session_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(session_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def find_completed_session(input_sha256: str, key: str, sessions_root: str = "sessions") -> Optional[str]:
+    """
+    Most recent session with the same input hash and options whose outputs still exist.
+    """
+    candidates: List[str] = sorted(glob.glob(os.path.join(sessions_root, "*", MANIFEST_NAME)), key=os.path.getmtime, reverse=True)
+    for path in candidates:
+        session_dir = os.path.dirname(path)
+        manifest = read_manifest(session_dir)
+        if (manifest and manifest.get("input_sha256") == input_sha256 and manifest.get("options_key") == key
+                and all(os.path.exists(os.path.join(session_dir, name)) for name in OUTPUTS)):
+            return session_dir
+    return None
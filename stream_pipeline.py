@@ -0,0 +1,103 @@
+"""
+stream_pipeline.py
+Streaming mode: audio is cut into windows at quiet points, each window is transcribed
+and its segments flow through filtering, stacking and merging as generators straight
+into the subtitle writers. Translation runs on a background thread, overlapping with
+transcription of the following windows.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from audio_chunking import iter_audio_windows
+from audio_utils import SAMPLE_RATE
+from segment_filter import iter_process_segments
+from segment_post import iter_merge_short_segments
+from segment_stack import iter_stack_repeated_segments
+from subtitle_io import SrtWriter, strip_leading_dash, strip_final_dot_if_single_sentence
+from transcribe_utils import shift_segment, transcribe_options
+from translate_utils import TranslationClient, complete_groups, translate_grouped
+from translation_cache import TranslationCache
+
+def transcribe_windows(model, audio: np.ndarray, window_sec: float = 30.0,
+                       word_timestamps: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Transcribe audio window by window, yielding Whisper segments on the file timeline.
+    """
+    options = transcribe_options(word_timestamps)
+    for start, window in iter_audio_windows(audio, SAMPLE_RATE, window_sec):
+        offset = start / SAMPLE_RATE
+        result = model.transcribe(window, verbose=None, **options)
+        for seg in result["segments"]:
+            yield shift_segment(seg, offset)
+
+
+def clean_subtitle(seg: Dict[str, Any]) -> Dict[str, Any]:
+    seg = dict(seg)
+    seg["text"] = strip_final_dot_if_single_sentence(strip_leading_dash(seg["text"]))
+    return seg
+
+
+def run_stream(model, audio: np.ndarray, session_dir: str, client: TranslationClient,
+               cache: Optional[TranslationCache] = None,
+               hallucination_markers: Optional[List[str]] = None,
+               window_sec: float = 30.0, word_timestamps: bool = False,
+               max_cps: Optional[float] = None, max_gap: float = 1.5) -> int:
+    """
+    Run the streaming pipeline and write output_ru.srt / output_en_translated.srt
+    incrementally. With word_timestamps, long Russian cues are cut at Whisper's
+    word times; max_cps limits reading speed of split cues in both tracks.
+    Sentence groups are translated as in translate_segments: no group spans a
+    pause longer than max_gap, and an unfinished sentence waits for its next segments.
+    Returns the number of subtitle segments written.
+    """
+    ru_path = os.path.join(session_dir, "output_ru.srt")
+    en_path = os.path.join(session_dir, "output_en_translated.srt")
+    rep_log_path = os.path.join(session_dir, "repetitions.log")
+    pending = deque()
+    batch = []
+    count = 0
+
+    def drain(block: bool):
+        while pending and (block or pending[0][1].done()):
+            segs, future = pending.popleft()
+            for seg, text in zip(segs, future.result()):
+                en_writer.write(clean_subtitle({"start": seg["start"], "end": seg["end"], "text": text}))
+            en_writer.flush()
+
+    def submit(final: bool = False):
+        nonlocal batch
+        texts = [s["text"] for s in batch]
+        breaks = [i + 1 < len(batch) and batch[i + 1]["start"] - batch[i]["end"] > max_gap for i in range(len(batch))]
+        # незаконченное предложение остаётся в batch до следующих сегментов
+        ready = len(batch) if final else complete_groups(texts, breaks=breaks)
+        if ready:
+            pending.append((batch[:ready], pool.submit(translate_grouped, texts[:ready], client, cache,
+                                                       breaks=breaks[:ready - 1] + [True])))
+            batch = batch[ready:]
+
+    with open(rep_log_path, "w", encoding="utf-8") as rep_log, \
+            SrtWriter(ru_path, max_cps=max_cps) as ru_writer, \
+            SrtWriter(en_path, max_cps=max_cps) as en_writer, \
+            ThreadPoolExecutor(max_workers=1) as pool:
+        segments = transcribe_windows(model, audio, window_sec, word_timestamps)
+        segments = iter_process_segments(segments, rep_log, hallucination_markers)
+        segments = iter_stack_repeated_segments(segments)
+        segments = iter_merge_short_segments(segments, min_word_count=3, max_pause=1.0)
+        for seg in segments:
+            seg = clean_subtitle(seg)
+            ru_writer.write(seg)
+            ru_writer.flush()
+            count += 1
+            batch.append(seg)
+            drain(block=False)
+            # переводчик свободен — отдаём сразу, иначе копим пачку
+            if not pending or len(batch) >= client.batch_size:
+                submit()
+        submit(final=True)
+        drain(block=True)
+    return count
@@ -1,80 +1,379 @@
-import textwrap
-from datetime import timedelta
+"""
+subtitle_io.py
+Subtitle text helpers, streaming SRT/WebVTT/ASS writers (plain or bilingual)
+and SRT/WebVTT readers.
+"""
+
 import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
-def format_timestamp(seconds):
-    """
-    Convert seconds to SRT timestamp format: HH:MM:SS,mmm
-    """
-    td = timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
-    millis = int((seconds - total_seconds) * 1000)
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
-    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+from utils import format_ass_timestamp, format_timestamp, parse_timestamp
+
+_SENTENCE_END = re.compile(r"[.!?]")
 
 def smart_split_text(text, max_chars=80):
     """
     Делит текст на части не длиннее max_chars, стараясь делить по . ! ?
     Если таких знаков нет в окне +-10 символов от max_chars, делит по пробелу.
+    Идёт по строке одним указателем, без повторных срезов — линейно по длине.
     """
-    import re
     parts = []
-    while len(text) > max_chars:
+    pos, n = 0, len(text)
+    while n - pos > max_chars:
         # Ищем ближайший . ! ? в диапазоне [max_chars-10, max_chars+10]
-        window = text[max(0, max_chars-10):min(len(text), max_chars+10)]
-        m = re.search(r'[.!?]', window)
+        lo = pos + max(0, max_chars - 10)
+        m = _SENTENCE_END.search(text, lo, min(n, pos + max_chars + 10))
         if m:
-            split_at = max(0, max_chars-10) + m.end()
+            split_at = m.end()
         else:
             # Если нет подходящего знака, ищем ближайший пробел до max_chars
-            space = text.rfind(' ', 0, max_chars)
-            split_at = space if space != -1 else max_chars
-        parts.append(text[:split_at].strip())
-        text = text[split_at:].lstrip()
-    if text:
-        parts.append(text)
+            space = text.rfind(" ", pos, pos + max_chars)
+            split_at = space if space != -1 else pos + max_chars
+        parts.append(text[pos:split_at].strip())
+        pos = split_at
+        while pos < n and text[pos].isspace():
+            pos += 1
+    if pos < n:
+        parts.append(text[pos:])
     return parts
 
-def split_long_segments(segments, max_chars=80):
+def _alnum(text):
+    return "".join(ch for ch in text.casefold() if ch.isalnum()).replace("ё", "е")
+
+def align_tokens(tokens, words):
     """
-    Делит длинные сегменты на несколько по max_chars, стараясь делить по . ! ?
-    Таймкод делится равномерно.
+    (start, end) for every whitespace token of the cue text, taken from word
+    timestamps. Matching is by letters and digits only, so punctuation and the
+    dash/dot clean-up do not matter. Returns None if the texts disagree.
+    """
+    if _alnum("".join(tokens)) != _alnum("".join(w.get("word", "") for w in words)):
+        return None
+    # позиция буквы -> слово, которому она принадлежит
+    owner = []
+    for i, w in enumerate(words):
+        owner.extend([i] * len(_alnum(w.get("word", ""))))
+    times, pos = [], 0
+    for tok in tokens:
+        size = len(_alnum(tok))
+        if size == 0:
+            times.append(None)
+            continue
+        first, last = words[owner[pos]], words[owner[pos + size - 1]]
+        times.append((first["start"], last["end"]))
+        pos += size
+    # токены без букв («—») получают время соседей
+    for i in range(len(times)):
+        if times[i] is None:
+            prev = times[i - 1] if i > 0 else None
+            times[i] = (prev[1], prev[1]) if prev else None
+    for i in range(len(times) - 1, -1, -1):
+        if times[i] is None:
+            nxt = times[i + 1] if i + 1 < len(times) else None
+            times[i] = (nxt[0], nxt[0]) if nxt else (words[0]["start"], words[0]["start"])
+    return times
+
+def _group_tokens(tokens, times, max_chars, pause=0.7):
+    """
+    Greedy cue grouping: a cue ends when the next token would not fit, after a sentence
+    end once the cue is half full, or at a pause once it is a third full.
+    """
+    groups, current, length = [], [], 0
+    for i, tok in enumerate(tokens):
+        if current:
+            prev = tokens[current[-1]]
+            gap = times[i][0] - times[current[-1]][1]
+            if (length + 1 + len(tok) > max_chars or
+                    (prev[-1] in ".!?" and length >= max_chars / 2) or
+                    (gap >= pause and length >= max_chars / 3)):
+                groups.append(current)
+                current, length = [], 0
+        length += len(tok) + (1 if current else 0)
+        current.append(i)
+    if current:
+        groups.append(current)
+    return groups
+
+def _snap_to_word_gaps(bounds, words):
+    """
+    Move each inner cue boundary to the nearest pause between two words.
+    Returns (end of the cue before, start of the cue after) per boundary.
+    """
+    gaps = [(words[i]["end"], words[i + 1]["start"]) for i in range(len(words) - 1)]
+    result, j = [], 0
+    for t in bounds:
+        while j + 1 < len(gaps) and abs((gaps[j + 1][0] + gaps[j + 1][1]) / 2 - t) <= abs((gaps[j][0] + gaps[j][1]) / 2 - t):
+            j += 1
+        result.append(gaps[j] if gaps else (t, t))
+        # следующая граница — только в более поздней паузе
+        if j + 1 < len(gaps):
+            j += 1
+    return result
+
+def _apply_reading_speed(cues, limit, max_cps):
+    # растягиваем титр в паузу после него, если текст не успеть прочитать
+    for i, cue in enumerate(cues):
+        need = len(cue["text"]) / max_cps
+        if cue["end"] - cue["start"] < need:
+            stop = cues[i + 1]["start"] if i + 1 < len(cues) else limit
+            cue["end"] = max(cue["end"], min(cue["start"] + need, stop))
+    return cues
+
+def split_segment(seg, max_chars=80, max_cps=None):
+    """
+    Split one long segment into cues of at most max_chars.
+    - Whisper/Vosk words that match the text: cues are cut between real words,
+      preferring sentence ends and pauses, and timed by those words.
+    - Words that do not match the text (e.g. Vosk's own transcript): text is split by
+      smart_split_text and the boundaries snap to the nearest pause between words.
+    - No words: time is shared in proportion to the characters of each part.
+    With max_cps, a cue too short to read is extended into the following pause.
+    """
+    text = seg["text"].strip()
+    start, end = seg["start"], seg["end"]
+    words = [w for w in seg.get("words") or [] if "start" in w and "end" in w]
+    tokens = text.split()
+    times = align_tokens(tokens, words) if words else None
+    if times:
+        cues = []
+        for group in _group_tokens(tokens, times, max_chars):
+            cues.append({
+                "start": min(max(times[group[0]][0], start), end),
+                "end": min(max(times[group[-1]][1], start), end),
+                "text": " ".join(tokens[i] for i in group),
+            })
+        cues[0]["start"] = start
+        cues[-1]["end"] = end
+        for prev, cue in zip(cues, cues[1:]):
+            prev["end"] = min(prev["end"], cue["start"])
+    else:
+        parts = smart_split_text(text, max_chars)
+        total = sum(len(p) for p in parts) or 1
+        bounds, acc = [], 0
+        for part in parts[:-1]:
+            acc += len(part)
+            bounds.append(start + (end - start) * acc / total)
+        edges = _snap_to_word_gaps(bounds, words) if words else [(t, t) for t in bounds]
+        edges = [(min(max(a, start), end), min(max(b, start), end)) for a, b in edges]
+        starts = [start] + [b for _, b in edges]
+        ends = [a for a, _ in edges] + [end]
+        cues = [{"start": s0, "end": e0, "text": p.strip()} for s0, e0, p in zip(starts, ends, parts)]
+    if max_cps:
+        _apply_reading_speed(cues, end, max_cps)
+    return cues
+
+def split_long_segments(segments, max_chars=80, max_cps=None):
+    """
+    Делит длинные сегменты на несколько по max_chars (см. split_segment):
+    по времени слов, если они есть, иначе пропорционально длине частей.
     """
     new_segments = []
     for seg in segments:
-        text = seg["text"].strip()
-        if len(text) <= max_chars:
+        if len(seg["text"].strip()) <= max_chars:
             new_segments.append(seg)
             continue
-        parts = smart_split_text(text, max_chars)
-        n_parts = len(parts)
-        starts = [seg["start"] + (seg["end"] - seg["start"]) * i / n_parts for i in range(n_parts)]
-        ends = [seg["start"] + (seg["end"] - seg["start"]) * (i+1) / n_parts for i in range(n_parts)]
-        for i, part_text in enumerate(parts):
-            new_segments.append({
-                "start": starts[i],
-                "end": ends[i],
-                "text": part_text.strip()
-            })
+        new_segments.extend(split_segment(seg, max_chars, max_cps))
     return new_segments
 
-def write_srt(filename, segments, width=80):
+def clean_cue_text(text):
+    # Удаляем все переносы строк и лишние пробелы внутри титра
+    return " ".join(text.split())
+
+class SubtitleWriter(ABC):
+    """
+    Incremental subtitle writer: cues are numbered, split to ``width`` and written
+    as segments arrive. Output is buffered and written every ``buffer_cues`` cues,
+    so it can consume a segment generator of any length.
+    With bilingual=True, write(seg, second) puts both texts into one cue (unsplit).
+    """
+
+    extension = ""
+
+    def __init__(self, filename, width=80, bilingual=False, buffer_cues=1000, max_cps=None):
+        self.width = width
+        self.max_cps = max_cps
+        self.bilingual = bilingual
+        self.buffer_cues = buffer_cues
+        self.index = 0
+        self._pending: List[str] = []
+        self.file = open(filename, "w", encoding="utf-8", buffering=1 << 20)
+        self.write_header()
+
+    def write_header(self):
+        pass
+
+    @abstractmethod
+    def format_cue(self, index: int, start: float, end: float, lines: List[str]) -> str:
+        """
+        Text of one cue in the writer's format.
+        """
+
+    def _emit(self, start, end, lines):
+        self.index += 1
+        self._pending.append(self.format_cue(self.index, start, end, lines))
+        if len(self._pending) >= self.buffer_cues:
+            self.file.writelines(self._pending)
+            self._pending.clear()
+
+    def write(self, seg, second=None):
+        if self.bilingual:
+            lines = [clean_cue_text(seg["text"])]
+            if second is not None:
+                lines.append(clean_cue_text(second["text"]))
+            self._emit(seg["start"], seg["end"], lines)
+            return
+        if len(seg["text"].strip()) <= self.width:
+            self._emit(seg["start"], seg["end"], [clean_cue_text(seg["text"])])
+            return
+        for part in split_segment(seg, self.width, self.max_cps):
+            self._emit(part["start"], part["end"], [clean_cue_text(part["text"])])
+
+    def flush(self):
+        self.file.writelines(self._pending)
+        self._pending.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SrtWriter(SubtitleWriter):
+    extension = "srt"
+
+    def format_cue(self, index, start, end, lines):
+        return f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n" + "\n".join(lines) + "\n\n"
+
+class VttWriter(SubtitleWriter):
+    extension = "vtt"
+
+    def write_header(self):
+        self.file.write("WEBVTT\n\n")
+
+    def format_cue(self, index, start, end, lines):
+        return f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n" + "\n".join(lines) + "\n\n"
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1920
+PlayResY: 1080
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,56,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,1,2,60,60,50,1
+Style: Second,Arial,48,&H0000FFFF,&H000000FF,&H00000000,&H80000000,0,1,0,0,100,100,0,0,1,2,1,8,60,60,50,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+def ass_escape(text: str) -> str:
+    """
+    Cue text safe for an ASS Dialogue line: braces would open override blocks,
+    line breaks become \\N.
+    """
+    text = text.replace("{", "\\{").replace("}", "\\}")
+    return "\\N".join(text.splitlines())
+
+class AssWriter(SubtitleWriter):
+    """
+    ASS: the first text in the Default style (bottom), a bilingual second text
+    in the Second style (top).
+    """
+
+    extension = "ass"
+
+    def write_header(self):
+        self.file.write(ASS_HEADER)
+
+    def format_cue(self, index, start, end, lines):
+        timing = f"{format_ass_timestamp(start)},{format_ass_timestamp(end)}"
+        out = f"Dialogue: 0,{timing},Default,,0,0,0,,{ass_escape(lines[0])}\n"
+        if len(lines) > 1:
+            out += f"Dialogue: 0,{timing},Second,,0,0,0,,{ass_escape(lines[1])}\n"
+        return out
+
+WRITERS = {cls.extension: cls for cls in (SrtWriter, VttWriter, AssWriter)}
+
+def write_subtitles(filename, segments, fmt="srt", width=80, max_cps=None):
+    """
+    Write subtitle segments (any iterable, consumed lazily) in srt, vtt or ass.
+    """
+    with WRITERS[fmt](filename, width=width, max_cps=max_cps) as writer:
+        for seg in segments:
+            writer.write(seg)
+
+def write_srt(filename, segments, width=80, max_cps=None):
     """
     Write subtitle segments to an .srt file.
     Each segment includes a start/end timestamp and wrapped text.
     """
-    segments = split_long_segments(segments, max_chars=width)
-    with open(filename, "w", encoding="utf-8") as srt:
-        for i, seg in enumerate(segments, 1):
-            start = format_timestamp(seg["start"])
-            end = format_timestamp(seg["end"])
-            # 1. Удаляем все переносы строк внутри титра
-            text = seg["text"].replace("\n", " ").replace("\r", " ")
-            text = re.sub(r"\s+", " ", text).strip()
-            # 2. Не добавляем никаких искусственных переносов строк
-            srt.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+    write_subtitles(filename, segments, "srt", width, max_cps)
+
+def write_bilingual(filename, segments, translated, fmt="srt"):
+    """
+    One track with both languages: each cue holds the original and its translation.
+    """
+    with WRITERS[fmt](filename, bilingual=True) as writer:
+        for seg, second in zip(segments, translated):
+            writer.write(seg, second)
+
+# 📖 Чтение SRT / WebVTT
+def iter_cues(f: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Parse SRT or WebVTT cues from lines; yields {"start", "end", "text"}.
+    Cue numbers/identifiers, the WEBVTT header, NOTE/STYLE blocks and cue settings are skipped.
+    """
+    block: List[str] = []
+    for line in f:
+        line = line.rstrip("\r\n").lstrip("\ufeff")
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            cue = _parse_block(block)
+            if cue is not None:
+                yield cue
+            block = []
+    if block:
+        cue = _parse_block(block)
+        if cue is not None:
+            yield cue
+
+def _parse_block(block: List[str]) -> Optional[Dict[str, Any]]:
+    for i, line in enumerate(block[:2]):
+        if "-->" in line:
+            start, _, rest = line.partition("-->")
+            end = rest.split()[0] if rest.split() else ""
+            return {"start": parse_timestamp(start), "end": parse_timestamp(end), "text": "\n".join(block[i + 1:])}
+    return None
+
+def read_subtitles(filename) -> List[Dict[str, Any]]:
+    with open(filename, encoding="utf-8") as f:
+        return list(iter_cues(f))
+
+def read_srt(filename) -> List[Dict[str, Any]]:
+    return read_subtitles(filename)
+
+def read_vtt(filename) -> List[Dict[str, Any]]:
+    return read_subtitles(filename)
+
+def strip_leading_dash(text):
+    # Удалить только в начале строки: любые тире, дефисы, длинные тире и пробелы
+    return re.sub(r"^[\s\-—–]+", "", text)
+
+def strip_final_dot_if_single_sentence(text):
+    text = text.strip()
+    # Проверяем, что только одно предложение (нет других .!? внутри)
+    if re.match(r"^[^.?!]+[.]$", text):
+        text = text[:-1]
+    return text
 
 def remove_leading_dash(segments):
     """
@@ -82,11 +381,8 @@ def remove_leading_dash(segments):
     """
     new_segments = []
     for seg in segments:
-        text = seg["text"]
-        # Удалить только в начале строки: любые тире, дефисы, длинные тире и пробелы
-        cleaned = re.sub(r"^[\s\-—–]+", "", text)
         seg = dict(seg)
-        seg["text"] = cleaned
+        seg["text"] = strip_leading_dash(seg["text"])
         new_segments.append(seg)
     return new_segments
 
@@ -94,14 +390,15 @@ def remove_final_dot_if_single_sentence(segments):
     """
     Если сегмент состоит из одного предложения и заканчивается точкой, точка удаляется.
     """
-    import re
     new_segments = []
     for seg in segments:
-        text = seg["text"].strip()
-        # Проверяем, что только одно предложение (нет других .!? внутри)
-        if re.match(r"^[^.?!]+[.]$", text):
-            text = text[:-1]
         seg = dict(seg)
-        seg["text"] = text
+        seg["text"] = strip_final_dot_if_single_sentence(seg["text"])
         new_segments.append(seg)
     return new_segments
+
+def clean_store(store):
+    """
+    remove_leading_dash + remove_final_dot_if_single_sentence on a SegmentStore, in place.
+    """
+    return store.map_texts(lambda text: strip_final_dot_if_single_sentence(strip_leading_dash(text)))
@@ -10,3 +10,28 @@ def test_preprocess_audio_missing_ffmpeg(monkeypatch):
         assert "FFmpeg is not installed" in str(e)
     else:
         assert False, "Expected RuntimeError for missing ffmpeg"
+
+@pytest.mark.skipif(__import__("shutil").which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_preprocess_audio_array_in_memory(tmp_path):
+    import numpy as np
+    import soundfile as sf
+    from audio_utils import SAMPLE_RATE, preprocess_audio_array
+    t = np.arange(44100 * 2) / 44100
+    sf.write(tmp_path / "in.wav", np.stack([np.sin(2 * np.pi * 440 * t)] * 2, axis=1) * 0.3, 44100)
+    audio = preprocess_audio_array(str(tmp_path / "in.wav"), session_dir=str(tmp_path))
+    assert audio.dtype == np.float32
+    assert abs(len(audio) - 2 * SAMPLE_RATE) < SAMPLE_RATE // 100
+    assert not (tmp_path / "denoised.wav").exists()
+    preprocess_audio_array(str(tmp_path / "in.wav"), session_dir=str(tmp_path), keep_intermediates=True)
+    assert (tmp_path / "cleaned.wav").exists() and (tmp_path / "denoised.wav").exists()
+
+def test_reduce_noise_chunked_covers_signal_and_is_deterministic():
+    import numpy as np
+    from audio_utils import reduce_noise_chunked, iter_denoised_blocks
+    rng = np.random.default_rng(1)
+    audio = rng.normal(0, 0.1, 16000 * 7 + 123).astype(np.float32)
+    assert sum(len(p) for p in iter_denoised_blocks(audio, 16000, block_sec=2, overlap_sec=0.25)) == len(audio)
+    serial = reduce_noise_chunked(audio.copy(), 16000, block_sec=2, overlap_sec=0.25)
+    parallel = reduce_noise_chunked(audio.copy(), 16000, block_sec=2, overlap_sec=0.25, workers=2)
+    assert np.array_equal(serial, parallel)
+    assert np.std(serial) < np.std(audio)
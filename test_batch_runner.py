@@ -0,0 +1,91 @@
+import argparse
+import os
+
+import numpy as np
+
+import batch_runner
+from session_manifest import find_completed_session, options_key
+
+
+def make_args(batch, **overrides):
+    from main import parse_args
+    args = parse_args(["--batch", batch, "--no-translation-cache", "--no-result-cache"])
+    return argparse.Namespace(**{**vars(args), **overrides})
+
+
+def test_collect_inputs(tmp_path):
+    for name in ("b.mp3", "a.WAV", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+    assert [os.path.basename(p) for p in batch_runner.collect_inputs(str(tmp_path))] == ["a.WAV", "b.mp3"]
+    assert [os.path.basename(p) for p in batch_runner.collect_inputs(str(tmp_path / "*.mp3"))] == ["b.mp3"]
+
+
+def test_options_key_ignores_runtime_only_options(tmp_path):
+    args = make_args(str(tmp_path))
+    assert options_key(args) == options_key(argparse.Namespace(**{**vars(args), "translate_workers": 16}))
+    assert options_key(args) != options_key(argparse.Namespace(**{**vars(args), "model": "small"}))
+
+
+def test_options_key_tracks_hallucination_file_contents(tmp_path):
+    markers = tmp_path / "markers.txt"
+    markers.write_text("Продолжение следует\n", encoding="utf-8")
+    args = make_args(str(tmp_path), hallucination_file=str(markers))
+    before = options_key(args)
+    assert options_key(args) == before
+    markers.write_text("Продолжение следует\nСпасибо за просмотр\n", encoding="utf-8")
+    assert options_key(args) != before
+
+
+def test_run_batch_pipelines_and_skips_done_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("in")
+    for name in ("one.wav", "two.wav"):
+        with open(os.path.join("in", name), "w") as f:
+            f.write(name)
+    calls = []
+
+    def fake_preprocess(args, session_dir, metrics):
+        calls.append(("preprocess", os.path.basename(args.file_path)))
+        return np.zeros(16000, dtype=np.float32)
+
+    def fake_transcribe(args, audio, session_dir, metrics):
+        calls.append(("transcribe", os.path.basename(args.file_path)))
+        open(os.path.join(session_dir, "output_ru.srt"), "w").close()
+        return [{"start": 0.0, "end": 1.0, "text": "да"}]
+
+    def fake_translate(args, segments, session_dir, metrics):
+        calls.append(("translate", os.path.basename(args.file_path)))
+        open(os.path.join(session_dir, "output_en_translated.srt"), "w").close()
+
+    monkeypatch.setattr(batch_runner, "ensure_vosk_models", lambda: None)
+    monkeypatch.setattr(batch_runner, "preprocess_stage", fake_preprocess)
+    monkeypatch.setattr(batch_runner, "transcribe_and_filter", fake_transcribe)
+    monkeypatch.setattr(batch_runner, "translate_stage", fake_translate)
+    monkeypatch.setattr(batch_runner, "get_session_dir", lambda path: (os.makedirs(f"sessions/{os.path.basename(path)}", exist_ok=True), f"sessions/{os.path.basename(path)}")[1])
+
+    args = make_args("in")
+    items = batch_runner.run_batch(args)
+    assert [i["status"] for i in items] == ["done", "done"]
+    for stage in ("preprocess", "transcribe", "translate"):
+        assert [f for s, f in calls if s == stage] == ["one.wav", "two.wav"]
+    assert items[0]["audio_sec"] == 1.0
+
+    calls.clear()
+    items = batch_runner.run_batch(args)
+    assert [i["status"] for i in items] == ["skipped", "skipped"]
+    assert calls == []
+    assert find_completed_session(items[0]["sha256"], options_key(make_args("in", model="tiny"))) is None
+
+
+def test_batch_finishes_when_session_setup_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("in")
+    (tmp_path / "in" / "one.wav").write_text("one")
+
+    def no_session(path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(batch_runner, "ensure_vosk_models", lambda: None)
+    monkeypatch.setattr(batch_runner, "get_session_dir", no_session)
+    items = batch_runner.run_batch(make_args("in"))
+    assert [i["status"] for i in items] == ["failed"] and "disk full" in items[0]["error"]
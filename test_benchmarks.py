@@ -0,0 +1,25 @@
+import json
+
+from benchmarks import run
+from benchmarks.synthetic import speech_like_audio, synthetic_segments
+
+
+def test_synthetic_inputs_are_deterministic():
+    assert synthetic_segments(600, seed=1) == synthetic_segments(600, seed=1)
+    audio = speech_like_audio(10, seed=1)
+    assert len(audio) == 160000 and abs(audio).max() <= 1.0
+    assert (audio == speech_like_audio(10, seed=1)).all()
+
+
+def test_suite_writes_json_and_flags_regressions(tmp_path, capsys):
+    out = tmp_path / "now.json"
+    assert run.main(["--audio-sec", "5", "--text-sec", "300", "--repeat", "1", "--skip-preprocess",
+                     "--output", str(out)]) == 0
+    result = json.loads(out.read_text())
+    assert {"transcribe", "diarize", "process_segments", "write_srt", "translate_segments"} <= set(result["stages"])
+
+    baseline = json.loads(out.read_text())
+    baseline["stages"]["process_segments"]["sec"] /= 100
+    assert run.compare(result, baseline, threshold=0.2, min_delta=0.0) >= 1
+    assert run.compare(result, result, threshold=0.2, min_delta=0.0) == 0
+    assert "🔺" in capsys.readouterr().out
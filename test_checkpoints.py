@@ -0,0 +1,107 @@
+import argparse
+
+import numpy as np
+
+import pipeline
+from checkpoints import CheckpointStore, read_input
+from metrics import PipelineMetrics
+
+
+def make_args(tmp_path, **overrides):
+    values = dict(file_path=str(tmp_path / "in.wav"), model="tiny", workers=1, hallucination_file=None,
+                  denoise_block_sec=30.0, noise_profile="rolling")
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_stages_reused_across_sessions(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_preprocess(args, session_dir, metrics):
+        calls.append("preprocess")
+        return np.linspace(-0.1, 0.1, 16000, dtype=np.float32)
+
+    def fake_transcribe(args, audio, metrics):
+        calls.append("transcribe")
+        return [{"start": 0.0, "end": 1.0, "text": " Привет, как дела у всех", "no_speech_prob": 0.0},
+                {"start": 1.0, "end": 2.0, "text": " Тишина в зале", "no_speech_prob": 0.9}]
+
+    def fake_diarize(pcm, model_path, spk_model_path, sample_rate):
+        calls.append("diarize")
+        return [{"start": 0.0, "end": 1.0, "speaker": "spk1"}]
+
+    monkeypatch.setattr(pipeline, "preprocess_stage", fake_preprocess)
+    monkeypatch.setattr(pipeline, "transcribe_stage", fake_transcribe)
+    monkeypatch.setattr(pipeline, "diarize_audio_vosk", fake_diarize)
+    (tmp_path / "in.wav").write_bytes(b"RIFF")
+    sessions = tmp_path / "sessions"
+
+    def run(name, **overrides):
+        session_dir = sessions / name
+        session_dir.mkdir(parents=True)
+        store = CheckpointStore(str(session_dir))
+        store.write_input(str(tmp_path / "in.wav"), "abc")
+        segments = pipeline.checkpointed_transcribe(make_args(tmp_path, **overrides), str(session_dir),
+                                                    PipelineMetrics(), store, "abc")
+        return segments, store
+
+    first, _ = run("first")
+    assert sorted(calls) == ["diarize", "preprocess", "transcribe"]
+    assert read_input(str(sessions / "first"))["sha256"] == "abc"
+
+    calls.clear()
+    second, store = run("second")
+    assert calls == [] and second.to_dicts() == first.to_dicts()
+    assert "filter" in store.hits
+    assert (sessions / "second" / "output_ru.srt").read_text(encoding="utf-8").count("Привет") == 1
+    # журнал отброшенных сегментов восстанавливается из чекпоинта
+    log = (sessions / "first" / "repetitions.log").read_text(encoding="utf-8")
+    assert "Тишина в зале" in log
+    assert (sessions / "second" / "repetitions.log").read_text(encoding="utf-8") == log
+
+    # новые настройки фильтрации: Whisper и Vosk не перезапускаются
+    markers = tmp_path / "markers.txt"
+    markers.write_text("как дела\n", encoding="utf-8")
+    calls.clear()
+    third, store = run("third", hallucination_file=str(markers))
+    assert calls == []
+    assert set(store.hits) >= {"transcribe", "diarize"}
+
+    # другая модель: аудио не сохранялось, предобработка повторяется
+    calls.clear()
+    run("fourth", model="small")
+    assert calls == ["preprocess", "transcribe"]
+
+    # с --keep-intermediates аудио сохраняется и следующая транскрипция берёт его из чекпоинта
+    calls.clear()
+    run("fifth", model="medium", keep_intermediates=True)
+    run("sixth", model="base", keep_intermediates=True)
+    assert calls == ["preprocess", "transcribe", "transcribe"]
+
+
+def test_failed_diarization_is_retried(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_diarize(pcm, model_path, spk_model_path, sample_rate):
+        calls.append("diarize")
+        if len(calls) == 1:
+            raise RuntimeError("vosk crashed")
+        return [{"start": 0.0, "end": 1.0, "speaker": "spk1"}]
+
+    monkeypatch.setattr(pipeline, "preprocess_stage",
+                        lambda args, session_dir, metrics: np.linspace(-0.1, 0.1, 16000, dtype=np.float32))
+    monkeypatch.setattr(pipeline, "transcribe_stage", lambda args, audio, metrics: [
+        {"start": 0.0, "end": 1.0, "text": " Привет, как дела у всех", "no_speech_prob": 0.0}])
+    monkeypatch.setattr(pipeline, "diarize_audio_vosk", fake_diarize)
+    session_dir = tmp_path / "sessions" / "one"
+    session_dir.mkdir(parents=True)
+
+    def run():
+        store = CheckpointStore(str(session_dir))
+        return pipeline.checkpointed_transcribe(make_args(tmp_path), str(session_dir), PipelineMetrics(), store, "abc")
+
+    assert "words" not in run().to_dicts()[0]
+    # Vosk запускается снова, его слова попадают в сегменты; дальше — чекпоинт
+    assert "words" in run().to_dicts()[0]
+    run()
+    assert calls == ["diarize", "diarize"]
@@ -0,0 +1,48 @@
+import random
+
+from diarization_utils import SpeakerIndex, assign_speakers_to_segments, merge_speaker_turns
+
+
+def test_merge_speaker_turns():
+    words = [{"start": 0.0, "end": 0.4, "speaker": "spk1"}, {"start": 0.5, "end": 0.9, "speaker": "spk1"},
+             {"start": 2.0, "end": 2.3, "speaker": "spk1"}, {"start": 2.4, "end": 2.6, "speaker": "spk2"}]
+    assert merge_speaker_turns(words) == [
+        {"start": 0.0, "end": 0.9, "speaker": "spk1"},
+        {"start": 2.0, "end": 2.3, "speaker": "spk1"},
+        {"start": 2.4, "end": 2.6, "speaker": "spk2"},
+    ]
+
+
+def test_overlap_weighted_votes_and_word_level():
+    words = [{"start": 0.0, "end": 0.9, "speaker": "a"}, {"start": 1.2, "end": 1.5, "speaker": "b"},
+             {"start": 1.6, "end": 1.9, "speaker": "b"}]
+    segments = [
+        {"start": 0.5, "end": 2.2, "words": [{"start": 0.5, "end": 0.9}, {"start": 1.3, "end": 1.4}]},
+        {"start": 5.0, "end": 6.0},
+    ]
+    assign_speakers_to_segments(segments, words, word_level=True, max_gap=0.0)
+    # 0.3 + 0.3s of "b" outvote the single longest overlap (0.4s of "a")
+    assert segments[0]["speaker"] == "b"
+    assert [w["speaker"] for w in segments[0]["words"]] == ["a", "b"]
+    assert segments[1]["speaker"] == "Unknown"
+
+
+def test_index_matches_brute_force():
+    rng = random.Random(3)
+    turns, t = [], 0.0
+    for _ in range(300):
+        start = t + rng.random()
+        t = start + rng.random() * 3
+        turns.append({"start": start, "end": t, "speaker": rng.choice("xyz")})
+    index = SpeakerIndex(turns)
+    for _ in range(200):
+        s = rng.random() * t
+        e = s + rng.random() * 10
+        expected = {}
+        for turn in turns:
+            overlap = min(e, turn["end"]) - max(s, turn["start"])
+            if overlap > 0:
+                expected[turn["speaker"]] = expected.get(turn["speaker"], 0.0) + overlap
+        got = index.votes(s, e)
+        assert got.keys() == expected.keys()
+        assert all(abs(got[k] - expected[k]) < 1e-9 for k in got)
@@ -0,0 +1,36 @@
+from hallucination_matcher import HallucinationMatcher, normalize_for_match, normalize_with_map
+from segment_filter import is_hallucination, iter_process_segments, remove_hallucinations
+
+
+def test_exact_matches_old_behaviour():
+    markers = ["Субтитры сделал DimaTorzok", "Продолжение следует", "продолжение"]
+    matcher = HallucinationMatcher(markers)
+    text = "Ну что ж. ПРОДОЛЖЕНИЕ СЛЕДУЕТ субтитры сделал dimatorzok"
+    assert matcher.clean(text) == (True, "Ну что ж.")
+    assert is_hallucination(text, markers) and remove_hallucinations(text, markers) == "Ну что ж."
+    assert matcher.clean("Обычная фраза") == (False, "Обычная фраза")
+    assert len(matcher) == 3 and list(matcher) == markers
+
+
+def test_normalized_and_fuzzy():
+    text = "Спасибо за просмотр! Продолжение  следует... Всё"
+    norm, index = normalize_with_map(text)
+    assert norm == normalize_for_match(text) == "спасибо за просмотр продолжение следует все"
+    assert len(index) == len(norm)
+
+    assert not HallucinationMatcher(["продолжение, следует"]).search(text)
+    normalized = HallucinationMatcher(["продолжение, следует"], mode="normalized")
+    assert normalized.clean(text) == (True, "Спасибо за просмотр!  Всё")
+
+    fuzzy = HallucinationMatcher(["Редактор субтитров А.Синецкая Корректор А.Егорова"], mode="fuzzy")
+    found, cleaned = fuzzy.clean("Хорошо. Редактор субтитров А. Синецкая Корректор А. Егорава")
+    assert found and cleaned == "Хорошо."
+    assert not fuzzy.search("Редактор нашего журнала")
+
+
+def test_process_segments_with_matcher(tmp_path):
+    segments = [{"start": 0.0, "end": 1.0, "text": " Продолжение следует...", "no_speech_prob": 0.0},
+                {"start": 1.0, "end": 2.0, "text": " Привет, продолжение следует", "no_speech_prob": 0.0}]
+    with open(tmp_path / "rep.log", "w", encoding="utf-8") as log:
+        out = list(iter_process_segments(segments, log, HallucinationMatcher(["продолжение следует"], "normalized")))
+    assert [s["text"] for s in out] == ["Привет,"]
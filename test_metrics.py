@@ -0,0 +1,47 @@
+import json
+import time
+
+from metrics import PipelineMetrics, maybe_profile
+from visual_log import ProgressBar
+
+
+def test_stage_records_and_json(tmp_path):
+    metrics = PipelineMetrics()
+    with metrics.stage("transcribe", audio_sec=10.0) as record:
+        time.sleep(0.05)
+        record["segments"] = 3
+    metrics.count("transcribe", model_load_sec=1.5)
+
+    data = json.loads(open(metrics.write(str(tmp_path)), encoding="utf-8").read())
+    stage = data["stages"]["transcribe"]
+    assert stage["segments"] == 3 and stage["model_load_sec"] == 1.5
+    assert stage["wall_sec"] >= 0.05
+    assert 0 < stage["audio_sec_per_sec"] <= 200
+    assert stage["process_peak_rss_mb"] > 0 and stage["peak_rss_growth_mb"] >= 0
+    assert data["peak_rss_mb"] >= stage["process_peak_rss_mb"]
+    assert "transcribe" in metrics.summary()
+
+
+def test_peak_growth_is_per_stage():
+    from metrics import _maxrss_mb, current_rss_mb
+    metrics = PipelineMetrics()
+    # поднимаем пик процесса на ~150 МБ над уже достигнутым
+    size = int(_maxrss_mb() - (current_rss_mb() or 0.0) + 150) << 20
+    with metrics.stage("big"):
+        block = bytearray(size)
+        block[::4096] = b"x" * len(block[::4096])
+        del block
+    with metrics.stage("small"):
+        pass
+    assert metrics.stages["big"]["peak_rss_growth_mb"] > 100
+    assert metrics.stages["small"]["peak_rss_growth_mb"] < 50
+    assert metrics.stages["small"]["process_peak_rss_mb"] >= metrics.stages["big"]["process_peak_rss_mb"]
+
+
+def test_profile_and_progress(tmp_path, capsys):
+    with maybe_profile(str(tmp_path), True):
+        with ProgressBar("work", 4, unit="items", min_interval=0) as bar:
+            for _ in range(4):
+                bar.update()
+    assert (tmp_path / "profile.pstats").exists()
+    assert "4/4 items" in capsys.readouterr().out
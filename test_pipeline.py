@@ -0,0 +1,71 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+import pipeline
+from metrics import PipelineMetrics
+
+
+def test_diarization_overlaps_transcription(tmp_path, monkeypatch):
+    def fake_transcribe(args, audio, metrics):
+        time.sleep(0.3)
+        return [{"start": 0.0, "end": 1.0, "text": " Привет, как дела у всех", "no_speech_prob": 0.0}]
+
+    def fake_diarize(pcm, model_path, spk_model_path, sample_rate):
+        assert isinstance(pcm, bytes) and len(pcm) == 2 * 16000
+        time.sleep(0.3)
+        return [{"start": 0.0, "end": 1.0, "speaker": "spk1"}]
+
+    monkeypatch.setattr(pipeline, "transcribe_stage", fake_transcribe)
+    monkeypatch.setattr(pipeline, "diarize_audio_vosk", fake_diarize)
+    args = argparse.Namespace(hallucination_file=None)
+    start = time.perf_counter()
+    metrics = PipelineMetrics()
+    segments = pipeline.transcribe_and_filter(args, np.zeros(16000, dtype=np.float32), str(tmp_path), metrics)
+    assert time.perf_counter() - start < 0.55
+    assert [s["text"] for s in segments] == ["Привет, как дела у всех"]
+    assert "words: 1" in (tmp_path / "vosk.log").read_text()
+    assert metrics.stages["diarize"]["words"] == 1
+    assert metrics.stages["filter"]["segments_out"] == 1
+
+
+def test_incomplete_results_are_not_cached(tmp_path):
+    from translate_stub import StubLibreTranslate
+    args = argparse.Namespace(file_path=str(tmp_path / "in.wav"), translate_url=None, translate_endpoints=None,
+                              translate_batch_size=8, translate_workers=1, translation_model_version="test",
+                              translation_cache_size=10, no_translation_cache=True, subtitle_formats=["srt"])
+    segments = [{"start": 0.0, "end": 1.0, "text": "Привет"}]
+    metrics = PipelineMetrics()
+    # каждый запрос отвечает 500: перевод не удаётся
+    with StubLibreTranslate(max_batch=0) as stub:
+        args.translate_url = stub.url
+        translated = pipeline.translate_stage(args, segments, str(tmp_path), metrics)
+    assert metrics.info["translation_failed_segments"] == 1
+
+    class FakeCache:
+        puts = 0
+
+        def put(self, *a):
+            self.puts += 1
+
+    cache = FakeCache()
+    pipeline.store_result(args, cache, None, str(tmp_path), segments, translated, metrics)
+    failed_diarization = PipelineMetrics()
+    failed_diarization.info["diarization_failed"] = True
+    pipeline.store_result(args, cache, None, str(tmp_path), segments, translated, failed_diarization)
+    assert cache.puts == 0
+    pipeline.store_result(args, cache, None, str(tmp_path), segments, translated, PipelineMetrics())
+    assert cache.puts == 1
+
+
+def test_session_dirs_are_unique(tmp_path, monkeypatch):
+    from datetime import datetime
+    monkeypatch.chdir(tmp_path)
+    now = datetime(2026, 1, 2, 3, 4, 5)
+    # одно имя файла в одну секунду (например, a/in.wav и b/in.wav в пакете)
+    dirs = [pipeline.get_session_dir(path, now) for path in ("a/in.wav", "b/in.wav", "a/in.wav")]
+    assert dirs == ["sessions/in_2026-01-02_03-04-05", "sessions/in_2026-01-02_03-04-05_2",
+                    "sessions/in_2026-01-02_03-04-05_3"]
+    assert all(os.path.isdir(d) for d in dirs)
@@ -0,0 +1,83 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from result_cache import ResultCache, bit_error_rate, fingerprint_pcm
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def tones(seed, sec=20, sr=22050):
+    rng = np.random.default_rng(seed)
+    t = np.arange(sec * sr) / sr
+    audio = np.zeros_like(t)
+    for _ in range(6):
+        gate = np.sin(2 * np.pi * rng.uniform(0.2, 3) * t + rng.uniform(0, 6)) > 0.3
+        audio += gate * np.sin(2 * np.pi * rng.uniform(150, 2500) * t) * rng.uniform(0.05, 0.2)
+    return audio.astype(np.float32), sr
+
+
+def write_session(path, text):
+    path.mkdir()
+    (path / "output_ru.srt").write_text(f"1\n00:00:00,000 --> 00:00:01,000\n{text}\n\n", encoding="utf-8")
+    return str(path)
+
+
+def test_fingerprint_separates_recordings():
+    a = fingerprint_pcm(tones(1, sr=8000)[0])
+    assert a.shape == (154, 4)
+    assert bit_error_rate(a, a) == 0.0
+    assert bit_error_rate(a, a[2:]) == 0.0
+    assert bit_error_rate(a, fingerprint_pcm(tones(2, sr=8000)[0])) > 0.35
+
+
+@needs_ffmpeg
+def test_reencoded_audio_hits_and_other_audio_misses(tmp_path):
+    import soundfile as sf
+    audio, sr = tones(1)
+    sf.write(tmp_path / "a.wav", audio, sr)
+    sf.write(tmp_path / "b.wav", tones(2)[0], sr)
+    subprocess.run(["ffmpeg", "-v", "error", "-i", str(tmp_path / "a.wav"), "-b:a", "32k", str(tmp_path / "a.mp3")], check=True)
+
+    with ResultCache(str(tmp_path / "cache")) as cache:
+        entry, fp = cache.lookup("opts", str(tmp_path / "a.wav"), "sha-a")
+        assert entry is None and fp.bits is not None and fp.duration == pytest.approx(20.0)
+        cache.put("opts", fp, str(tmp_path / "a.wav"), write_session(tmp_path / "s1", "привет"), {"ru": [{"text": "привет"}]})
+
+        entry, _ = cache.lookup("opts", str(tmp_path / "a.mp3"), "sha-mp3")
+        assert entry is not None
+        out = tmp_path / "s2"
+        out.mkdir()
+        assert cache.restore(entry, str(out)) == {"ru": [{"text": "привет"}]}
+        assert "привет" in (out / "output_ru.srt").read_text(encoding="utf-8")
+
+        assert cache.lookup("opts", str(tmp_path / "b.wav"), "sha-b")[0] is None
+        assert cache.lookup("other-opts", str(tmp_path / "a.mp3"), "sha-mp3")[0] is None
+        assert cache.stats()["hits"] == 1
+
+
+def test_undecodable_input_is_matched_by_hash_and_eviction(tmp_path):
+    with ResultCache(str(tmp_path / "cache"), max_bytes=10_000) as cache:
+        (tmp_path / "x.bin").write_bytes(b"not audio")
+        entry, fp = cache.lookup("opts", str(tmp_path / "x.bin"), "sha-x")
+        assert entry is None and fp.bits is None
+        first = cache.put("opts", fp, str(tmp_path / "x.bin"), write_session(tmp_path / "s1", "a" * 3000), {})
+        assert cache.lookup("opts", str(tmp_path / "x.bin"), "sha-x")[0].endswith(first)
+
+        fp = fp._replace(sha256="sha-y")
+        cache.put("opts", fp, str(tmp_path / "x.bin"), write_session(tmp_path / "s2", "b" * 8000), {})
+        assert cache.stats()["entries"] == 1
+        assert cache.lookup("opts", str(tmp_path / "x.bin"), "sha-x")[0] is None
+        assert cache.prune(max_bytes=0)[0] == 1
+        assert cache.stats()["entries"] == 0
+
+
+def test_cache_cli(tmp_path, monkeypatch, capsys):
+    from main import cache_main
+    monkeypatch.setenv("DIMA_TORZOK_CACHE_DIR", str(tmp_path))
+    cache_main(["stats"])
+    assert "0 entries" in capsys.readouterr().out
+    cache_main(["prune", "--older-than", "30"])
+    assert "Removed 0 entries" in capsys.readouterr().out
@@ -0,0 +1,145 @@
+import json
+
+import pytest
+
+from retranslate import atomic_path, load_previous, manifest_path, retranslate, translation_options, write_translation
+from subtitle_io import read_subtitles, write_srt
+from translate_stub import StubLibreTranslate
+from translate_utils import TranslationClient
+from utils import file_sha256
+
+
+@pytest.fixture
+def stub():
+    sent = []
+
+    def translate(text):
+        sent.append(text)
+        return "EN:" + text
+
+    with StubLibreTranslate(translate=translate) as server:
+        server.sent = sent
+        yield server
+
+
+def make_cues(n=20):
+    # пауза 2 с после каждого титра — каждый титр отдельная группа
+    return [{"start": 3.0 * i, "end": 3.0 * i + 1.0, "text": f"Фраза номер {i}"} for i in range(n)]
+
+
+def translate_file(stub, cues, output, previous=None):
+    with TranslationClient(url=stub.url) as client:
+        options = translation_options(client)
+        known, reason = load_previous(output, options, previous)
+        texts, counts = retranslate(cues, known, client, on_progress=lambda d, t: None)
+        write_translation(output, cues, texts, options)
+    return counts, reason
+
+
+def test_only_changed_cues_are_sent(stub, tmp_path):
+    output = str(tmp_path / "output_en_translated.srt")
+    cues = make_cues()
+    counts, reason = translate_file(stub, cues, output)
+    assert reason == "no previous translation" and counts["retranslated"] == 20 and len(stub.sent) == 20
+
+    # правка перевода вручную сохраняется, изменённый и новый титры переводятся заново
+    en = read_subtitles(output)
+    en[0]["text"] = "Hand-fixed"
+    write_srt(output, en)
+    cues[5]["text"] = "Исправленная фраза"
+    cues.append({"start": 100.0, "end": 101.0, "text": "Новый титр"})
+    stub.sent.clear()
+    counts, reason = translate_file(stub, cues, output)
+    assert reason is None
+    assert counts == {"cues": 21, "reused": 19, "retranslated": 2, "groups": 2}
+    assert stub.sent == ["Исправленная фраза", "Новый титр"]
+    texts = [c["text"] for c in read_subtitles(output)]
+    assert texts[0] == "Hand-fixed" and texts[5] == "EN:Исправленная фраза" and texts[1] == "EN:Фраза номер 1"
+
+
+def test_changed_cue_retranslates_its_sentence_group(stub, tmp_path):
+    output = str(tmp_path / "en.srt")
+    cues = [{"start": 0.0, "end": 1.0, "text": "Мы пошли"}, {"start": 1.1, "end": 2.0, "text": "в лес"},
+            {"start": 2.1, "end": 3.0, "text": "за грибами."}, {"start": 3.1, "end": 4.0, "text": "Было холодно."}]
+    translate_file(stub, cues, output)
+    cues[1]["text"] = "в парк"
+    stub.sent.clear()
+    counts, _ = translate_file(stub, cues, output)
+    assert stub.sent == ["Мы пошли в парк за грибами."]
+    assert counts["retranslated"] == 3 and counts["reused"] == 1
+
+
+def test_mismatched_manifest_means_full_translation(stub, tmp_path):
+    output = str(tmp_path / "en.srt")
+    translate_file(stub, make_cues(5), output)
+    write_srt(output, read_subtitles(output)[:3])
+    with TranslationClient(url=stub.url) as client:
+        known, reason = load_previous(output, translation_options(client))
+    assert known == {} and "does not match" in reason
+
+    # трек заменён, а манифест остался от прошлого запуска: число титров то же, тайминги другие
+    translate_file(stub, make_cues(5), output)
+    with open(manifest_path(output), encoding="utf-8") as f:
+        assert json.load(f)["sha256"] == file_sha256(output)
+    write_srt(output, [{**c, "start": c["start"] + 0.5, "end": c["end"] + 0.5} for c in read_subtitles(output)])
+    with TranslationClient(url=stub.url) as client:
+        known, reason = load_previous(output, translation_options(client))
+    assert known == {} and "does not match" in reason
+
+    translate_file(stub, make_cues(5), output)
+    with TranslationClient(url=stub.url, model_version="other") as client:
+        assert load_previous(output, translation_options(client)) == ({}, "translation options changed")
+
+
+def test_failed_cues_are_translated_on_the_next_run(stub, tmp_path):
+    output = str(tmp_path / "en.srt")
+    cues = make_cues(3)
+    # сервер отвечает 500 на всё: титры остаются пустыми и не попадают в манифест как переведённые
+    with StubLibreTranslate(max_batch=0) as down:
+        with TranslationClient(url=down.url) as client:
+            options = translation_options(client)
+            failed = set()
+            texts, _ = retranslate(cues, {}, client, failed=failed)
+            write_translation(output, cues, texts, options, failed=failed)
+    assert texts == ["", "", ""] and failed == {0, 1, 2}
+    with open(manifest_path(output), encoding="utf-8") as f:
+        assert [entry[2] for entry in json.load(f)["cues"]] == [None, None, None]
+
+    counts, reason = translate_file(stub, cues, output)
+    assert reason is None and counts["reused"] == 0 and counts["retranslated"] == 3
+    assert [c["text"] for c in read_subtitles(output)] == [f"EN:Фраза номер {i}" for i in range(3)]
+
+
+def test_translate_command_fails_when_cues_are_not_translated(tmp_path):
+    from main import main
+    write_srt(str(tmp_path / "output_ru.srt"), make_cues(2))
+    with StubLibreTranslate(max_batch=0) as down:
+        with pytest.raises(SystemExit) as exit_info:
+            main(["translate", str(tmp_path), "--translate-url", down.url, "--no-translation-cache"])
+    assert exit_info.value.code == 1
+
+
+def test_atomic_path_keeps_old_file_on_failure(tmp_path):
+    path = tmp_path / "out.srt"
+    path.write_text("old", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with atomic_path(str(path)) as tmp:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("half")
+            raise RuntimeError("interrupted")
+    assert path.read_text(encoding="utf-8") == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.srt"]
+
+
+def test_translate_command_is_incremental(stub, tmp_path):
+    from main import main
+    source = tmp_path / "output_ru.srt"
+    write_srt(str(source), make_cues(10))
+    args = ["translate", str(tmp_path), "--translate-url", stub.url, "--no-translation-cache"]
+    main(args)
+    assert len(stub.sent) == 10
+    stub.sent.clear()
+    main(args)
+    assert stub.sent == []
+    main(args + ["--full"])
+    assert len(stub.sent) == 10
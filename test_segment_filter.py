@@ -0,0 +1,40 @@
+import io
+import time
+
+from segment_filter import find_phrase_loop, is_repetitive, iter_process_segments, rejection_reason, tokenize
+
+
+def test_phrase_loop_detection():
+    words = tokenize("и вот мы видим что " + "а потом мы пошли домой " * 4)
+    n, repeats, covered = find_phrase_loop(words)
+    assert (n, repeats, covered) == (5, 4, 20)
+    assert rejection_reason(" ".join(words), {}) == "repetitive"
+    # мало повторов в словаре, но половина сегмента — петля из фразы
+    assert rejection_reason("раз два раз два раз два три четыре пять шесть", {}) == "phrase_loop"
+    assert find_phrase_loop(tokenize("раз два три четыре пять")) is None
+    assert not is_repetitive("Сегодня мы поговорим о том, как устроена система")
+    assert is_repetitive("да да да да")
+    # короткие повторы одного слова в живой речи не выбрасываются
+    assert rejection_reason("Ну, ну, ну, давай уже", {}) is None
+    assert rejection_reason("Да, да, да, конечно, я понял", {}) is None
+
+
+def test_long_loop_is_linear():
+    text = "спасибо за внимание " * 20000
+    start = time.perf_counter()
+    assert rejection_reason(text.strip(), {"no_speech_prob": 0.1}) == "repetitive"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_reasons_are_logged_and_counted():
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": " Привет всем, начинаем лекцию"},
+        {"start": 1.0, "end": 2.0, "text": " шум", "no_speech_prob": 0.9},
+        {"start": 2.0, "end": 3.0, "text": " ну вот ну вот ну вот ну вот"},
+        {"start": 3.0, "end": 4.0, "text": " Продолжение следует"},
+    ]
+    log, reasons = io.StringIO(), {}
+    out = list(iter_process_segments(segments, log, ["продолжение следует"], reasons, log_every=100))
+    assert [s["text"] for s in out] == ["Привет всем, начинаем лекцию"]
+    assert reasons == {"no_speech": 1, "repetitive": 1, "hallucination": 1}
+    assert "[00:00:02,000] (repetitive) ну вот" in log.getvalue()
@@ -0,0 +1,52 @@
+import random
+
+from segment_filter import process_segments, process_store
+from segment_post import merge_short_segments, merge_store
+from segment_stack import stack_repeated_segments, stack_store
+from segment_store import SegmentStore
+from subtitle_io import clean_store, remove_final_dot_if_single_sentence, remove_leading_dash
+
+
+def synthetic(n, seed=0):
+    rng = random.Random(seed)
+    phrases = [" - Привет.", " Да", " Спасибо за внимание.", " Ну вот, мы и пришли к выводу", " Продолжение следует",
+               " ага ага ага ага", " Это длинная фраза, в которой есть два предложения. Вот так."]
+    segments, t, last = [], 0.0, None
+    for i in range(n):
+        text = last if last and rng.random() < 0.4 else rng.choice(phrases)
+        last = text
+        start = t + rng.choice([0.0, 0.3, 2.0])
+        t = start + rng.uniform(0.5, 3.0)
+        segments.append({"id": i, "start": start, "end": t, "text": text,
+                         "no_speech_prob": rng.choice([0.0, 0.1, 0.9]), "tokens": [1, 2]})
+    return segments
+
+
+def test_store_stages_match_dict_stages(tmp_path):
+    segments = synthetic(3000)
+    store = SegmentStore.from_dicts(segments)
+    assert store.to_dicts() == segments
+
+    markers = ["продолжение следует"]
+    expected = process_segments([dict(s) for s in segments], str(tmp_path), hallucination_markers=markers)
+    expected = stack_repeated_segments(expected, phrase_repeat_threshold=3)
+    expected = merge_short_segments(expected)
+    expected = remove_final_dot_if_single_sentence(remove_leading_dash(expected))
+    dict_log = (tmp_path / "repetitions.log").read_text(encoding="utf-8")
+
+    got = process_store(store, str(tmp_path), hallucination_markers=markers)
+    assert (tmp_path / "repetitions.log").read_text(encoding="utf-8") == dict_log
+    got = clean_store(merge_store(stack_store(got, phrase_repeat_threshold=3)))
+    assert got.to_dicts() == expected
+    assert any(s["end"] - s["start"] > 5 for s in expected)
+
+
+def test_take_and_texts():
+    store = SegmentStore.from_dicts([{"start": 0.0, "end": 1.0, "text": "a", "speaker": "spk1"},
+                                     {"start": 1.0, "end": 2.0, "text": "b"}])
+    part = store.take([1, 0])
+    assert [s["text"] for s in part] == ["b", "a"] and part[1]["speaker"] == "spk1"
+    assert "speaker" not in part[0]
+    translated = store.timings_only().with_texts(["A", "B"])
+    assert translated.to_dicts() == [{"start": 0.0, "end": 1.0, "text": "A"}, {"start": 1.0, "end": 2.0, "text": "B"}]
+    assert store.texts == ["a", "b"]
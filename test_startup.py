@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from translate_stub import StubLibreTranslate
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HEAVY = {"torch", "whisper", "faster_whisper", "ctranslate2", "librosa", "noisereduce", "scipy", "vosk",
+         "soundfile", "requests"}
+# до ленивых импортов `import main` занимал ~1.7 с (noisereduce → scipy)
+IMPORT_BUDGET_SEC = 1.0
+
+
+def import_profile(*argv):
+    """
+    (top-level packages imported, stdout) of `python -X importtime main.py ...`.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "main.py", *argv], cwd=ROOT,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        modules.add(line.split("|")[-1].strip().split(".")[0])
+    return modules, proc.stdout
+
+
+@pytest.mark.parametrize("command", [[], ["transcribe"], ["translate"], ["diarize"], ["export"], ["cache"]])
+def test_help_does_not_import_heavy_dependencies(command):
+    modules, out = import_profile(*command, "--help")
+    assert "usage:" in out
+    assert not modules & HEAVY
+
+
+def test_import_time_budget():
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                          capture_output=True, text=True, timeout=120)
+    cumulative = [int(line.split("|")[1]) for line in proc.stderr.splitlines()
+                  if line.startswith("import time:") and line.split("|")[-1].strip() == "main"]
+    assert cumulative and cumulative[0] / 1e6 < IMPORT_BUDGET_SEC
+
+
+def test_translate_command_needs_only_http_client(tmp_path):
+    source = tmp_path / "output_ru.srt"
+    source.write_text("1\n00:00:00,000 --> 00:00:01,000\nПривет.\n\n"
+                      "2\n00:00:05,000 --> 00:00:06,000\nКак дела?\n\n", encoding="utf-8")
+    with StubLibreTranslate() as stub:
+        modules, _ = import_profile("translate", str(tmp_path), "--translate-url", stub.url, "--no-translation-cache")
+    assert not modules & (HEAVY - {"requests"})
+    text = (tmp_path / "output_en_translated.srt").read_text(encoding="utf-8")
+    assert "EN:Привет\n" in text and "00:00:05,000 --> 00:00:06,000" in text
+
+
+def test_export_writes_other_formats(tmp_path):
+    from main import main
+    long_cue = "Очень длинный титр, который поправили вручную и который длиннее восьмидесяти символов подряд"
+    for name, text in (("output_ru", long_cue), ("output_en_translated", "Hello")):
+        (tmp_path / f"{name}.srt").write_text(f"1\n00:00:00,000 --> 00:00:01,500\n{text}\n\n", encoding="utf-8")
+    before = (tmp_path / "output_ru.srt").stat().st_mtime_ns
+    main(["export", str(tmp_path), "--subtitle-formats", "srt", "vtt", "ass", "--bilingual"])
+    assert "00:00:00.000 --> 00:00:01.500" in (tmp_path / "output_en_translated.vtt").read_text(encoding="utf-8")
+    assert (tmp_path / "output_ru.ass").exists()
+    # исходные .srt не переписываются, длинный титр не режется
+    assert (tmp_path / "output_ru.srt").stat().st_mtime_ns == before
+    assert (tmp_path / "output_ru.vtt").read_text(encoding="utf-8").count("-->") == 1
+    assert f"{long_cue}\nHello" in (tmp_path / "output_bilingual.srt").read_text(encoding="utf-8")
+
+
+def test_only_reported_failures_exit_quietly(tmp_path, monkeypatch):
+    import pipeline
+    from main import main
+    from utils import PipelineError
+    main_args = ["export", str(tmp_path)]
+    with pytest.raises(SystemExit) as exit_info:
+        main(main_args)
+    assert exit_info.value.code == 1
+
+    def crash(args):
+        raise RuntimeError("CUDA out of memory")
+
+    # чужой RuntimeError не превращается в молчаливый exit(1)
+    monkeypatch.setattr(pipeline, "run_export", crash)
+    with pytest.raises(RuntimeError, match="CUDA") as error:
+        main(main_args)
+    assert not isinstance(error.value, PipelineError)
@@ -0,0 +1,105 @@
+import numpy as np
+
+from audio_chunking import find_split_points, iter_audio_windows
+from segment_post import iter_merge_short_segments, merge_short_segments
+from segment_stack import iter_stack_repeated_segments, stack_repeated_segments
+from stream_pipeline import SAMPLE_RATE, run_stream
+from translate_stub import StubLibreTranslate
+from translate_utils import TranslationClient
+
+
+def make_segments():
+    texts = ["Привет всем здесь", "да"] + ["Спасибо"] * 7 + ["ну", "Хорошо, продолжаем работу", "Понятно"] * 3
+    return [{"start": i * 1.0, "end": i * 1.0 + 0.8, "text": t} for i, t in enumerate(texts)]
+
+
+def test_generators_match_batch_stages():
+    segments = make_segments()
+    assert list(iter_stack_repeated_segments(iter(segments))) == stack_repeated_segments(segments)
+    assert list(iter_merge_short_segments(iter(segments))) == merge_short_segments(segments)
+    stacked = stack_repeated_segments(segments)
+    assert stacked[2] == {"start": 2.0, "end": 8.8, "text": "Спасибо"}
+
+
+def test_split_points_fall_into_silence():
+    sr = SAMPLE_RATE
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 0.3, sr * 70).astype(np.float32)
+    audio[27 * sr:28 * sr] = 0.0
+    audio[55 * sr:56 * sr] = 0.0
+    cuts = find_split_points(audio, sr, target_sec=30, search_sec=5)
+    assert len(cuts) == 2
+    assert 27 * sr <= cuts[0] <= 28 * sr
+    assert 55 * sr <= cuts[1] <= 56 * sr
+    windows = list(iter_audio_windows(audio, sr, 30))
+    assert sum(len(w) for _, w in windows) == len(audio)
+
+
+class FakeWhisper:
+    def transcribe(self, audio, **kwargs):
+        seconds = len(audio) / SAMPLE_RATE
+        return {"segments": [
+            {"start": t, "end": t + 1.5, "text": f" - Фраза номер {int(t)}.", "no_speech_prob": 0.1}
+            for t in np.arange(0, seconds - 1.5, 2.0)
+        ]}
+
+
+def test_run_stream_writes_both_tracks(tmp_path):
+    audio = np.zeros(SAMPLE_RATE * 25, dtype=np.float32)
+    with StubLibreTranslate() as stub, TranslationClient(url=stub.url, batch_size=4) as client:
+        count = run_stream(FakeWhisper(), audio, str(tmp_path), client, window_sec=10)
+    ru = (tmp_path / "output_ru.srt").read_text(encoding="utf-8").split("\n\n")
+    en = (tmp_path / "output_en_translated.srt").read_text(encoding="utf-8").split("\n\n")
+    assert count == len(ru) - 1 == len(en) - 1
+    assert ru[0].splitlines()[2] == "Фраза номер 0"
+    assert en[-2].splitlines()[1] == ru[-2].splitlines()[1]
+    assert en[-2].splitlines()[2].startswith("EN:Фраза номер")
+
+
+class WordWhisper:
+    def __init__(self):
+        self.options = []
+
+    def transcribe(self, audio, **kwargs):
+        self.options.append(kwargs)
+        words = [{"word": f" слово{i}", "start": i * 0.5, "end": i * 0.5 + 0.4} for i in range(20)]
+        segment = {"start": 0.0, "end": 10.0, "text": "".join(w["word"] for w in words), "no_speech_prob": 0.1}
+        if kwargs.get("word_timestamps"):
+            segment["words"] = words
+        return {"segments": [segment]}
+
+
+def test_run_stream_uses_word_timestamps(tmp_path):
+    model = WordWhisper()
+    audio = np.zeros(SAMPLE_RATE * 10, dtype=np.float32)
+    with StubLibreTranslate() as stub, TranslationClient(url=stub.url) as client:
+        run_stream(model, audio, str(tmp_path), client, window_sec=30, word_timestamps=True, max_cps=20)
+    assert model.options[0]["word_timestamps"] is True
+    cues = (tmp_path / "output_ru.srt").read_text(encoding="utf-8").strip().split("\n\n")
+    assert len(cues) > 1
+    # разрез по реальному концу слова, а не пропорционально длине текста
+    end = cues[0].splitlines()[1].split(" --> ")[1]
+    assert end[-3:] in {f"{int(i * 500 + 400) % 1000:03d}" for i in range(20)}
+
+
+class SentenceWhisper:
+    texts = [(0.0, "Мы пошли гулять"), (1.1, "в большой лес"), (2.2, "и там были грибы"),
+             (9.0, "потом мы пошли домой"), (10.1, "и легли спать")]
+
+    def transcribe(self, audio, **kwargs):
+        return {"segments": [{"start": t, "end": t + 1.0, "text": f" {text}", "no_speech_prob": 0.1}
+                             for t, text in self.texts]}
+
+
+def test_run_stream_translates_whole_sentences_split_at_pauses(tmp_path):
+    sent = []
+
+    def translate(text):
+        sent.append(text)
+        return "EN:" + text
+
+    audio = np.zeros(SAMPLE_RATE * 12, dtype=np.float32)
+    with StubLibreTranslate(translate=translate) as stub, TranslationClient(url=stub.url, batch_size=1) as client:
+        run_stream(SentenceWhisper(), audio, str(tmp_path), client, window_sec=30)
+    # предложение не режется на границе пачки, а пауза 5.8 с — граница группы
+    assert sent == ["Мы пошли гулять в большой лес и там были грибы", "потом мы пошли домой и легли спать"]
@@ -0,0 +1,83 @@
+import pytest
+
+from subtitle_io import (AssWriter, SubtitleWriter, read_srt, read_vtt, split_long_segments, split_segment,
+                         write_bilingual, write_srt, write_subtitles)
+from utils import format_ass_timestamp, format_timestamp, parse_timestamp
+
+
+def test_timestamps():
+    assert format_timestamp(0.29) == "00:00:00,290"
+    assert format_timestamp(3725.5, ".") == "01:02:05.500"
+    assert format_timestamp(-1) == "00:00:00,000"
+    assert format_ass_timestamp(3725.505) == "1:02:05.51"
+    assert parse_timestamp("01:02:05,500") == 3725.5
+    assert parse_timestamp("02:05.5") == 125.5
+
+
+def segments(n):
+    for i in range(n):
+        yield {"start": i * 2.0, "end": i * 2.0 + 1.5, "text": f" Фраза\nномер  {i}"}
+
+
+def test_write_and_read_back(tmp_path):
+    srt, vtt = tmp_path / "out.srt", tmp_path / "out.vtt"
+    write_srt(srt, segments(2500))
+    write_subtitles(vtt, segments(2500), "vtt")
+    for cues in (read_srt(srt), read_vtt(vtt)):
+        assert len(cues) == 2500
+        assert cues[-1] == {"start": 4998.0, "end": 4999.5, "text": "Фраза номер 2499"}
+    assert srt.read_text(encoding="utf-8").startswith("1\n00:00:00,000 --> 00:00:01,500\nФраза номер 0\n\n")
+    assert vtt.read_text(encoding="utf-8").startswith("WEBVTT\n\n00:00:00.000 --> 00:00:01.500\n")
+
+
+def test_bilingual_tracks(tmp_path):
+    ru = list(segments(3))
+    en = [{"start": s["start"], "end": s["end"], "text": f"Phrase {i}"} for i, s in enumerate(ru)]
+    write_bilingual(tmp_path / "bi.srt", ru, en)
+    cues = read_srt(tmp_path / "bi.srt")
+    assert cues[1]["text"] == "Фраза номер 1\nPhrase 1"
+    with AssWriter(tmp_path / "bi.ass", bilingual=True) as writer:
+        writer.write(ru[0], en[0])
+    text = (tmp_path / "bi.ass").read_text(encoding="utf-8")
+    assert "Dialogue: 0,0:00:00.00,0:00:01.50,Default,,0,0,0,,Фраза номер 0" in text
+    assert ",Second,,0,0,0,,Phrase 0" in text
+
+
+def test_ass_text_is_escaped(tmp_path):
+    with AssWriter(tmp_path / "x.ass") as writer:
+        cue = writer.format_cue(1, 0.0, 1.0, ["{\\b1}жирный\nвторая строка"])
+    assert cue.endswith(",,\\{\\b1\\}жирный\\Nвторая строка\n")
+    with pytest.raises(TypeError):
+        SubtitleWriter(tmp_path / "x.txt")
+
+
+def test_split_uses_word_times():
+    words, t = [], 0.0
+    for i, w in enumerate(["Сегодня", "мы", "поговорим", "о", "погоде.", "Завтра", "будет", "дождь", "и", "ветер,",
+                           "а", "потом", "снова", "солнце."]):
+        words.append({"word": " " + w.strip(".,"), "start": t, "end": t + 0.4})
+        t += 0.5 if i != 4 else 2.0
+    seg = {"start": 0.0, "end": t, "text": " - " + " ".join(w for w in ["Сегодня мы поговорим о погоде.",
+                                                                           "Завтра будет дождь и ветер, а потом снова солнце"]),
+           "words": words}
+    cues = split_segment(seg, max_chars=40)
+    assert [c["text"] for c in cues] == ["- Сегодня мы поговорим о погоде.",
+                                         "Завтра будет дождь и ветер, а потом", "снова солнце"]
+    # граница — на реальном слове «Завтра», а не посередине сегмента
+    assert cues[0]["end"] == words[4]["end"] and cues[1]["start"] == words[5]["start"]
+    assert cues[0]["start"] == 0.0 and cues[-1]["end"] == t
+
+
+def test_split_without_matching_words():
+    seg = {"start": 0.0, "end": 10.0, "text": "а" * 45 + " " + "б" * 45}
+    cues = split_long_segments([seg], max_chars=80)
+    assert [c["end"] for c in cues] == [5.0, 10.0]
+    # слова Vosk с другим текстом: граница переезжает в ближайшую паузу
+    seg["words"] = [{"word": "x", "start": 0.0, "end": 3.1}, {"word": "y", "start": 3.6, "end": 10.0}]
+    cues = split_segment(seg, max_chars=80)
+    assert (cues[0]["end"], cues[1]["start"]) == (3.1, 3.6)
+    # скорость чтения: короткий титр растягивается в паузу
+    fast = split_segment({"start": 0.0, "end": 10.0, "text": "а" * 78 + " " + "б" * 5,
+                          "words": [{"word": "а" * 78, "start": 0.0, "end": 1.0}, {"word": "б" * 5, "start": 9.0, "end": 10.0}]},
+                         max_chars=80, max_cps=20)
+    assert fast[0]["end"] == 3.9 and fast[1]["start"] == 9.0
@@ -0,0 +1,61 @@
+import sys
+import types
+from collections import namedtuple
+
+import pytest
+
+import transcribe_engines
+from transcribe_engines import FasterWhisperEngine, language_code, load_engine
+
+Word = namedtuple("Word", "start end word probability")
+Segment = namedtuple("Segment", "id seek start end text tokens temperature avg_logprob compression_ratio no_speech_prob words")
+
+
+@pytest.fixture
+def fake_faster_whisper(monkeypatch):
+    calls = {}
+
+    class WhisperModel:
+        def __init__(self, model, device, compute_type, cpu_threads):
+            calls["init"] = (model, device, compute_type, cpu_threads)
+
+        def transcribe(self, audio, **options):
+            calls["transcribe"] = options
+            words = [Word(0.0, 0.4, " Привет", 0.9)] if options["word_timestamps"] else None
+            segs = (Segment(1, 0, 0.0, 0.8, " Привет всем.", [1, 2], 0.0, -0.2, 1.1, 0.01, words) for _ in range(2))
+            return segs, types.SimpleNamespace(language="ru")
+
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=WhisperModel))
+    monkeypatch.setattr(transcribe_engines, "resolve_device", lambda device: "cpu" if device == "auto" else device)
+    return calls
+
+
+def test_faster_whisper_returns_openai_whisper_shape(fake_faster_whisper):
+    engine = load_engine("small", engine="faster-whisper", threads=4)
+    assert isinstance(engine, FasterWhisperEngine)
+    assert fake_faster_whisper["init"] == ("small", "cpu", "int8", 4)
+
+    result = engine.transcribe([0.0] * 16000, verbose=None, language="Russian", temperature=0,
+                               condition_on_previous_text=False, word_timestamps=True)
+    options = fake_faster_whisper["transcribe"]
+    assert (options["language"], options["beam_size"], options["condition_on_previous_text"]) == ("ru", 1, False)
+    assert [seg["id"] for seg in result["segments"]] == [0, 1]
+    seg = result["segments"][0]
+    assert {"start", "end", "text", "no_speech_prob", "avg_logprob", "compression_ratio"} <= set(seg)
+    assert seg["words"] == [{"word": " Привет", "start": 0.0, "end": 0.4, "probability": 0.9}]
+    assert result["text"] == " Привет всем. Привет всем."
+
+    from segment_filter import process_segments
+    assert [s["text"] for s in process_segments(result["segments"], "", rep_log_path="/dev/null")] == ["Привет всем."] * 2
+
+
+def test_engine_options_from_cli():
+    from main import parse_args
+    from transcribe_engines import engine_key, engine_options
+    args = parse_args(["in.wav", "--engine", "faster-whisper", "--compute-type", "int8", "--threads", "8", "--beam-size", "5"])
+    assert engine_options(args) == {"engine": "faster-whisper", "device": "auto", "compute_type": "int8",
+                                    "threads": 8, "beam_size": 5}
+    assert "threads" not in engine_key(args)
+    assert language_code("Russian") == "ru" and language_code(None) is None
+    with pytest.raises(ValueError):
+        load_engine("small", engine="nope")
@@ -0,0 +1,31 @@
+import threading
+
+from transcribe_client import submit_job, wait_for_job
+from transcribe_server import TranscriptionServer
+
+
+def test_jobs_are_queued_and_processed_in_order():
+    release = threading.Event()
+    seen = []
+
+    def runner(job):
+        release.wait(5)
+        seen.append(job.file_path)
+        if job.file_path.endswith("bad.wav"):
+            raise RuntimeError("boom")
+        return f"sessions/{len(seen)}"
+
+    with TranscriptionServer(port=0, runner=runner, default_args=["--model", "tiny"]) as server:
+        jobs = [submit_job(server.url, name, ["--stream"]) for name in ("a.wav", "bad.wav", "c.wav")]
+        assert jobs[0]["args"] == ["--model", "tiny", "--stream"]
+        assert server.stats()["queue_depth"] + server.stats()["running"] == 3
+        release.set()
+        results = [wait_for_job(server.url, job["id"], poll=0.01) for job in jobs]
+        stats = server.stats()
+
+    assert [r["status"] for r in results] == ["done", "failed", "done"]
+    assert results[2]["session_dir"] == "sessions/3"
+    assert "boom" in results[1]["error"]
+    assert [p.rsplit("/", 1)[-1] for p in seen] == ["a.wav", "bad.wav", "c.wav"]
+    assert stats["queue_depth"] == 0 and stats["done"] == 2 and stats["failed"] == 1
+    assert stats["latency_sec"]["mean"] > 0
@@ -0,0 +1,26 @@
+import numpy as np
+
+from transcribe_utils import drop_repeated_words, plan_chunks, stitch_chunks
+
+
+def test_drop_repeated_words():
+    assert drop_repeated_words(" Мы пошли домой", " домой, и там поели") == " и там поели"
+    assert drop_repeated_words(" Мы пошли домой", " пошли домой") == ""
+    assert drop_repeated_words(" Мы пошли", " Завтра снова") == " Завтра снова"
+
+
+def test_stitch_keeps_owned_segments_and_dedups_boundary():
+    sr = 100
+    audio = np.ones(sr * 20, dtype=np.float32)
+    audio[990:1010] = 0.0
+    chunks = plan_chunks(audio, sr, chunk_sec=10.5, overlap_sec=1)
+    cut = chunks[0]["own_end"]
+    assert len(chunks) == 2 and 990 <= cut <= 1010 and chunks[1]["own_start"] == cut
+    assert (chunks[1]["start"], chunks[0]["end"]) == (cut - 100, cut + 100)
+    first = [{"start": 0.0, "end": 4.0, "text": " Раз два"}, {"start": 8.0, "end": 10.5, "text": " три четыре"},
+             {"start": 10.4, "end": 11.0, "text": " пять"}]
+    second = [{"start": 9.0, "end": 9.8, "text": " три"}, {"start": 9.9, "end": 12.0, "text": " четыре пять шесть"},
+              {"start": 13.0, "end": 15.0, "text": " семь"}]
+    stitched = stitch_chunks(chunks, [first, second], sr)
+    assert [s["text"] for s in stitched] == [" Раз два", " три четыре", " пять шесть", " семь"]
+    assert [s["id"] for s in stitched] == [0, 1, 2, 3]
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from translate_async import AsyncTranslationClient
+from translate_stub import AsyncStubLibreTranslate
+from translate_utils import translate_texts
+
+
+@pytest.fixture
+def stubs():
+    servers = [AsyncStubLibreTranslate(latency=0.01).start() for _ in range(3)]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def test_batches_are_spread_over_endpoints(stubs):
+    texts = [f"фраза {i}" for i in range(300)]
+    with AsyncTranslationClient([s.url for s in stubs], batch_size=5, max_concurrency=6, per_endpoint=2) as client:
+        assert client.translate_many(texts) == [f"EN:{t}" for t in texts]
+        assert client.stats["requests"] == 60
+    assert all(s.requests >= 10 for s in stubs)
+    assert all(s.max_in_flight <= 2 for s in stubs)
+    assert sum(s.max_in_flight for s in stubs) <= 6
+
+
+def test_failover_trips_breaker_and_keeps_order(stubs):
+    stubs[0].down = True
+    texts = [f"t{i}" for i in range(100)]
+    with AsyncTranslationClient([s.url for s in stubs], batch_size=4, failure_threshold=2, cooldown=5.0) as client:
+        assert client.translate_many(texts) == [f"EN:{t}" for t in texts]
+        assert client.stats["breaker_trips"] == 1
+        assert client.stats["fallbacks"] == 0
+        assert client.endpoint_stats()[stubs[0].url]["state"] == "open"
+    assert stubs[0].requests <= 4
+
+
+def test_hanging_endpoint_times_out(stubs):
+    stubs[1].hang = True
+    with AsyncTranslationClient([stubs[1].url, stubs[2].url], batch_size=1, max_timeout=0.3) as client:
+        start = time.perf_counter()
+        assert client.translate_many(["а", "б", "в", "г"]) == ["EN:а", "EN:б", "EN:в", "EN:г"]
+        assert time.perf_counter() - start < 2.0
+        assert client.endpoint_stats()[stubs[1].url]["timeouts"] >= 1
+
+
+def test_retry_queue_waits_for_recovery_then_falls_back(stubs, tmp_path):
+    from translation_cache import TranslationCache
+    server = stubs[0]
+    server.down = True
+    with AsyncTranslationClient([server.url], cooldown=0.05, retry_for=5.0) as client:
+        client._loop.call_later(0.3, setattr, server, "down", False)
+        assert client.translate_many(["раз", "два"]) == ["EN:раз", "EN:два"]
+        assert client.stats["retries"] > 0 and client.stats["fallbacks"] == 0
+
+    server.down = True
+    with TranslationCache(str(tmp_path / "tm.sqlite3")) as cache, \
+            AsyncTranslationClient([server.url], cooldown=0.05, retry_for=0.2) as client:
+        assert translate_texts(["Привет"], client, cache) == ["Привет"]
+        assert client.stats["fallbacks"] == 1 and client.failed == {"Привет"}
+        assert cache.get_many(["Привет"], "ru", "en", "libretranslate") == {}
+        # тот же долгоживущий клиент: после восстановления перевод попадает в кэш
+        server.down = False
+        assert translate_texts(["Привет"], client, cache) == ["EN:Привет"]
+        assert client.failed == set()
+        assert cache.get_many(["Привет"], "ru", "en", "libretranslate") == {"Привет": "EN:Привет"}
+
+
+def test_timeout_scales_with_batch_size():
+    from translate_async import Endpoint
+    endpoint = Endpoint("http://127.0.0.1:9/translate", min_timeout=0.5, max_timeout=30.0)
+    for _ in range(20):
+        endpoint.observe(0.2, 100)
+    small = endpoint.timeout(100)
+    # батч в 20 раз больше среднего не должен упираться в таймаут маленьких
+    assert small < endpoint.timeout(2000) <= 30.0
+    assert endpoint.timeout(10) == small
+    endpoint.close()
+
+
+def test_unexpected_worker_error_is_raised_not_hung(stubs):
+    with AsyncTranslationClient([stubs[0].url]) as client:
+        async def broken(endpoint, texts):
+            raise ValueError("bug in the worker")
+
+        client._send = broken
+        with pytest.raises(ValueError, match="bug"):
+            client.translate_many(["раз", "два"])
@@ -0,0 +1,121 @@
+import time
+
+import pytest
+from translate_stub import StubLibreTranslate
+from translate_utils import TranslationClient, translate_segments, translate_text_local
+
+
+@pytest.fixture
+def stub():
+    with StubLibreTranslate() as server:
+        yield server
+
+
+def test_translate_many_keeps_order_in_batches(stub):
+    texts = [f"фраза {i}" for i in range(50)]
+    with TranslationClient(url=stub.url, batch_size=8, max_workers=4) as client:
+        result = client.translate_many(texts)
+    assert result == [f"EN:{t}" for t in texts]
+    assert stub.requests == 7
+    assert stub.connections <= 4
+
+
+def test_failed_batches_are_split(stub):
+    stub.max_batch = 3
+    texts = [f"t{i}" for i in range(10)]
+    with TranslationClient(url=stub.url, batch_size=10, max_workers=2) as client:
+        result = client.translate_many(texts)
+        assert client.stats["splits"] > 0
+    assert result == [f"EN:{t}" for t in texts]
+
+
+def test_timed_out_batch_is_not_split():
+    texts = [f"t{i}" for i in range(8)]
+    with StubLibreTranslate(latency=0.5) as slow:
+        with TranslationClient(url=slow.url, batch_size=8, timeout=0.1) as client:
+            start = time.perf_counter()
+            assert client.translate_many(texts) == [""] * 8
+            # одна попытка вместо log2(8) уровней деления по таймауту каждый
+            assert time.perf_counter() - start < 0.4
+            assert client.stats["splits"] == 0 and client.stats["requests"] == 1
+            assert client.failed == set(texts)
+
+
+def test_empty_texts_are_not_sent(stub):
+    with TranslationClient(url=stub.url) as client:
+        assert client.translate_many(["", "  ", "да"]) == ["", "", "EN:да"]
+    assert stub.requests == 1
+
+
+def test_translate_segments_and_legacy_path(stub):
+    segments = [{"start": 0.0, "end": 1.0, "text": "Привет"}, {"start": 1.0, "end": 2.0, "text": "Пока"}]
+    with TranslationClient(url=stub.url) as client:
+        translated = translate_segments(segments, client=client)
+    assert [s["text"] for s in translated] == ["EN:Привет", "EN:Пока"]
+    assert translated[1]["start"] == 1.0
+    assert translate_text_local("Привет", url=stub.url) == "EN:Привет"
+
+
+def test_cache_and_in_run_dedup(stub, tmp_path):
+    from translation_cache import TranslationCache
+    segments = [{"start": i, "end": i + 1, "text": t} for i, t in enumerate(["Да", " Да ", "Понятно", "Да"])]
+    with TranslationCache(str(tmp_path / "tm.sqlite3")) as cache, TranslationClient(url=stub.url) as client:
+        first = translate_segments(segments, client=client, cache=cache)
+        assert client.stats["segments"] == 2
+        assert (cache.hits, cache.misses) == (0, 2)
+        second = translate_segments(segments, client=client, cache=cache)
+        assert client.stats["segments"] == 2
+        assert cache.hits == 2
+    assert [s["text"] for s in first] == ["EN:Да", "EN:Да", "EN:Понятно", "EN:Да"] == [s["text"] for s in second]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    from translation_cache import TranslationCache
+    with TranslationCache(str(tmp_path / "tm.sqlite3"), max_entries=2) as cache:
+        cache.put_many([("a", "A")], "ru", "en", "m")
+        cache.put_many([("b", "B")], "ru", "en", "m")
+        cache.get_many(["a"], "ru", "en", "m")
+        cache.put_many([("c", "C")], "ru", "en", "m")
+        assert cache.get_many(["a", "b", "c"], "ru", "en", "m") == {"a": "A", "c": "C"}
+
+
+def test_sentence_groups_are_translated_whole(stub):
+    from translate_utils import distribute_translation, plan_sentence_groups
+    texts = ["Когда мы пришли домой,", "было уже темно", "и все спали.", "Утром", "пошёл дождь", "Конец"]
+    assert plan_sentence_groups(texts) == [[0, 1, 2], [3, 4], [5]]
+    assert plan_sentence_groups(texts, breaks=[False, True, False, False, False, False]) == [[0, 1], [2], [3, 4], [5]]
+    english = "When we got home, it was already dark and everyone was asleep."
+    pieces = distribute_translation(english, texts[:3])
+    assert pieces[0] == "When we got home," and " ".join(pieces) == english and all(pieces)
+    # слов меньше, чем сегментов — ни одного пустого титра
+    assert distribute_translation("Yes.", ["Да,", "конечно", "нет"]) == ["Yes.", "Yes.", "Yes."]
+    assert distribute_translation("Yes, sure.", ["Да,", "конечно", "нет"]) == ["Yes,", "sure.", "sure."]
+
+    segments = [{"start": float(i), "end": i + 1.0, "text": t} for i, t in enumerate(texts)]
+    with TranslationClient(url=stub.url) as client:
+        translated = translate_segments(segments, client=client)
+        assert client.stats["segments"] == 3
+    assert translated[0]["text"] == "EN:Когда мы пришли домой,"
+    assert [s["start"] for s in translated] == [s["start"] for s in segments]
+    assert " ".join(s["text"] for s in translated[:3]) == "EN:Когда мы пришли домой, было уже темно и все спали."
+
+
+def test_failed_text_is_cached_after_a_later_success(tmp_path):
+    from translation_cache import TranslationCache
+    from translate_utils import translate_texts
+    broken = {"on": True}
+
+    def translate(text):
+        if broken["on"]:
+            raise RuntimeError("model crashed")
+        return "EN:" + text
+
+    with StubLibreTranslate(translate=translate) as server, \
+            TranslationCache(str(tmp_path / "tm.sqlite3")) as cache, \
+            TranslationClient(url=server.url, retries=0) as client:
+        assert translate_texts(["Привет"], client, cache) == [""]
+        assert client.failed == {"Привет"}
+        broken["on"] = False
+        assert translate_texts(["Привет"], client, cache) == ["EN:Привет"]
+        assert client.failed == set()
+        assert cache.get_many(["Привет"], "ru", "en", "libretranslate") == {"Привет": "EN:Привет"}
@@ -0,0 +1,68 @@
+import argparse
+import json
+
+import numpy as np
+
+import pipeline
+from metrics import PipelineMetrics
+from vad import SpeechMap, detect_speech
+
+SR = 16000
+
+
+def speech_with_pauses():
+    # 2 с тишины, 3 с «речи», 10 с тишины, 2 с «речи», 3 с тишины
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 0.001, 20 * SR).astype(np.float32)
+    for start, end in ((2, 5), (15, 17)):
+        t = np.arange((end - start) * SR) / SR
+        audio[start * SR:end * SR] += 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 3 * t) > -0.5)
+    return audio
+
+
+def test_detect_speech_bridges_short_pauses_and_pads():
+    regions = detect_speech(speech_with_pauses(), SR, pad_sec=0.3)
+    assert len(regions) == 2
+    assert [round(a / SR, 1) for a, _ in regions] == [1.7, 14.7]
+    assert [round(b / SR, 1) for _, b in regions] == [5.3, 17.3]
+    assert detect_speech(np.zeros(SR, dtype=np.float32), SR) == []
+
+
+def test_speech_map_compacts_and_remaps():
+    audio = speech_with_pauses()
+    speech_map = SpeechMap([(2 * SR, 5 * SR), (15 * SR, 17 * SR)], SR, len(audio), gap_sec=0.5)
+    compact = speech_map.compact(audio)
+    assert len(compact) == 5.5 * SR
+    assert np.array_equal(compact[3 * SR + SR // 2:], audio[15 * SR:17 * SR])
+    assert round(speech_map.skipped_fraction, 2) == 0.75
+
+    segments = [{"start": 1.0, "end": 3.2, "text": "а", "words": [{"start": 3.1, "end": 3.3, "word": "а"}]},
+                {"start": 3.6, "end": 5.5, "text": "б"}]
+    first, second = speech_map.remap_segments(segments)
+    assert (first["start"], first["end"]) == (3.0, 5.0)
+    assert first["words"] == [{"start": 15.0, "end": 15.0, "word": "а"}]
+    assert (second["start"], second["end"]) == (15.1, 17.0)
+    assert SpeechMap.from_dict(json.loads(json.dumps(speech_map.to_dict()))).regions == speech_map.regions
+
+
+def test_vad_feeds_only_speech_to_models(tmp_path, monkeypatch):
+    seen = {}
+
+    def fake_transcribe(args, audio, metrics):
+        seen["whisper"] = len(audio) / SR
+        return [{"start": 4.3, "end": 5.0, "text": " Второй кусок речи здесь", "no_speech_prob": 0.0}]
+
+    def fake_diarize(pcm, model_path, spk_model_path, sample_rate):
+        seen["vosk"] = len(pcm) / 2 / SR
+        return [{"start": 4.3, "end": 4.6, "speaker": "spk1", "word": "второй"}]
+
+    monkeypatch.setattr(pipeline, "transcribe_stage", fake_transcribe)
+    monkeypatch.setattr(pipeline, "diarize_audio_vosk", fake_diarize)
+    args = argparse.Namespace(vad=True, vad_margin_db=10.0, vad_min_silence=0.8)
+    metrics = PipelineMetrics()
+    segments, words = pipeline.transcribe_and_diarize(args, speech_with_pauses(), str(tmp_path), metrics)
+    assert seen["whisper"] == seen["vosk"] < 8.5
+    assert abs(segments[0]["start"] - 14.9) < 0.05 and abs(segments[0]["end"] - 15.6) < 0.05
+    assert words[0]["start"] == segments[0]["start"]
+    assert metrics.stages["vad"]["skipped_fraction"] > 0.6
+    assert json.loads((tmp_path / "speech_map.json").read_text())["regions"]
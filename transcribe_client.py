@@ -0,0 +1,66 @@
+"""
+transcribe_client.py
+Thin client for transcribe_server: submits a file and waits for the job to finish.
+
+    python transcribe_client.py recording.mp3 -- --hallucination-file hallucinations.txt
+    python transcribe_client.py --stats
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+from transcribe_server import DEFAULT_PORT
+
+DEFAULT_SERVER = f"http://127.0.0.1:{DEFAULT_PORT}"
+
+
+def submit_job(server: str, file_path: str, args=None) -> dict:
+    response = requests.post(f"{server}/jobs", json={"file_path": os.path.abspath(file_path), "args": args or []}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def wait_for_job(server: str, job_id: str, poll: float = 1.0) -> dict:
+    while True:
+        response = requests.get(f"{server}/jobs/{job_id}", timeout=10)
+        response.raise_for_status()
+        job = response.json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit a file to the DimaTorzok transcription daemon")
+    parser.add_argument("file_path", nargs="?", help="Path to input media file")
+    parser.add_argument("pipeline_args", nargs=argparse.REMAINDER, help="Extra main.py options, after --")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parser.add_argument("--no-wait", action="store_true", help="Print the job id and exit")
+    parser.add_argument("--stats", action="store_true", help="Print queue depth and latency and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(requests.get(f"{args.server}/stats", timeout=10).json())
+        return
+    if not args.file_path:
+        parser.error("file_path is required")
+
+    extra = [a for a in args.pipeline_args if a != "--"]
+    job = submit_job(args.server, args.file_path, extra)
+    print(f"📨 Job {job['id']} queued")
+    if args.no_wait:
+        return
+    job = wait_for_job(args.server, job["id"])
+    if job["status"] == "failed":
+        print(f"❌ Job failed: {job['error']}")
+        sys.exit(1)
+    print(f"✅ Done in {job['queue_sec'] + job['run_sec']:.1f}s (queued {job['queue_sec']:.1f}s)")
+    print(f"📁 Session: {job['session_dir']}")
+
+
+if __name__ == "__main__":
+    main()
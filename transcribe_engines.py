@@ -0,0 +1,150 @@
+"""
+transcribe_engines.py
+Pluggable speech-to-text backends behind the ``model.transcribe(audio, **options)``
+call the pipeline already makes. Every engine returns openai-whisper's result shape:
+{"text", "language", "segments": [{"id", "start", "end", "text", "no_speech_prob",
+"avg_logprob", "compression_ratio", "words"?...}]}, which is what the filters consume.
+
+    whisper         openai-whisper (PyTorch); fp16 on CUDA, fp32 on CPU
+    faster-whisper  CTranslate2; int8 on CPU by default, float16 on CUDA
+"""
+
+from typing import Any, Dict, Optional
+
+ENGINES = ("whisper", "faster-whisper")
+COMPUTE_TYPES = ("default", "float32", "float16", "bfloat16", "int8", "int8_float16", "int8_float32")
+
+# faster-whisper ждёт код языка, openai-whisper принимает и название
+_LANGUAGE_CODES = {"russian": "ru", "english": "en", "ukrainian": "uk", "german": "de", "french": "fr"}
+
+
+def language_code(language: Optional[str]) -> Optional[str]:
+    if not language:
+        return None
+    return _LANGUAGE_CODES.get(language.lower(), language.lower())
+
+
+def resolve_device(device: str = "auto") -> str:
+    if device != "auto":
+        return device
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+class WhisperEngine:
+    """
+    openai-whisper. ``compute_type`` float16 turns on fp16 decoding (CUDA only),
+    ``threads`` sets torch's intra-op threads, ``beam_size`` enables beam search.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model: str, device: str = "auto", compute_type: str = "default",
+                 threads: int = 0, beam_size: Optional[int] = None):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.device = resolve_device(device)
+        if compute_type not in ("default", "float32", "float16"):
+            raise ValueError(f"openai-whisper supports float32/float16, not {compute_type}; use --engine faster-whisper")
+        self.fp16 = compute_type == "float16" or (compute_type == "default" and self.device == "cuda")
+        self.beam_size = beam_size
+        self.model = whisper.load_model(model, device=self.device)
+
+    def transcribe(self, audio, verbose: Optional[bool] = None, **options) -> Dict[str, Any]:
+        options.setdefault("fp16", self.fp16)
+        if self.beam_size:
+            options.setdefault("beam_size", self.beam_size)
+        return self.model.transcribe(audio, verbose=verbose, **options)
+
+
+def segment_to_dict(seg, index: int) -> Dict[str, Any]:
+    """
+    faster-whisper Segment → openai-whisper segment dict.
+    """
+    out = {
+        "id": index,
+        "seek": getattr(seg, "seek", 0),
+        "start": float(seg.start),
+        "end": float(seg.end),
+        "text": seg.text,
+        "tokens": list(getattr(seg, "tokens", []) or []),
+        "temperature": getattr(seg, "temperature", 0.0),
+        "avg_logprob": float(seg.avg_logprob),
+        "compression_ratio": float(seg.compression_ratio),
+        "no_speech_prob": float(seg.no_speech_prob),
+    }
+    if getattr(seg, "words", None):
+        out["words"] = [{"word": w.word, "start": float(w.start), "end": float(w.end),
+                         "probability": float(w.probability)} for w in seg.words]
+    return out
+
+
+class FasterWhisperEngine:
+    """
+    faster-whisper (CTranslate2). Greedy decoding unless ``beam_size`` is given,
+    like openai-whisper at temperature 0, so both engines decode the same way.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model: str, device: str = "auto", compute_type: str = "default",
+                 threads: int = 0, beam_size: Optional[int] = None):
+        from faster_whisper import WhisperModel
+        self.device = resolve_device(device)
+        if compute_type == "default":
+            compute_type = "float16" if self.device == "cuda" else "int8"
+        self.compute_type = compute_type
+        self.beam_size = beam_size or 1
+        self.model = WhisperModel(model, device=self.device, compute_type=compute_type, cpu_threads=threads or 0)
+
+    def transcribe(self, audio, verbose: Optional[bool] = None, **options) -> Dict[str, Any]:
+        segments, info = self.model.transcribe(
+            audio,
+            language=language_code(options.get("language")),
+            beam_size=options.get("beam_size", self.beam_size),
+            temperature=options.get("temperature", 0),
+            condition_on_previous_text=options.get("condition_on_previous_text", True),
+            word_timestamps=options.get("word_timestamps", False),
+        )
+        # генератор: декодирование идёт по мере чтения
+        segments = [segment_to_dict(seg, i) for i, seg in enumerate(segments)]
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments, "language": info.language}
+
+
+def load_engine(model: str, engine: str = "whisper", device: str = "auto", compute_type: str = "default",
+                threads: int = 0, beam_size: Optional[int] = None):
+    """
+    Build a transcription engine by name.
+    """
+    if engine == "whisper":
+        return WhisperEngine(model, device, compute_type, threads, beam_size)
+    if engine == "faster-whisper":
+        return FasterWhisperEngine(model, device, compute_type, threads, beam_size)
+    raise ValueError(f"unknown transcription engine: {engine}")
+
+
+def engine_options(args) -> Dict[str, Any]:
+    """
+    load_engine keyword arguments (all but the model name) from the CLI args.
+    """
+    return {
+        "engine": getattr(args, "engine", "whisper"),
+        "device": getattr(args, "device", "auto"),
+        "compute_type": getattr(args, "compute_type", "default"),
+        "threads": getattr(args, "threads", 0),
+        "beam_size": getattr(args, "beam_size", None),
+    }
+
+
+def engine_key(args) -> Dict[str, Any]:
+    """
+    The engine options that change the decoded text (checkpoint key part).
+    """
+    options = engine_options(args)
+    options.pop("threads")
+    return options
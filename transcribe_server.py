@@ -0,0 +1,230 @@
+"""
+transcribe_server.py
+Long-lived transcription daemon: keeps Whisper and Vosk loaded and processes jobs
+from a queue, one at a time, into the usual sessions/ layout.
+
+    python transcribe_server.py --model large --port 8765
+
+HTTP API (JSON):
+    POST /jobs        {"file_path": "...", "args": ["--hallucination-file", "h.txt"]} -> {"id": ...}
+    GET  /jobs/<id>   job status, session_dir when done
+    GET  /stats       queue depth, job counts and latency
+"""
+
+import argparse
+import json
+import queue
+import statistics
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from transcribe_engines import ENGINES
+
+DEFAULT_PORT = 8765
+
+
+class Job:
+    def __init__(self, file_path: str, args: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.file_path = file_path
+        self.args = args
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.session_dir = None
+        self.error = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "file_path": self.file_path,
+            "args": self.args,
+            "status": self.status,
+            "submitted": self.submitted,
+            "queue_sec": round((self.started or time.time()) - self.submitted, 3),
+            "run_sec": round(self.finished - self.started, 3) if self.finished and self.started else None,
+            "session_dir": self.session_dir,
+            "error": self.error,
+        }
+
+
+def run_job(job: Job) -> str:
+    from main import parse_args
+    from pipeline import run_pipeline
+    return run_pipeline(parse_args([job.file_path, *job.args]))
+
+
+class TranscriptionServer:
+    """
+    HTTP front end + single worker thread. ``runner`` turns a Job into a session dir.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 runner: Callable[[Job], str] = run_job, default_args: Optional[List[str]] = None):
+        self.runner = runner
+        self.default_args = list(default_args or [])
+        self.jobs: Dict[str, Job] = {}
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._threads = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def submit(self, file_path: str, args: List[str]) -> Job:
+        # аргументы задания идут после дефолтных демона и перекрывают их
+        job = Job(file_path, self.default_args + args)
+        with self._lock:
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        return job
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.session_dir = self.runner(job)
+                job.status = "done"
+            except BaseException as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+            job.finished = time.time()
+            with self._lock:
+                self.latencies.append(job.finished - job.submitted)
+            self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+            latencies = list(self.latencies)
+        latency = {}
+        if latencies:
+            ordered = sorted(latencies)
+            latency = {
+                "last": round(latencies[-1], 3),
+                "mean": round(statistics.fmean(latencies), 3),
+                "p50": round(ordered[len(ordered) // 2], 3),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            }
+        return {
+            "queue_depth": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+            "latency_sec": latency,
+        }
+
+    def _make_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code: int, payload: Dict[str, Any]):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._reply(200, daemon.stats())
+                elif self.path.startswith("/jobs/"):
+                    job = daemon.jobs.get(self.path[len("/jobs/"):])
+                    if job is None:
+                        self._reply(404, {"error": "unknown job"})
+                    else:
+                        self._reply(200, job.to_dict())
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/jobs":
+                    self._reply(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length).decode("utf-8"))
+                    file_path = payload["file_path"]
+                    args = [str(a) for a in payload.get("args", [])]
+                except (ValueError, KeyError, TypeError) as e:
+                    self._reply(400, {"error": f"bad request: {e}"})
+                    return
+                job = daemon.submit(file_path, args)
+                self._reply(202, job.to_dict())
+
+        return Handler
+
+    def start(self):
+        for target in (self._work, self.server.serve_forever):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self.queue.put(None)
+        self.server.shutdown()
+        self.server.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def preload_models(model_name: str, engine: str = "whisper"):
+    """
+    Load Whisper and Vosk before accepting jobs, so the first job does not pay for it.
+    """
+    from diarization_utils import load_vosk_models
+    from pipeline import VOSK_MODEL_DIR, VOSK_SPK_DIR, ensure_vosk_models, load_whisper_model
+    from transcribe_engines import engine_options
+    # те же аргументы, что у задач с настройками по умолчанию — иначе lru_cache не совпадёт
+    load_whisper_model(model_name, **engine_options(argparse.Namespace(engine=engine)))
+    ensure_vosk_models()
+    print("🔄 Loading Vosk models")
+    load_vosk_models(VOSK_MODEL_DIR, VOSK_SPK_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DimaTorzok transcription daemon")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model", default="large", help="Whisper model to keep loaded")
+    parser.add_argument("--engine", choices=ENGINES, default="whisper", help="Transcription backend")
+    args = parser.parse_args()
+
+    preload_models(args.model, args.engine)
+    server = TranscriptionServer(args.host, args.port, default_args=["--model", args.model, "--engine", args.engine]).start()
+    print(f"🛰️ Listening on {server.url} (model {args.model})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
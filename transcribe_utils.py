@@ -0,0 +1,172 @@
+"""
+transcribe_utils.py
+Whisper transcription helpers: shared decoding options and parallel transcription
+of long files across worker processes with overlap stitching.
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_chunking import find_split_points
+
+TRANSCRIBE_OPTIONS = {
+    "language": "Russian",
+    "condition_on_previous_text": False,
+    "temperature": 0,
+}
+
+
+def transcribe_options(word_timestamps: bool = False) -> Dict[str, Any]:
+    """
+    Whisper transcribe() options, with per-word timestamps when asked for.
+    """
+    options = dict(TRANSCRIBE_OPTIONS)
+    if word_timestamps:
+        options["word_timestamps"] = True
+    return options
+
+
+def shift_segment(seg: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    """
+    Copy of a Whisper segment moved by offset seconds, word timestamps included.
+    """
+    seg = dict(seg)
+    seg["start"] += offset
+    seg["end"] += offset
+    if seg.get("words"):
+        seg["words"] = [dict(w, start=w["start"] + offset, end=w["end"] + offset) for w in seg["words"]]
+    return seg
+
+# 🧵 Модель, загруженная один раз в каждом процессе-воркере
+_worker_model = None
+_worker_options = TRANSCRIBE_OPTIONS
+
+
+def _init_worker(model_name: str, threads: int, options: Dict[str, Any] = TRANSCRIBE_OPTIONS,
+                 engine_options: Optional[Dict[str, Any]] = None):
+    global _worker_model, _worker_options
+    from transcribe_engines import load_engine
+    engine_options = dict(engine_options or {})
+    engine_options["threads"] = engine_options.get("threads") or threads
+    _worker_model = load_engine(model_name, **engine_options)
+    _worker_options = options
+
+
+def _transcribe_chunk(index: int, offset: float, audio: np.ndarray) -> Tuple[int, List[Dict[str, Any]], float]:
+    start = time.perf_counter()
+    result = _worker_model.transcribe(audio, verbose=None, **_worker_options)
+    segments = [shift_segment(seg, offset) for seg in result["segments"]]
+    return index, segments, time.perf_counter() - start
+
+
+def plan_chunks(audio: np.ndarray, sr: int, chunk_sec: float, overlap_sec: float = 1.0) -> List[Dict[str, int]]:
+    """
+    Split at quiet points into chunks of at most chunk_sec. Each chunk owns
+    [own_start, own_end) and is decoded with overlap_sec of extra context on both sides.
+    """
+    cuts = [0] + find_split_points(audio, sr, target_sec=chunk_sec, search_sec=min(30.0, chunk_sec / 4)) + [len(audio)]
+    overlap = int(overlap_sec * sr)
+    return [
+        {"own_start": lo, "own_end": hi, "start": max(0, lo - overlap), "end": min(len(audio), hi + overlap)}
+        for lo, hi in zip(cuts, cuts[1:]) if hi > lo
+    ]
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def drop_repeated_words(prev_text: str, text: str, max_words: int = 8) -> str:
+    """
+    Remove the leading words of ``text`` that repeat the trailing words of ``prev_text``.
+    """
+    prev = _words(prev_text)[-max_words:]
+    tokens = text.split()
+    for k in range(min(max_words, len(tokens)), 0, -1):
+        head = _words(" ".join(tokens[:k]))
+        if head and len(head) <= len(prev) and head == prev[len(prev) - len(head):]:
+            rest = " ".join(tokens[k:])
+            return " " + rest if rest else ""
+    return text
+
+
+def stitch_chunks(chunks: List[Dict[str, int]], results: List[List[Dict[str, Any]]], sr: int) -> List[Dict[str, Any]]:
+    """
+    Keep each segment only in the chunk that owns its midpoint, then drop words
+    duplicated across a chunk boundary.
+    """
+    stitched = []
+    for i, (chunk, segments) in enumerate(zip(chunks, results)):
+        lo = chunk["own_start"] / sr
+        hi = chunk["own_end"] / sr
+        first = True
+        for seg in segments:
+            mid = (seg["start"] + seg["end"]) / 2
+            if not (lo <= mid < hi or (i == len(chunks) - 1 and mid >= hi)):
+                continue
+            if first and stitched and seg["start"] < stitched[-1]["end"]:
+                seg["text"] = drop_repeated_words(stitched[-1]["text"], seg["text"])
+                if not seg["text"].strip():
+                    continue
+            first = False
+            stitched.append(seg)
+    for i, seg in enumerate(stitched):
+        seg["id"] = i
+    return stitched
+
+
+def transcribe_parallel(model_name: str, audio: np.ndarray, sr: int, workers: int,
+                        chunk_sec: float = 0, overlap_sec: float = 1.0,
+                        on_progress: Optional[Callable[[int, int], None]] = None,
+                        word_timestamps: bool = False,
+                        engine_options: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Transcribe ``audio`` in a pool of ``workers`` processes, each loading the model once
+    (engine_options: load_engine arguments; by default openai-whisper with cpu_count/workers threads).
+    Returns (segments, per-chunk report). Output does not depend on scheduling:
+    decoding is greedy (temperature=0) and chunks are stitched in order.
+    on_progress(done, total) is called as chunks finish.
+    """
+    duration = len(audio) / sr
+    if not chunk_sec:
+        # несколько чанков на воркер — для балансировки, но не короче минуты
+        chunk_sec = min(600.0, max(60.0, duration / (workers * 4)))
+    chunks = plan_chunks(audio, sr, chunk_sec, overlap_sec)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    results = [None] * len(chunks)
+    report = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_name, threads, transcribe_options(word_timestamps), engine_options)) as pool:
+        futures = [
+            pool.submit(_transcribe_chunk, i, c["start"] / sr, audio[c["start"]:c["end"]])
+            for i, c in enumerate(chunks)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            if on_progress:
+                on_progress(done, len(chunks))
+        for future in futures:
+            index, segments, elapsed = future.result()
+            results[index] = segments
+            c = chunks[index]
+            seconds = (c["end"] - c["start"]) / sr
+            report.append({
+                "chunk": index,
+                "start": round(c["own_start"] / sr, 2),
+                "end": round(c["own_end"] / sr, 2),
+                "audio_sec": round(seconds, 2),
+                "wall_sec": round(elapsed, 2),
+                "rtf": round(elapsed / seconds, 3) if seconds else 0.0,
+                "segments": len(segments),
+            })
+    return stitch_chunks(chunks, results, sr), report
+
+
+def format_chunk_report(report: List[Dict[str, Any]]) -> str:
+    lines = [f"{'chunk':>5} {'start':>9} {'end':>9} {'wall s':>8} {'RTF':>6} {'segs':>5}"]
+    for r in report:
+        lines.append(f"{r['chunk']:>5} {r['start']:>9.1f} {r['end']:>9.1f} {r['wall_sec']:>8.1f} {r['rtf']:>6.2f} {r['segments']:>5}")
+    return "\n".join(lines)
@@ -0,0 +1,366 @@
+"""
+translate_async.py
+Asyncio translation engine for several LibreTranslate replicas. Requests go
+through one pooled requests.Session per replica on a thread pool; scheduling,
+retries and circuit breakers run on the event loop.
+
+- batches go to the endpoint with the fewest outstanding requests (ties: lower latency)
+- one global concurrency limit plus a per-endpoint limit, so a slow replica builds
+  no backlog of its own
+- per-endpoint circuit breaker: after ``failure_threshold`` consecutive failures the
+  endpoint is skipped for a cooldown (doubling up to ``max_cooldown``), then gets
+  a single probe request
+- request timeouts follow each endpoint's measured latency (srtt + 4*rttvar, as TCP does),
+  scaled by how much larger the batch is than the endpoint's average request
+- failed segments go to a retry queue instead of coming back blank; a segment still
+  failing after ``retry_for`` seconds (or rejected ``retries`` more times on its own)
+  keeps its source text and is listed in ``failed`` until a later call translates it
+
+AsyncTranslationClient has the TranslationClient interface (translate_many, stats,
+source/target/model_version), so translate_texts/translate_grouped work with either.
+It runs its own event loop on a background thread and may be called from any thread.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from translate_utils import TranslationClient
+
+_UNAVAILABLE = {502, 503, 504}
+
+
+class EndpointDown(Exception):
+    """
+    Transport failure, timeout or 502/503/504: the endpoint is at fault, not the batch.
+    """
+
+
+class BatchRejected(Exception):
+    """
+    The endpoint answered, but not with a translation of this batch.
+    """
+
+
+class Endpoint:
+    """
+    One LibreTranslate replica: a pooled requests.Session, in-flight count,
+    latency estimate and circuit breaker state.
+    """
+
+    def __init__(self, url: str, failure_threshold: int = 3, cooldown: float = 2.0, max_cooldown: float = 30.0,
+                 min_timeout: float = 2.0, max_timeout: float = 30.0, timeout_factor: float = 2.0,
+                 pool_size: int = 4):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.outstanding = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"accept": "application/json"})
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.avg_chars = 0.0
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.probing = False
+        self.stats = {"requests": 0, "failures": 0, "trips": 0, "timeouts": 0}
+
+    # ⏱️ Таймаут по измеренной задержке
+    def timeout(self, chars: int = 0) -> float:
+        if self.srtt is None:
+            return self.max_timeout
+        estimate = self.timeout_factor * (self.srtt + 4 * self.rttvar)
+        # большой батч после череды маленьких переводится дольше — это не отказ реплики
+        if self.avg_chars and chars > self.avg_chars:
+            estimate *= chars / self.avg_chars
+        return min(self.max_timeout, max(self.min_timeout, estimate))
+
+    def observe(self, elapsed: float, chars: int = 0):
+        if self.srtt is None:
+            self.srtt, self.rttvar = elapsed, elapsed / 2
+            self.avg_chars = float(chars)
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - elapsed)
+            self.srtt = 0.875 * self.srtt + 0.125 * elapsed
+            self.avg_chars = 0.875 * self.avg_chars + 0.125 * chars
+
+    # 🔌 Предохранитель
+    def available(self, now: float) -> bool:
+        if self.state == "open" and now >= self.open_until:
+            self.state = "half_open"
+        if self.state == "half_open":
+            return not self.probing
+        return self.state == "closed"
+
+    def succeeded(self):
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.probing = False
+
+    def failed(self, now: float):
+        self.stats["failures"] += 1
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state == "closed":
+                self.stats["trips"] += 1
+                logging.warning(f"Translation endpoint {self.url} is failing, pausing it for {self.cooldown:.1f}s")
+            self.state = "open"
+            self.open_until = now + self.cooldown
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+
+    def post(self, payload: bytes, timeout: float) -> Tuple[int, bytes]:
+        """
+        Blocking POST of a JSON body on the pooled keep-alive session: (status, body).
+        Runs on the client's thread pool, never on the event loop.
+        """
+        response = self.session.post(self.url, data=payload, timeout=timeout,
+                                     headers={"Content-Type": "application/json"})
+        return response.status_code, response.content
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTranslationClient:
+    """
+    Balanced, fault-tolerant translation over several endpoints.
+    ``max_concurrency`` bounds requests in flight over all endpoints and all
+    concurrent translate_many calls; ``per_endpoint`` bounds each replica.
+    """
+
+    def __init__(self, endpoints: List[str], source: str = "ru", target: str = "en",
+                 batch_size: int = 32, max_batch_chars: int = 5000, max_concurrency: int = 8,
+                 per_endpoint: int = 4, min_timeout: float = 2.0, max_timeout: float = 30.0,
+                 failure_threshold: int = 3, cooldown: float = 2.0, max_cooldown: float = 30.0,
+                 retry_for: float = 60.0, retries: int = 2, model_version: str = "libretranslate"):
+        if not endpoints:
+            raise ValueError("at least one translation endpoint is required")
+        self.endpoints = [Endpoint(url, failure_threshold, cooldown, max_cooldown, min_timeout, max_timeout,
+                                   pool_size=max(1, per_endpoint))
+                          for url in dict.fromkeys(endpoints)]
+        self.source = source
+        self.target = target
+        self.batch_size = max(1, batch_size)
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_endpoint = max(1, per_endpoint)
+        self.retry_for = retry_for
+        self.retries = retries
+        self.model_version = model_version
+        self.stats = {"requests": 0, "failed_requests": 0, "splits": 0, "segments": 0, "groups": 0,
+                      "retries": 0, "fallbacks": 0, "breaker_trips": 0}
+        self.failed: Set[str] = set()
+        self._lock = threading.Lock()
+        # HTTP идёт через requests в пуле потоков; планирование и предохранители — в event loop
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="translate-http")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True, name="translate-async")
+        self._thread.start()
+        self._slots = asyncio.run_coroutine_threadsafe(self._make_slots(), self._loop).result()
+
+    async def _make_slots(self):
+        return asyncio.Semaphore(self.max_concurrency), asyncio.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown()
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        return TranslationClient.make_batches(self, texts)
+
+    def endpoint_stats(self) -> Dict[str, Dict[str, float]]:
+        return {e.url: {**e.stats, "srtt": round(e.srtt or 0.0, 4), "state": e.state} for e in self.endpoints}
+
+    # ⚖️ Выбор реплики: меньше всего запросов в работе
+    async def _acquire(self) -> Endpoint:
+        _, changed = self._slots
+        while True:
+            now = time.monotonic()
+            ready = [e for e in self.endpoints if e.outstanding < self.per_endpoint and e.available(now)]
+            if ready:
+                endpoint = min(ready, key=lambda e: (e.outstanding, e.srtt or 0.0))
+                endpoint.outstanding += 1
+                if endpoint.state == "half_open":
+                    endpoint.probing = True
+                return endpoint
+            reopen = [e.open_until for e in self.endpoints if e.state == "open"]
+            wait = max(0.005, min(reopen) - now) if reopen else None
+            async with changed:
+                try:
+                    await asyncio.wait_for(changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, endpoint: Endpoint):
+        _, changed = self._slots
+        endpoint.outstanding -= 1
+        async with changed:
+            changed.notify_all()
+
+    async def _send(self, endpoint: Endpoint, texts: List[str]) -> List[str]:
+        payload = json.dumps({"q": texts, "source": self.source, "target": self.target, "format": "text"},
+                             ensure_ascii=False).encode("utf-8")
+        self._count("requests")
+        endpoint.stats["requests"] += 1
+        started = time.monotonic()
+        chars = sum(len(t) for t in texts)
+        timeout = endpoint.timeout(chars)
+        try:
+            status, body = await asyncio.get_running_loop().run_in_executor(
+                self._executor, endpoint.post, payload, timeout)
+        except requests.Timeout:
+            endpoint.stats["timeouts"] += 1
+            raise EndpointDown(f"{endpoint.url}: no answer in {timeout:.1f}s")
+        except requests.RequestException as e:
+            raise EndpointDown(f"{endpoint.url}: {e!r}")
+        if status in _UNAVAILABLE:
+            raise EndpointDown(f"{endpoint.url}: HTTP {status}")
+        endpoint.observe(time.monotonic() - started, chars)
+        if status != 200:
+            raise BatchRejected(f"{endpoint.url}: HTTP {status}")
+        try:
+            translated = json.loads(body.decode("utf-8")).get("translatedText")
+        except ValueError as e:
+            raise BatchRejected(f"{endpoint.url}: {e}")
+        if isinstance(translated, str):
+            translated = [translated]
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            raise BatchRejected(f"Expected {len(texts)} translations, got: {translated!r}")
+        return translated
+
+    async def _translate_all(self, texts: List[str], on_progress: Optional[Callable[[int, int], None]]) -> List[str]:
+        results = [""] * len(texts)
+        batches = self.make_batches(texts)
+        total = sum(len(b) for b in batches)
+        self._count("segments", total)
+        if not total:
+            return results
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        for batch in batches:
+            # (индексы, время первой ошибки, число попыток)
+            queue.put_nowait((batch, None, 0))
+        done = 0
+        finished = asyncio.Event()
+        semaphore, _ = self._slots
+
+        def settle(batch: List[int], translated: List[str]):
+            nonlocal done
+            for i, text in zip(batch, translated):
+                results[i] = text
+            done += len(batch)
+            if on_progress:
+                on_progress(done, total)
+            if done >= total:
+                finished.set()
+
+        def retry_later(batch: List[int], first_failure: Optional[float], attempts: int, error: Exception,
+                        max_attempts: Optional[int] = None):
+            now = time.monotonic()
+            first_failure = now if first_failure is None else first_failure
+            if now - first_failure >= self.retry_for or (max_attempts is not None and attempts >= max_attempts):
+                logging.error(f"Translation failed after {attempts} attempts, keeping source text: {error}")
+                self._count("fallbacks", len(batch))
+                with self._lock:
+                    self.failed.update(texts[i] for i in batch)
+                settle(batch, [texts[i] for i in batch])
+                return
+            self._count("retries")
+            delay = min(0.05 * 2 ** attempts, self.endpoints[0].max_cooldown)
+            loop.call_later(delay, queue.put_nowait, (batch, first_failure, attempts + 1))
+
+        async def worker():
+            while True:
+                batch, first_failure, attempts = await queue.get()
+                try:
+                    await handle(batch, first_failure, attempts)
+                finally:
+                    queue.task_done()
+
+        async def handle(batch: List[int], first_failure: Optional[float], attempts: int):
+            async with semaphore:
+                endpoint = await self._acquire()
+                try:
+                    translated = await self._send(endpoint, [texts[i] for i in batch])
+                except EndpointDown as e:
+                    self._count("failed_requests")
+                    trips = endpoint.stats["trips"]
+                    endpoint.failed(time.monotonic())
+                    self._count("breaker_trips", endpoint.stats["trips"] - trips)
+                    retry_later(batch, first_failure, attempts, e)
+                except BatchRejected as e:
+                    # реплика жива, не устроил сам батч — делим пополам, как TranslationClient
+                    self._count("failed_requests")
+                    endpoint.succeeded()
+                    if len(batch) > 1:
+                        self._count("splits")
+                        mid = len(batch) // 2
+                        queue.put_nowait((batch[:mid], first_failure, attempts))
+                        queue.put_nowait((batch[mid:], first_failure, attempts))
+                    else:
+                        retry_later(batch, first_failure, attempts, e, max_attempts=self.retries)
+                else:
+                    endpoint.succeeded()
+                    with self._lock:
+                        self.failed.difference_update(texts[i] for i in batch)
+                    settle(batch, translated)
+                finally:
+                    await self._release(endpoint)
+
+        # воркеров столько, сколько слотов: половинки разделённых батчей идут параллельно
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.max_concurrency)]
+        waiter = asyncio.ensure_future(finished.wait())
+        try:
+            await asyncio.wait([waiter, *workers], return_when=asyncio.FIRST_COMPLETED)
+            # воркер завершается только с неожиданной ошибкой — отдаём её вызывающему, а не виснем
+            for task in workers:
+                if task.done():
+                    task.result()
+        finally:
+            for task in [waiter, *workers]:
+                task.cancel()
+            await asyncio.gather(waiter, *workers, return_exceptions=True)
+        return results
+
+    def translate_many(self, texts: List[str], on_progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+        """
+        Translate a list of texts, preserving order. Empty texts are not sent.
+        on_progress(done, total) is called from the engine thread as batches settle.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._translate_all(texts, on_progress), self._loop)
+        return future.result()
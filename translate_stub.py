@@ -0,0 +1,201 @@
+"""
+translate_stub.py
+Local stand-in for the LibreTranslate /translate endpoint, used by tests and benchmarks.
+Accepts JSON and form-encoded requests, single strings and ``q`` arrays.
+AsyncStubLibreTranslate is the asyncio variant used for throughput and failover tests.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+
+def fake_translate(text: str) -> str:
+    return f"EN:{text}"
+
+
+class StubLibreTranslate:
+    """
+    Threaded HTTP/1.1 (keep-alive) server that "translates" with a deterministic function.
+    ``latency`` is added to every request; batches longer than ``max_batch`` fail with 500.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 max_batch: Optional[int] = None, translate: Callable[[str], str] = fake_translate):
+        self.latency = latency
+        self.max_batch = max_batch
+        self.translate = translate
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/translate"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code: int, payload: dict):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length).decode("utf-8")
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    q = json.loads(raw).get("q")
+                else:
+                    q = urllib.parse.parse_qs(raw).get("q", [""])[0]
+                if isinstance(q, list):
+                    if stub.max_batch is not None and len(q) > stub.max_batch:
+                        self._reply(500, {"error": "batch too large"})
+                        return
+                    self._reply(200, {"translatedText": [stub.translate(t) for t in q]})
+                else:
+                    self._reply(200, {"translatedText": stub.translate(q or "")})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class AsyncStubLibreTranslate:
+    """
+    asyncio version of the stub for many concurrent connections: latency costs a
+    sleeping coroutine, not a thread. Runs its own event loop on a background thread.
+    Switches for failover tests: ``down`` answers 503, ``hang`` never answers.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 translate: Callable[[str], str] = fake_translate):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.translate = translate
+        self.down = False
+        self.hang = False
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = None
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/translate"
+
+    async def _reply(self, writer, code: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(f"HTTP/1.1 {code} {'OK' if code == 200 else 'Error'}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                raw = await reader.readexactly(length)
+                self.requests += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    if self.hang:
+                        await asyncio.sleep(3600)
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    if self.down:
+                        await self._reply(writer, 503, {"error": "unavailable"})
+                        continue
+                    q = json.loads(raw.decode("utf-8")).get("q")
+                    if isinstance(q, list):
+                        await self._reply(writer, 200, {"translatedText": [self.translate(t) for t in q]})
+                    else:
+                        await self._reply(writer, 200, {"translatedText": self.translate(q or "")})
+                finally:
+                    self.in_flight -= 1
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
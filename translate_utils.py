@@ -1,18 +1,23 @@
 import logging
+import re
 import subprocess
 import threading
 import json
-import sys
-import itertools
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, Set
 
-def translate_text_local(text: str) -> str:
+from translation_cache import TranslationCache, normalize_text
+from visual_log import ProgressBar
+from segment_store import SegmentStore
+
+DEFAULT_TRANSLATE_URL = "http://translate.localhost/translate"
+
+def translate_text_local(text: str, url: str = DEFAULT_TRANSLATE_URL) -> str:
     """
     Translate a given text from Russian to English using local LibreTranslate API.
     Fallbacks to first alternative if direct translation is missing.
     """
     import urllib.parse
-    url = "http://translate.localhost/translate"
     data = {
         "q": text,
         "source": "ru",
@@ -46,35 +51,326 @@ def translate_text_local(text: str) -> str:
             logging.error(f"Raw response: {result.stdout}")
         return ""
 
-def spin_earth(stop_event):
+class TranslationClient:
+    """
+    In-process LibreTranslate client.
+    Keeps HTTP connections open in a pool, sends segments in batches (array ``q``)
+    and runs up to ``max_workers`` requests at once. Output order always matches input order.
+    A batch the server rejects is split in half and retried until single segments
+    remain; a batch that times out is not retried (the server is hung, smaller
+    requests would wait the full timeout again).
+    ``failed`` holds texts whose last attempt failed; a later success removes them.
+    """
+
+    def __init__(self, url: str = DEFAULT_TRANSLATE_URL, source: str = "ru", target: str = "en",
+                 batch_size: int = 32, max_batch_chars: int = 5000, max_workers: int = 4,
+                 timeout: float = 30.0, retries: int = 1, model_version: str = "libretranslate"):
+        self.url = url
+        self.source = source
+        self.target = target
+        self.batch_size = max(1, batch_size)
+        self.max_batch_chars = max_batch_chars
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.retries = retries
+        self.model_version = model_version
+        self.stats = {"requests": 0, "failed_requests": 0, "splits": 0, "segments": 0, "groups": 0}
+        self.failed: Set[str] = set()
+        self._lock = threading.Lock()
+        # requests грузится только когда клиент действительно нужен
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"accept": "application/json"})
+        self._timeout_error = requests.Timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _post(self, texts: List[str]) -> List[str]:
+        self._count("requests")
+        response = self.session.post(self.url, json={
+            "q": texts,
+            "source": self.source,
+            "target": self.target,
+            "format": "text"
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        translated = response.json().get("translatedText")
+        if isinstance(translated, str):
+            translated = [translated]
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            raise ValueError(f"Expected {len(texts)} translations, got: {translated!r}")
+        return translated
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """
+        Translate one batch, splitting it in half on failure.
+        A segment that keeps failing (or any segment of a timed-out batch) is
+        returned as an empty string.
+        """
+        attempts = 1 + (self.retries if len(texts) == 1 else 0)
+        for _ in range(attempts):
+            try:
+                translated = self._post(texts)
+            except Exception as e:
+                self._count("failed_requests")
+                error = e
+                if isinstance(e, self._timeout_error):
+                    break
+            else:
+                # удачный повтор: текст снова можно класть в кэш
+                with self._lock:
+                    self.failed.difference_update(texts)
+                return translated
+        # ⏳ таймаут: сервер завис, половинки ждали бы ещё по self.timeout на каждом уровне
+        if len(texts) == 1 or isinstance(error, self._timeout_error):
+            logging.error(f"LibreTranslate error: {error}")
+            with self._lock:
+                self.failed.update(texts)
+            return [""] * len(texts)
+        self._count("splits")
+        mid = len(texts) // 2
+        return self.translate_batch(texts[:mid]) + self.translate_batch(texts[mid:])
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group indices of non-empty texts into batches bounded by count and total characters.
+        """
+        batches = []
+        current = []
+        chars = 0
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            if current and (len(current) >= self.batch_size or chars + len(text) > self.max_batch_chars):
+                batches.append(current)
+                current = []
+                chars = 0
+            current.append(i)
+            chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    def translate_many(self, texts: List[str], on_progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+        """
+        Translate a list of texts, preserving order. Empty texts are not sent.
+        on_progress(done, total) is called as batches come back.
+        """
+        results = [""] * len(texts)
+        batches = self.make_batches(texts)
+        total = sum(len(b) for b in batches)
+        self._count("segments", total)
+        workers = min(self.max_workers, len(batches)) or 1
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outputs = pool.map(lambda batch: self.translate_batch([texts[i] for i in batch]), batches)
+            for batch, translated in zip(batches, outputs):
+                for i, text in zip(batch, translated):
+                    results[i] = text
+                done += len(batch)
+                if on_progress:
+                    on_progress(done, total)
+        return results
+
+def translate_texts(texts: List[str], client: TranslationClient, cache: Optional[TranslationCache] = None,
+                    on_progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """
+    Translate texts so that each distinct normalized text is sent at most once,
+    consulting the translation memory first when one is given.
+    on_progress(done, total) counts the texts actually sent to the server.
+    """
+    keys = [normalize_text(t) for t in texts]
+    unique = list(dict.fromkeys(k for k in keys if k))
+    known = cache.get_many(unique, client.source, client.target, client.model_version) if cache is not None else {}
+    missing = [k for k in unique if k not in known]
+    if missing:
+        fresh = dict(zip(missing, client.translate_many(missing, on_progress=on_progress)))
+        if cache is not None:
+            # неудачный перевод (пустой или исходный текст) в кэш не кладём
+            cache.put_many([(k, v) for k, v in fresh.items() if v and k not in client.failed],
+                           client.source, client.target, client.model_version)
+        known.update(fresh)
+    return [known.get(k, "") for k in keys]
+
+# 🧩 Группировка по предложениям: фраза, разрезанная Whisper на 2-3 сегмента, переводится целиком
+_SENTENCE_END = re.compile(r"[.!?…][\"»”')\]]*$")
+_SOFT_BREAK = re.compile(r"[,;:—–-][\"»”')\]]*$")
+
+def plan_sentence_groups(texts: List[str], max_chars: int = 500, max_segments: int = 8,
+                         breaks: Optional[List[bool]] = None) -> List[List[int]]:
+    """
+    Group adjacent segments until a group ends a sentence (final .!? or the next
+    segment starts with a capital letter), without exceeding max_chars or max_segments.
+    breaks[i] forces a group boundary after segment i (e.g. a long pause).
+    Empty texts stay alone.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    length = 0
+    for i, text in enumerate(texts):
+        text = text.strip()
+        if not text:
+            if current:
+                groups.append(current)
+                current, length = [], 0
+            groups.append([i])
+            continue
+        if current and (length + 1 + len(text) > max_chars or len(current) >= max_segments):
+            groups.append(current)
+            current, length = [], 0
+        current.append(i)
+        length += len(text) + (1 if length else 0)
+        # точку в конце одиночных предложений к этому моменту уже сняли,
+        # поэтому заглавная буква в начале следующего сегмента — тоже конец предложения
+        following = texts[i + 1].lstrip(" -—–«\"'") if i + 1 < len(texts) else ""
+        if (_SENTENCE_END.search(text) or following[:1].isupper() or
+                (breaks is not None and breaks[i])):
+            groups.append(current)
+            current, length = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+def complete_groups(texts: List[str], breaks: Optional[List[bool]] = None, max_chars: int = 500,
+                    max_segments: int = 8) -> int:
     """
-    Simple spinner to indicate translation progress.
+    How many leading texts form finished sentence groups. The last group is
+    unfinished when it does not end a sentence: texts that have not arrived yet
+    may continue it.
     """
-    globe = itertools.cycle(["🌍", "🌎", "🌏"])
-    while not stop_event.is_set():
-        sys.stdout.write(f"\r{next(globe)} Translating subtitles...")
-        sys.stdout.flush()
-        stop_event.wait(0.3)
-    print("\r✅ Translation complete.         ")
+    groups = plan_sentence_groups(texts, max_chars=max_chars, max_segments=max_segments, breaks=breaks)
+    if not groups:
+        return 0
+    last = groups[-1]
+    text = texts[last[-1]].strip()
+    if (not text or _SENTENCE_END.search(text) or len(last) >= max_segments
+            or (breaks is not None and breaks[last[-1]])):
+        return len(texts)
+    return last[0]
 
-def translate_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def distribute_translation(translated: str, sources: List[str]) -> List[str]:
     """
-    Translate list of segments and show a spinner while working.
-    Returns list of translated subtitle blocks.
+    Cut a translated group back into one piece per source segment, at word
+    boundaries, in proportion to the source lengths. A cut near the target point
+    prefers a word ending with the same kind of punctuation as the source part.
+    When the translation has fewer words than there are segments, the segments
+    left without words repeat the previous piece.
     """
-    translated = []
-    stop_event = threading.Event()
-    spinner = threading.Thread(target=spin_earth, args=(stop_event,))
-    spinner.start()
+    sources = [src.strip() for src in sources]
+    if len(sources) == 1:
+        return [translated.strip()]
+    words = translated.split()
+    if not words:
+        return [""] * len(sources)
+    total_src = sum(len(src) for src in sources) or 1
+    # позиция конца каждого слова в переводе (в символах)
+    ends, pos = [], 0
+    for w in words:
+        pos += len(w) + (1 if pos else 0)
+        ends.append(pos)
+    total = ends[-1]
+    cuts, acc, prev = [], 0, 0
+    for k, src in enumerate(sources[:-1]):
+        acc += len(src)
+        target = total * acc / total_src
+        remaining = len(sources) - 1 - k
+        lo = min(prev + 1, len(words))
+        hi = max(lo, len(words) - remaining)
+        best = min(range(lo, hi + 1), key=lambda j: abs(ends[j - 1] - target) if j else target) if lo <= hi else lo
+        window = max(3.0, 0.6 * total / len(sources))
+        wanted = _SENTENCE_END if _SENTENCE_END.search(src) else _SOFT_BREAK if _SOFT_BREAK.search(src) else None
+        if wanted is not None:
+            matches = [j for j in range(lo, hi + 1) if j and abs(ends[j - 1] - target) <= window and wanted.search(words[j - 1])]
+            if matches:
+                best = min(matches, key=lambda j: abs(ends[j - 1] - target))
+        cuts.append(best)
+        prev = best
+    bounds = [0] + cuts + [len(words)]
+    pieces = [" ".join(words[a:b]) for a, b in zip(bounds, bounds[1:])]
+    # слов меньше, чем сегментов: пустой сегмент продолжает предыдущий, а не остаётся без перевода
+    for k in range(1, len(pieces)):
+        if not pieces[k]:
+            pieces[k] = pieces[k - 1]
+    return pieces
 
-    for seg in segments:
-        translated_text = translate_text_local(seg["text"])
-        translated.append({
-            "start": seg["start"],
-            "end": seg["end"],
-            "text": translated_text
-        })
+def translate_grouped(texts: List[str], client: TranslationClient, cache: Optional[TranslationCache] = None,
+                      on_progress: Optional[Callable[[int, int], None]] = None,
+                      breaks: Optional[List[bool]] = None, max_group_chars: int = 500,
+                      failed: Optional[Set[int]] = None) -> List[str]:
+    """
+    translate_texts over sentence-complete groups of adjacent texts; each group's
+    translation is distributed back onto its segments. Returns one text per input.
+    Indices of texts whose group was not translated are added to ``failed``.
+    """
+    groups = plan_sentence_groups(texts, max_chars=max_group_chars, breaks=breaks)
+    joined = [" ".join(texts[i].strip() for i in group) for group in groups]
+    translated = translate_texts(joined, client, cache, on_progress=on_progress)
+    client._count("groups", len(groups))
+    results = [""] * len(texts)
+    for group, source, text in zip(groups, joined, translated):
+        # пустой перевод или исходный текст из client.failed — группа не переведена
+        if failed is not None and source and (not text or normalize_text(source) in client.failed):
+            failed.update(group)
+        for i, piece in zip(group, distribute_translation(text, [texts[i] for i in group])):
+            results[i] = piece
+    return results
+
+def translate_segments(segments: List[Dict[str, Any]], client: Optional[TranslationClient] = None,
+                       cache: Optional[TranslationCache] = None,
+                       on_progress: Optional[Callable[[int, int], None]] = None,
+                       max_gap: float = 1.5) -> List[Dict[str, Any]]:
+    """
+    Translate list of segments, reporting progress as batches complete
+    (a progress bar unless an on_progress callback is given).
+    Adjacent segments are translated together as whole sentences (no group spans
+    a pause longer than max_gap) and the translation is cut back onto their timings.
+    Uses a pooled, batched TranslationClient (a temporary one if none is given)
+    and an optional persistent translation cache; repeated texts are translated once.
+    Returns list of translated subtitle blocks (a SegmentStore for a SegmentStore).
+    """
+    bar = None
+
+    def show_progress(done, total):
+        nonlocal bar
+        if bar is None:
+            bar = ProgressBar("🌍 Translating subtitles...", total, unit="segments")
+        bar.set(done)
+
+    own_client = client is None
+    if own_client:
+        client = TranslationClient()
+    try:
+        if isinstance(segments, SegmentStore):
+            source, starts, ends = segments.texts, segments.start.tolist(), segments.end.tolist()
+        else:
+            source = [seg["text"] for seg in segments]
+            starts, ends = [seg["start"] for seg in segments], [seg["end"] for seg in segments]
+        breaks = [i + 1 >= len(starts) or starts[i + 1] - ends[i] > max_gap for i in range(len(starts))]
+        texts = translate_grouped(source, client, cache, on_progress=on_progress or show_progress, breaks=breaks)
+    finally:
+        if own_client:
+            client.close()
+        if bar is not None:
+            bar.close()
 
-    stop_event.set()
-    spinner.join()
-    return translated
+    if isinstance(segments, SegmentStore):
+        return segments.timings_only().with_texts(texts)
+    return [
+        {"start": seg["start"], "end": seg["end"], "text": text}
+        for seg, text in zip(segments, texts)
+    ]
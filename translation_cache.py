@@ -0,0 +1,114 @@
+"""
+translation_cache.py
+Disk-backed translation memory (SQLite) with LRU eviction.
+Entries are keyed by (normalized text, source lang, target lang, model version).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+from utils import get_cache_dir
+
+
+def normalize_text(text: str) -> str:
+    """
+    Cache key form of a segment: NFC, whitespace collapsed and stripped. Case is kept.
+    """
+    return unicodedata.normalize("NFC", " ".join(text.split()))
+
+
+class TranslationCache:
+    """
+    SQLite translation memory shared between runs.
+    Keeps at most ``max_entries`` rows, dropping the least recently used ones.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 200_000):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "translations.sqlite3")
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                text TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text, source, target, model)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations(last_used)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def get_many(self, texts: Iterable[str], source: str, target: str, model: str) -> Dict[str, str]:
+        """
+        Look up normalized texts; returns only the ones found and refreshes their LRU stamp.
+        """
+        texts = list(texts)
+        found = {}
+        with self._lock:
+            for i in range(0, len(texts), 500):
+                chunk = texts[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text, translation FROM translations WHERE source=? AND target=? AND model=? AND text IN ({placeholders})",
+                    (source, target, model, *chunk)
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translations SET last_used=? WHERE text=? AND source=? AND target=? AND model=?",
+                    [(now, text, source, target, model) for text in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, str]], source: str, target: str, model: str):
+        """
+        Store (normalized text, translation) pairs, then evict down to ``max_entries``.
+        """
+        now = time.time()
+        rows = [(text, source, target, model, translation, now) for text, translation in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)", rows)
+            excess = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {len(self)} entries"
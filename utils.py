@@ -1,16 +1,67 @@
 """
 Common utility functions for timestamp formatting and other helpers.
 """
-from datetime import timedelta
+import re
 
-def format_timestamp(seconds: float) -> str:
+
+class PipelineError(RuntimeError):
+    """
+    A failure already reported to the user; the CLI exits with status 1 on it.
+    """
+
+# таблицы двух- и трёхзначных чисел: форматирование без f-строк на каждый титр
+_DIGITS2 = [f"{i:02}" for i in range(100)]
+_DIGITS3 = [f"{i:03}" for i in range(1000)]
+
+def format_timestamp(seconds: float, sep: str = ",") -> str:
+    """
+    Convert seconds to SRT timestamp format: HH:MM:SS,mmm (sep="." gives WebVTT).
+    Works in integer milliseconds, rounded to the nearest one.
+    """
+    ms = int(seconds * 1000 + 0.5) if seconds > 0 else 0
+    secs = ms // 1000
+    hours = secs // 3600
+    return ((_DIGITS2[hours] if hours < 100 else str(hours)) + ":" + _DIGITS2[secs // 60 % 60] + ":"
+            + _DIGITS2[secs % 60] + sep + _DIGITS3[ms % 1000])
+
+def format_ass_timestamp(seconds: float) -> str:
+    """
+    ASS/SSA timestamp: H:MM:SS.cc (centiseconds).
+    """
+    cs = int(seconds * 100 + 0.5) if seconds > 0 else 0
+    secs = cs // 100
+    return f"{secs // 3600}:" + _DIGITS2[secs // 60 % 60] + ":" + _DIGITS2[secs % 60] + "." + _DIGITS2[cs % 100]
+
+_TIMESTAMP_RE = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})")
+
+def parse_timestamp(text: str) -> float:
+    """
+    Seconds from an SRT (HH:MM:SS,mmm) or WebVTT ([HH:]MM:SS.mmm) timestamp.
+    """
+    m = _TIMESTAMP_RE.fullmatch(text.strip())
+    if not m:
+        raise ValueError(f"bad timestamp: {text!r}")
+    hours, minutes, secs, frac = m.groups()
+    ms = int(frac.ljust(3, "0"))
+    return (int(hours or 0) * 3600 + int(minutes) * 60 + int(secs)) + ms / 1000
+
+def get_cache_dir() -> str:
+    """
+    Shared cache directory (translation memory, result cache).
+    Overridable with the DIMA_TORZOK_CACHE_DIR environment variable.
+    """
+    import os
+    path = os.environ.get("DIMA_TORZOK_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "dima-torzok")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
     """
-    Convert seconds to SRT timestamp format: HH:MM:SS,mmm
+    SHA-256 of a file's contents, read in blocks.
     """
-    td = timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
-    millis = int((seconds - total_seconds) * 1000)
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
-    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,153 @@
+"""
+vad.py
+Energy-based voice activity detection before Whisper and Vosk. Silence and hold
+stretches are cut out: the models get only the speech regions, joined with short
+pauses (SpeechMap.compact), and their timestamps are mapped back onto the
+original timeline (SpeechMap.remap_segments).
+"""
+
+import bisect
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from audio_chunking import frame_energy
+
+SILENCE_DB = -60.0
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    (start, end) frame ranges where mask is True.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.astype(np.int8), [0]])))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def detect_speech(audio: np.ndarray, sr: int, frame_sec: float = 0.03, margin_db: float = 10.0,
+                  min_speech_sec: float = 0.25, min_silence_sec: float = 0.8,
+                  pad_sec: float = 0.3) -> List[Tuple[int, int]]:
+    """
+    Speech regions as (start, end) sample ranges. A frame is speech when its energy
+    is margin_db above the noise floor (10th percentile of frame energies) and above
+    SILENCE_DB; pauses shorter than min_silence_sec are bridged, bursts shorter than
+    min_speech_sec dropped, and every region is padded by pad_sec on both sides.
+    """
+    hop = max(1, int(sr * frame_sec))
+    energy = frame_energy(audio, sr, frame_sec)
+    if not len(energy):
+        return []
+    db = 10 * np.log10(energy + 1e-12)
+    threshold = max(float(np.percentile(db, 10)) + margin_db, SILENCE_DB)
+    voiced = db > threshold
+    # короткие паузы внутри фразы — тоже речь
+    for start, end in _runs(~voiced):
+        if start > 0 and end < len(voiced) and (end - start) * frame_sec < min_silence_sec:
+            voiced[start:end] = True
+    pad = int(pad_sec * sr)
+    regions: List[Tuple[int, int]] = []
+    for start, end in _runs(voiced):
+        if (end - start) * frame_sec < min_speech_sec:
+            continue
+        lo, hi = max(0, start * hop - pad), min(len(audio), end * hop + pad)
+        if regions and lo <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], hi)
+        else:
+            regions.append((lo, hi))
+    return regions
+
+
+class SpeechMap:
+    """
+    Speech regions of a signal and their places in the compacted signal, where
+    regions follow each other separated by ``gap_sec`` of silence.
+    """
+
+    def __init__(self, regions: List[Tuple[int, int]], sr: int, total_samples: int, gap_sec: float = 0.5):
+        self.regions = [(int(a), int(b)) for a, b in regions]
+        self.sr = sr
+        self.total_samples = total_samples
+        self.gap = int(gap_sec * sr)
+        self.compact_starts: List[int] = []
+        pos = 0
+        for start, end in self.regions:
+            self.compact_starts.append(pos)
+            pos += end - start + self.gap
+        self.compact_samples = max(0, pos - self.gap)
+
+    @classmethod
+    def detect(cls, audio: np.ndarray, sr: int, gap_sec: float = 0.5, **options) -> "SpeechMap":
+        return cls(detect_speech(audio, sr, **options), sr, len(audio), gap_sec)
+
+    @property
+    def total_sec(self) -> float:
+        return self.total_samples / self.sr
+
+    @property
+    def speech_sec(self) -> float:
+        return sum(end - start for start, end in self.regions) / self.sr
+
+    @property
+    def skipped_fraction(self) -> float:
+        return 1.0 - self.speech_sec / self.total_sec if self.total_samples else 0.0
+
+    def compact(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Speech regions of ``audio`` joined with gap_sec of silence between them.
+        """
+        out = np.zeros(self.compact_samples, dtype=audio.dtype)
+        for (start, end), pos in zip(self.regions, self.compact_starts):
+            out[pos:pos + end - start] = audio[start:end]
+        return out
+
+    def to_original(self, t: float, side: str = "start") -> float:
+        """
+        Seconds in the compacted signal → seconds in the original one. A time inside
+        an inserted pause goes to the next region's start (side="start") or the
+        previous region's end (side="end").
+        """
+        if not self.regions:
+            return t
+        sample = t * self.sr
+        i = max(0, bisect.bisect_right(self.compact_starts, sample) - 1)
+        start, end = self.regions[i]
+        local = sample - self.compact_starts[i]
+        if local > end - start:
+            if side == "start" and i + 1 < len(self.regions):
+                return self.regions[i + 1][0] / self.sr
+            return end / self.sr
+        return (start + max(0.0, local)) / self.sr
+
+    def remap_segments(self, segments: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Copies of Whisper segments or Vosk words with start/end (and word
+        timestamps) moved onto the original timeline.
+        """
+        result = []
+        for seg in segments:
+            seg = dict(seg, start=self.to_original(seg["start"], "start"), end=self.to_original(seg["end"], "end"))
+            seg["end"] = max(seg["end"], seg["start"])
+            if seg.get("words"):
+                seg["words"] = [dict(w, start=self.to_original(w["start"], "start"),
+                                     end=max(self.to_original(w["end"], "end"), self.to_original(w["start"], "start")))
+                                for w in seg["words"]]
+            result.append(seg)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"sr": self.sr, "total_samples": self.total_samples, "gap_samples": self.gap,
+                "regions": self.regions, "speech_sec": round(self.speech_sec, 2),
+                "skipped_fraction": round(self.skipped_fraction, 4)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpeechMap":
+        return cls(data["regions"], data["sr"], data["total_samples"], data["gap_samples"] / data["sr"])
+
+
+def vad_options(args) -> Optional[Dict[str, float]]:
+    """
+    VAD settings from the CLI args (part of the checkpoint keys), None when off.
+    """
+    if not getattr(args, "vad", False):
+        return None
+    return {"margin_db": args.vad_margin_db, "min_silence_sec": args.vad_min_silence}
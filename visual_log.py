@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 import time
 from typing import Optional, Dict
 
@@ -11,7 +12,7 @@ def render_progress_bar(percent: int, width: int = 50, char_full: str = "■", c
     empty = width - filled
     return f"[{char_full * filled}{char_empty * empty}] {percent}%"
 
-def show_progress_block(title: str, percent: int, params: Optional[Dict] = None, delay: float = 0.01):
+def show_progress_block(title: str, percent: int, params: Optional[Dict] = None):
     """
     Renders styled progress line with optional parameters.
     """
@@ -20,12 +21,57 @@ def show_progress_block(title: str, percent: int, params: Optional[Dict] = None,
         param_str = " [" + " | ".join(f"{k}: {v}" for k, v in params.items()) + "]"
 
     print(f"{title}{param_str}")
-    for i in range(0, percent + 1, 5):
-        bar = render_progress_bar(i)
-        sys.stdout.write(f"\r{bar}")
+    print(render_progress_bar(percent))
+
+class ProgressBar:
+    """
+    Progress bar driven by real progress events: call update() as work completes.
+    Redraws at most every min_interval seconds; safe to update from worker threads.
+    """
+
+    def __init__(self, title: str, total: float, unit: str = "", min_interval: float = 0.1):
+        self.title = title
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.min_interval = min_interval
+        self.started = time.perf_counter()
+        self._last_draw = 0.0
+        self._lock = threading.Lock()
+        print(title)
+        self._draw(force=True)
+
+    def _draw(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self._last_draw < self.min_interval:
+            return
+        self._last_draw = now
+        percent = int(100 * self.done / self.total) if self.total else 100
+        rate = self.done / (now - self.started) if now > self.started else 0.0
+        suffix = f" {self.done:g}/{self.total:g} {self.unit} ({rate:.1f} {self.unit}/s)" if self.unit else ""
+        sys.stdout.write(f"\r{render_progress_bar(min(100, percent))}{suffix}")
         sys.stdout.flush()
-        time.sleep(delay)
-    print()
+
+    def update(self, n: float = 1):
+        with self._lock:
+            self.done += n
+            self._draw()
+
+    def set(self, done: float):
+        with self._lock:
+            self.done = done
+            self._draw()
+
+    def close(self):
+        with self._lock:
+            self._draw(force=True)
+        print()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 def show_stage_complete(message: str = "✅ Stage complete."):
     print(message)